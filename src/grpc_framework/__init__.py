@@ -6,7 +6,7 @@ from .application import (
 from .config import GRPCFrameworkConfig
 
 from .core.adaptor import (
-    StreamRequest
+    StreamRequest, ReusableStreamRequest
 )
 
 from .core.request import Request
@@ -32,11 +32,14 @@ from .core.serialization import (
     JSONCodec,
     ProtobufCodec,
     ORJSONCodec,
+    MsgPackCodec,
     DataclassesCodec,
     ProtobufConverter,
     JsonProtobufConverter,
+    CompiledJsonProtobufConverter,
     JsonConverter,
-    DataclassesConverter
+    DataclassesConverter,
+    SchemaModelConverter
 )
 
 __version__ = "0.3.2.beta"
@@ -68,11 +71,14 @@ __all__ = [
     'JSONCodec',
     'ProtobufCodec',
     'ORJSONCodec',
+    'MsgPackCodec',
     'DataclassesCodec',
     'ProtobufConverter',
     'JsonProtobufConverter',
+    'CompiledJsonProtobufConverter',
     'JsonConverter',
     'DataclassesConverter',
+    'SchemaModelConverter',
 
     # Service & grpc endpoint register
     'Service',
@@ -84,6 +90,7 @@ __all__ = [
 
     # adaptor
     'StreamRequest',
+    'ReusableStreamRequest',
 
     # exception
     'GRPCException',
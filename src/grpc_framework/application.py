@@ -1,4 +1,5 @@
 import os
+import signal
 import grpc
 import logging
 import inspect
@@ -6,24 +7,34 @@ import asyncio
 import multiprocessing
 import grpc.aio as grpc_aio
 from .core import Service, RPCFunctionMetadata
+from .core.service import endpoint_decorator
 from .core.enums import Interaction
 from .core.lifecycle import LifecycleManager
 from .core.middleware import MiddlewareManager
-from .core.interceptors import RequestContextInterceptor
+from .core.interceptors import RequestContextInterceptor, TimedRequestContextInterceptor
+from .core.routing import RouteTable
 from .core.context import RequestContextManager
-from .core.adaptor import GRPCAdaptor
+from .core.adaptor import GRPCAdaptor, StreamRequest
 from .core.params import ParamParser
 from .core.error_handler import ErrorHandler
+from .core.request.request import Request
 from .core.response.response import Response
 from .core.di.container import DependencyContainer, DependencyScope
-from .utils import get_logger
+from .core.serialization import Serializer, SerializationOffloader
+from .core.metrics import (
+    MetricsRegistry, LoopLagMonitor, StageRecorder, StageStats, CpuStats, AccountedSync2AsyncUtils,
+    InstrumentedExecutor, render_openmetrics
+)
+from .core.profiling import SamplingProfiler, MemoryProfiler
+from .core.tracing import Tracer, RingBufferExporter
+from .utils import get_logger, Sync2AsyncUtils
 from .config import GRPCFrameworkConfig
 from .exceptions import GRPCException
-from typing import Optional, Type, Union
+from typing import Callable, Dict, List, Optional, Type, Union
 from contextvars import ContextVar
 from grpc_reflection.v1alpha import reflection
 from grpc_health.v1 import health_pb2_grpc, health
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 
 
 class _EmptyApplication: ...
@@ -42,6 +53,11 @@ def get_current_app() -> 'GRPCFramework':
     return app
 
 
+METRICS_SERVICE_NAME = 'grpc_framework.Metrics'
+PROFILER_SERVICE_NAME = 'grpc_framework.Profiler'
+MEMORY_PROFILER_SERVICE_NAME = 'grpc_framework.MemoryProfiler'
+
+
 class GRPCFramework:
     """easy grpc apis framework
 
@@ -64,12 +80,14 @@ class GRPCFramework:
         }
         # make interceptors
         self._server_interceptors = [
-            RequestContextInterceptor(self)
+            TimedRequestContextInterceptor(self) if self.config.stage_timing else RequestContextInterceptor(self)
         ]
         if self.config.interceptors is not None:
             self._server_interceptors.extend(self.config.interceptors)
         # make grpc aio server
         self._server: Optional[grpc_aio.Server] = None
+        # all application endpoints: /package.Service/Method -> handler
+        self._route_table = RouteTable()
         # temporarily rpc stub
         self._pending_rpc_stub = []
         # lifecycle manager
@@ -87,6 +105,39 @@ class GRPCFramework:
         )
         self.render_content = self._serializer.serialize
         self.load_content = self._serializer.deserialize
+        # serializers a client can pick per request, see `add_serializer`
+        self._negotiable_serializers: Dict[str, Serializer] = {}
+        # per method metrics in shared memory, created by `run` when `config.metrics` is enabled
+        self.metrics: Optional[MetricsRegistry] = None
+        # per stage durations of every call, only collected when `config.stage_timing` is enabled
+        self.stage_stats: Optional[StageStats] = StageStats() if self.config.stage_timing else None
+        self.stage_recorders: List[StageRecorder] = [self.stage_stats] if self.config.stage_timing else []
+        # sampling profiler of this worker, created at startup when a profiler toggle is configured
+        self.profiler: Optional[SamplingProfiler] = None
+        # memory snapshots of this worker, created at startup when memory tracing or a snapshot toggle is configured
+        self.memory_profiler: Optional[MemoryProfiler] = None
+        self.worker_index = 0
+        # cpu time per method and tenant of this worker, only accounted when `config.cpu_accounting` is enabled
+        self.cpu_stats: Optional[CpuStats] = CpuStats(
+            self.config.cpu_tenant_slots
+        ) if self.config.cpu_accounting else None
+        # runtime executor of this worker, an `InstrumentedExecutor` when `config.executor_metrics` is enabled
+        self.executor: Optional[Executor] = None
+        # event loop lag of this worker, started with the runtime when `config.loop_monitor` is enabled
+        self.loop_monitor: Optional[LoopLagMonitor] = None
+        # rpc traces, the exporter keeps the last finished traces of this worker
+        self.tracer: Optional[Tracer] = Tracer(
+            RingBufferExporter(capacity=self.config.trace_buffer_size),
+            sample_rate=self.config.trace_sample_rate,
+            slow_threshold=self.config.trace_slow_threshold,
+            keep_errors=self.config.trace_keep_errors
+        ) if self.config.tracing else None
+        self.serialization_offloader = SerializationOffloader(self.config.serialization_offload_threshold)
+        # periodic writers of the metrics file and the traces, cancelled at shutdown
+        self._metrics_file_task: Optional[asyncio.Task] = None
+        self._traces_task: Optional[asyncio.Task] = None
+        # the thread pool serializing beside a process executor, shut down with the worker
+        self._serialization_executor: Optional[Executor] = None
         # request hook
         self._request_context_manager = RequestContextManager(self)
         self.before_request = self._request_context_manager.before_request
@@ -94,6 +145,8 @@ class GRPCFramework:
         self.start_request_context = self._request_context_manager.context
         # adaptor
         self._adaptor = GRPCAdaptor(self)
+        # dependency providers run in the executor by their own, created with the runtime
+        self._dependency_s2a: Optional[Sync2AsyncUtils] = None
         # error handler
         self._error_handler = ErrorHandler(self)
         self.add_error_handler = self._error_handler.add_error_handler
@@ -105,15 +158,34 @@ class GRPCFramework:
         # set context var
         _current_app.set(self)
 
+    def add_serializer(self, name: str, serializer: Serializer):
+        """register a serializer a client can select by sending `name` in the `config.codec_metadata_key` metadata
+
+        requests without the metadata, or with an unknown name, use the endpoint serializer.
+        grpc native protobuf decoding is disabled while serializers are registered,
+        the request format is only known once the metadata is read.
+        """
+        self._negotiable_serializers[name] = serializer
+
+    def add_stage_recorder(self, recorder: StageRecorder):
+        """receive the stage durations of every call, `config.stage_timing` must be enabled"""
+        if not self.config.stage_timing:
+            raise RuntimeError('Enable `stage_timing` in the config to record the request stages.')
+        self.stage_recorders.append(recorder)
+
     def dependency_scope(self) -> DependencyScope:
         """Get a dependency scope context manager."""
-        return self.container.scope(self._adaptor.s2a)
+        return self.container.scope(self._dependency_s2a)
 
-    def method(self, request_interaction: Interaction, response_interaction: Interaction):
+    def method(self,
+               request_interaction: Interaction,
+               response_interaction: Interaction,
+               serializer: Optional[Serializer] = None):
         """register an endpoint to root service
 
         :param request_interaction: Interaction type, unary or stream
         :param response_interaction: Interaction type, unary or stream
+        :param serializer: serializer of this endpoint, the application serializer by default
         """
 
         def decorator(func):
@@ -123,27 +195,28 @@ class GRPCFramework:
                 response_interaction=response_interaction,
                 rpc_service=None,
                 return_param_info=ParamParser.parse_return_type(func),
-                input_param_info=ParamParser.parse_input_params(func)
+                input_param_info=ParamParser.parse_input_params(func),
+                serializer=serializer
             )
             return func
 
         return decorator
 
-    def unary_unary(self, func):
-        """register a unary_unary endpoint to root service"""
-        return self.method(Interaction.unary, Interaction.unary)(func)
+    def unary_unary(self, func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
+        """register a unary_unary endpoint to root service, `@app.unary_unary` or `@app.unary_unary(serializer=...)`"""
+        return endpoint_decorator(self.method(Interaction.unary, Interaction.unary, serializer), func)
 
-    def unary_stream(self, func):
-        """register a unary_stream endpoint to root service"""
-        return self.method(Interaction.unary, Interaction.stream)(func)
+    def unary_stream(self, func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
+        """register a unary_stream endpoint to root service, `@app.unary_stream` or `@app.unary_stream(serializer=...)`"""
+        return endpoint_decorator(self.method(Interaction.unary, Interaction.stream, serializer), func)
 
-    def stream_unary(self, func):
-        """register a stream_unary endpoint to root service"""
-        return self.method(Interaction.stream, Interaction.unary)(func)
+    def stream_unary(self, func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
+        """register a stream_unary endpoint to root service, `@app.stream_unary` or `@app.stream_unary(serializer=...)`"""
+        return endpoint_decorator(self.method(Interaction.stream, Interaction.unary, serializer), func)
 
-    def stream_stream(self, func):
-        """register a stream_stream endpoint to root service"""
-        return self.method(Interaction.stream, Interaction.stream)(func)
+    def stream_stream(self, func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
+        """register a stream_stream endpoint to root service, `@app.stream_stream` or `@app.stream_stream(serializer=...)`"""
+        return endpoint_decorator(self.method(Interaction.stream, Interaction.stream, serializer), func)
 
     def add_service(self, svc: Union[Type[Service], Service]):
         """add a function based view or class based view to service
@@ -202,16 +275,35 @@ class GRPCFramework:
         return method_meta
 
     def run(self):
+        if self.config.metrics:
+            # created before the workers start, so every worker shares the same block
+            self.metrics = MetricsRegistry(
+                self._full_method_names(),
+                self.config.workers,
+                cpu_accounting=self.config.cpu_accounting,
+                tenant_slots=self.config.cpu_tenant_slots if self.config.cpu_accounting else 0,
+                executor_metrics=self.config.executor_metrics,
+                loop_monitor=self.config.loop_monitor,
+                serialization_offload=self.config.serialization_offload_threshold is not None
+            )
+        try:
+            self._run_workers()
+        finally:
+            if self.metrics is not None:
+                self.metrics.close()
+                self.metrics = None
+
+    def _run_workers(self):
         if self.config.workers <= 1:
             self._run_single_worker()
             return
         self.logger.info(f'Starting Server with {self.config.workers} workers.')
         processes = []
         try:
-            for _ in range(self.config.workers):
+            for worker_index in range(self.config.workers):
                 p = multiprocessing.Process(
                     target=self._run_single_worker,
-                    args=()
+                    args=(worker_index,)
                 )
                 p.start()
                 processes.append(p)
@@ -235,6 +327,7 @@ class GRPCFramework:
         """register application services to server"""
         for svc_name, data in self._services.items():
             rpc_method_handlers = {}
+            service_name = f'{self.config.package}.{svc_name}'
             for method_name, metadata in data.items():
                 request_interaction = metadata['request_interaction']
                 response_interaction = metadata['response_interaction']
@@ -253,15 +346,20 @@ class GRPCFramework:
                     use_adaptor_wrap = 'wrap_stream_stream_handler'
                 else:
                     raise TypeError(f'got an unknown endpoint type, it is {request_mode}')
+                plan = self._adaptor.compile_plan(metadata, route=(self.config.package, svc_name, method_name))
                 rpc_method_handlers[method_name] = getattr(grpc, use_grpc_handler_func)(
-                    behavior=getattr(self._adaptor, use_adaptor_wrap)(metadata)
+                    behavior=getattr(self._adaptor, use_adaptor_wrap)(plan),
+                    # protobuf typed endpoints are decoded/encoded by grpc, the adaptor gets ready messages
+                    request_deserializer=(
+                        self._adaptor.native_request_deserializer(plan.native_request_type)
+                        if plan.native_request_type is not None else None
+                    ),
+                    response_serializer=self._adaptor.serialize_native_response if plan.native_response else None
                 )
-                service_name = f'{self.config.package}.{svc_name}'
-                generic_handler = grpc.method_handlers_generic_handler(
-                    service_name, rpc_method_handlers
-                )
-                self._server.add_generic_rpc_handlers((generic_handler,))
-                self._server.add_registered_method_handlers(service_name, rpc_method_handlers)
+                self._route_table.add(service_name, method_name, rpc_method_handlers[method_name])
+            self._server.add_registered_method_handlers(service_name, rpc_method_handlers)
+        # one generic handler for every endpoint, registered once
+        self._server.add_generic_rpc_handlers((self._route_table,))
 
     def _enable_reflection(self, _):
         """enable grpc reflection if config reflection"""
@@ -277,7 +375,8 @@ class GRPCFramework:
     def _add_health_check(self, _):
         """add grpc standard health check"""
         if self.config.add_health_check:
-            self.load_rpc_stub(health.HealthServicer, health_pb2_grpc.add_HealthServicer_to_server)
+            # legacy stubs are already registered at this point, add the servicer directly
+            health_pb2_grpc.add_HealthServicer_to_server(health.HealthServicer(), self._server)
 
     async def _server_start(self, _):
         """start server in application context last step"""
@@ -295,10 +394,176 @@ class GRPCFramework:
             except asyncio.CancelledError:
                 pass
 
+    def _full_method_names(self) -> List[str]:
+        return [
+            f'/{self.config.package}.{svc_name}/{method_name}'
+            for svc_name, methods in self._services.items()
+            for method_name in methods
+        ]
+
+    async def _start_metrics(self, _):
+        """serve the metrics snapshot rpc and start writing the snapshot file in the first worker"""
+        if self.metrics is None:
+            return
+        if self.config.metrics_service:
+            async def snapshot(request: bytes, context) -> bytes:
+                return self.metrics_snapshot().encode('utf-8')
+
+            self._server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(
+                METRICS_SERVICE_NAME, {'Snapshot': grpc.unary_unary_rpc_method_handler(snapshot)}
+            ),))
+        if self.config.metrics_file is not None and self.metrics.worker_index == 0:
+            self._metrics_file_task = self.loop.create_task(self._write_metrics_file())
+
+    async def _stop_metrics(self, _):
+        await self._cancel_task(self._metrics_file_task)
+        self._metrics_file_task = None
+
+    async def _write_metrics_file(self):
+        executor = self._background_executor()
+        while True:
+            await asyncio.sleep(self.config.metrics_interval)
+            await self.loop.run_in_executor(executor, self._write_metrics_snapshot)
+
+    def _write_metrics_snapshot(self):
+        path = self.config.metrics_file
+        try:
+            # written aside and renamed, a reader never sees a partial snapshot
+            with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+                f.write(self.metrics_snapshot())
+            os.replace(f'{path}.tmp', path)
+        except OSError as e:
+            self.logger.error(f'Write metrics file `{path}` failed: {e}')
+
+    def metrics_snapshot(self) -> str:
+        """an OpenMetrics text snapshot of every worker, empty when metrics are disabled"""
+        if self.metrics is None:
+            return ''
+        return render_openmetrics(self.metrics)
+
+    async def _start_profiler(self, _):
+        """create the sampling profiler of this worker and install its signal and rpc toggles"""
+        config = self.config
+        if config.profiler_signal is None and not config.profiler_service:
+            return
+        self.profiler = SamplingProfiler(
+            directory=config.profiler_dir,
+            interval=config.profiler_interval,
+            duration=config.profiler_duration,
+            loop=self.loop,
+            name=f'worker{self.worker_index}'
+        )
+        for svc_name, methods in self._services.items():
+            for method_name, metadata in methods.items():
+                self.profiler.add_handler(metadata['handler'], f'/{config.package}.{svc_name}/{method_name}')
+        if config.profiler_signal is not None:
+            try:
+                self.loop.add_signal_handler(getattr(signal, config.profiler_signal), self._toggle_profiler)
+            except (NotImplementedError, RuntimeError) as e:
+                self.logger.warning(f'Can not toggle the profiler by {config.profiler_signal}: {e}')
+        if config.profiler_service:
+            async def start(request: bytes, context) -> bytes:
+                duration = float(request) if request.strip() else None
+                return self.profiler.start(duration).encode('utf-8')
+
+            async def stop(request: bytes, context) -> bytes:
+                return (self.profiler.stop() or '').encode('utf-8')
+
+            self._server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(PROFILER_SERVICE_NAME, {
+                'Start': grpc.unary_unary_rpc_method_handler(start),
+                'Stop': grpc.unary_unary_rpc_method_handler(stop)
+            }),))
+
+    async def _start_memory_profiler(self, _):
+        """create the memory profiler of this worker and install its signal and rpc triggers"""
+        config = self.config
+        if not config.memory_tracing and config.memory_snapshot_signal is None and not config.memory_snapshot_service:
+            return
+        self.memory_profiler = MemoryProfiler(
+            directory=config.profiler_dir,
+            frames=config.memory_trace_frames,
+            top=config.memory_snapshot_top,
+            name=f'worker{self.worker_index}',
+            tracked_types={
+                'Request': Request,
+                'Response': Response,
+                'DependencyScope': DependencyScope,
+                'StreamRequest': StreamRequest
+            }
+        )
+        for svc_name, methods in self._services.items():
+            for method_name, metadata in methods.items():
+                self.memory_profiler.add_handler(metadata['handler'], f'/{config.package}.{svc_name}/{method_name}')
+        if config.memory_tracing:
+            self.memory_profiler.start()
+        if config.memory_snapshot_signal is not None:
+            try:
+                self.loop.add_signal_handler(
+                    getattr(signal, config.memory_snapshot_signal),
+                    lambda: self.loop.create_task(self._write_memory_snapshot())
+                )
+            except (NotImplementedError, RuntimeError) as e:
+                self.logger.warning(f'Can not take memory snapshots by {config.memory_snapshot_signal}: {e}')
+        if config.memory_snapshot_service:
+            async def snapshot(request: bytes, context) -> bytes:
+                return (await self._write_memory_snapshot()).encode('utf-8')
+
+            async def stop(request: bytes, context) -> bytes:
+                self.memory_profiler.stop()
+                return b''
+
+            self._server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(MEMORY_PROFILER_SERVICE_NAME, {
+                'Snapshot': grpc.unary_unary_rpc_method_handler(snapshot),
+                'Stop': grpc.unary_unary_rpc_method_handler(stop)
+            }),))
+
+    async def _write_memory_snapshot(self) -> str:
+        # every traced block is walked, the loop keeps serving meanwhile
+        path = await self.loop.run_in_executor(self._background_executor(), self.memory_profiler.snapshot)
+        self.logger.info(f'- Memory snapshot written to `{path}`')
+        return path
+
+    async def _start_tracing(self, _):
+        """write the traces of this worker to `config.trace_file` periodically"""
+        if self.tracer is None or self.config.trace_file is None:
+            return
+        path = self.config.trace_file
+        if self.config.workers > 1:
+            root, ext = os.path.splitext(path)
+            path = f'{root}.{self.worker_index}{ext}'
+        self.tracer.exporter.path = path
+        self._traces_task = self.loop.create_task(self._write_traces())
+
+    async def _stop_tracing(self, _):
+        """stop the periodic writer and write the traces left"""
+        await self._cancel_task(self._traces_task)
+        self._traces_task = None
+        if self.tracer is not None:
+            await self.loop.run_in_executor(self._background_executor(), self._flush_traces)
+
+    async def _write_traces(self):
+        executor = self._background_executor()
+        while True:
+            await asyncio.sleep(self.config.trace_flush_interval)
+            await self.loop.run_in_executor(executor, self._flush_traces)
+
+    def _flush_traces(self):
+        if self.tracer is None:
+            return
+        try:
+            self.tracer.exporter.flush()
+        except OSError as e:
+            self.logger.error(f'Write traces `{self.tracer.exporter.path}` failed: {e}')
+
+    def _toggle_profiler(self):
+        running = self.profiler.running
+        path = self.profiler.toggle()
+        self.logger.info(f'- Profiler {"stopped, writing" if running else "started, it will write"} `{path}`')
+
     async def _init_error_handler(self, _):
         @self.add_error_handler(GRPCException)
         async def handler(request, error):
-            return self._error_handler.grpc_error_handler(request, error)
+            return await self._error_handler.grpc_error_handler(request, error)
 
     def _log_request(self, response: Response):
         """log request in request context last step"""
@@ -322,12 +587,25 @@ class GRPCFramework:
                     break
             else:
                 options.append(('grpc.so_reuseport', 1))
-        runtime_executor = self._make_execute()
-        self._lifecycle_manager.update_executor(runtime_executor)
+        runtime_executor = self.executor = self._make_execute()
+        self._lifecycle_manager.update_executor(self._executor_for(runtime_executor, 'lifecycle'))
         self._lifecycle_manager.set_loop(self.loop)
-        self._request_context_manager.init_s2a(runtime_executor)
-        self._adaptor.init_s2a(runtime_executor)
-        self._error_handler.init_s2a(runtime_executor)
+        # the executor hops of a call are accounted to it with `config.cpu_accounting`
+        s2a_type = AccountedSync2AsyncUtils if self.config.cpu_accounting else Sync2AsyncUtils
+        self._request_context_manager.init_s2a(self._executor_for(runtime_executor, 'hook'), s2a_type)
+        self._adaptor.init_s2a(self._executor_for(runtime_executor, 'handler'), s2a_type)
+        self._dependency_s2a = s2a_type(self._executor_for(runtime_executor, 'dependency'))
+        self._error_handler.init_s2a(self._executor_for(runtime_executor, 'error_handler'), s2a_type)
+        if self.config.serialization_offload_threshold is not None:
+            serialization_executor = self._make_serialization_executor(runtime_executor)
+            if serialization_executor is not runtime_executor:
+                self._serialization_executor = serialization_executor
+                self._lifecycle_manager.on_shutdown(self._stop_serialization_executor)
+            self.serialization_offloader.init_s2a(s2a_type(
+                self._executor_for(serialization_executor, 'serialization')
+            ))
+            if self.metrics is not None:
+                self.serialization_offloader.init_counters(self.metrics.offload_stats())
         self._server = grpc_aio.server(
             migration_thread_pool=runtime_executor,
             handlers=self.config.grpc_handlers,
@@ -336,16 +614,36 @@ class GRPCFramework:
             maximum_concurrent_rpcs=self.config.maximum_concurrent_rpc,
             compression=self.config.grpc_compression
         )
+        if self.config.loop_monitor:
+            self.loop_monitor = LoopLagMonitor(
+                self.loop,
+                interval=self.config.loop_monitor_interval,
+                stall_threshold=self.config.loop_stall_threshold,
+                # the lag is shared with the other workers when metrics are enabled
+                histogram=self.metrics.loop_lag() if self.metrics is not None else None,
+                logger=self.logger
+            )
+            self.loop_monitor.start()
 
-    def _run_single_worker(self):
+    def _run_single_worker(self, worker_index: int = 0):
+        self.worker_index = worker_index
+        if self.metrics is not None:
+            self.metrics.set_worker(worker_index)
         self._build_runtime()
         self._lifecycle_manager.on_startup(self._register_services_in_service)
         self._lifecycle_manager.on_startup(self._register_legacy_stubs)
         self._lifecycle_manager.on_startup(self._enable_reflection)
         self._lifecycle_manager.on_startup(self._add_health_check)
+        self._lifecycle_manager.on_startup(self._middleware_manager.build)
+        self._lifecycle_manager.on_startup(self._start_metrics)
+        self._lifecycle_manager.on_startup(self._start_profiler)
+        self._lifecycle_manager.on_startup(self._start_memory_profiler)
+        self._lifecycle_manager.on_startup(self._start_tracing)
+        self._lifecycle_manager.on_shutdown(self._stop_metrics)
+        self._lifecycle_manager.on_shutdown(self._stop_tracing)
         self._lifecycle_manager.on_startup(self._init_error_handler)
         self._lifecycle_manager.on_startup(self._server_start, -1)
-        self._request_context_manager.after_request(self._log_request, -1)
+        self._request_context_manager.set_request_logger(self._log_request)
         main_task = self.loop.create_task(self._start())
         try:
             self.logger.info(f'Worker process [{os.getpid()}] started.')
@@ -354,6 +652,8 @@ class GRPCFramework:
             # 子进程只需要处理任务取消，不需要打印 "Shutting down" (由主进程统一管理日志更好)
             pass
         finally:
+            if self.loop_monitor is not None:
+                self.loop_monitor.stop()
             self.loop.run_until_complete(self.loop.shutdown_asyncgens())
             self.loop.close()
 
@@ -364,8 +664,54 @@ class GRPCFramework:
             executor_type = ProcessPoolExecutor
         else:
             raise ValueError('The config `executor_type` only in value range `threading` or `process`.')
+        if self.config.executor_metrics:
+            return InstrumentedExecutor(
+                max_workers=self.config.execute_workers,
+                thread_name_prefix='grpc-framework-executor',
+                # shared with the other workers when metrics are enabled
+                stats=self.metrics.executor_stats() if self.metrics is not None else None,
+                wait_threshold=self.config.executor_wait_threshold,
+                logger=self.logger
+            )
         return executor_type(max_workers=self.config.execute_workers)
 
+    @staticmethod
+    def _executor_for(executor: Executor, subsystem: str) -> Executor:
+        """the view `subsystem` submits to an instrumented executor through, other executors as they are"""
+        if isinstance(executor, InstrumentedExecutor):
+            return executor.labeled(subsystem)
+        return executor
+
+    def _background_executor(self) -> Optional[Executor]:
+        """where the framework writes its files, the `other` view of a thread executor,
+        the loop default beside a process executor that would run them on a copy of the app"""
+        if isinstance(self.executor, ThreadPoolExecutor):
+            return self._executor_for(self.executor, 'other')
+        return None
+
+    @staticmethod
+    async def _cancel_task(task: Optional[asyncio.Task]):
+        """cancel a background task and wait for it to finish"""
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _stop_serialization_executor(self, _):
+        executor, self._serialization_executor = self._serialization_executor, None
+        if executor is not None:
+            # the server is stopped, nothing is serialized anymore
+            await self.loop.run_in_executor(None, executor.shutdown)
+
+    def _make_serialization_executor(self, runtime_executor: Executor) -> Executor:
+        """serializers are not picklable closures, a process executor gets a small thread pool beside it"""
+        if isinstance(runtime_executor, ThreadPoolExecutor):
+            return runtime_executor
+        return ThreadPoolExecutor(max_workers=2, thread_name_prefix='grpc-framework-serialization')
+
     def __getstate__(self):
         state = self.__dict__.copy()
         if 'logger' in state:
@@ -2,6 +2,7 @@ import enum
 from functools import partialmethod, partial
 from typing import Optional, Union, Callable, Any, Tuple, Sequence
 from .channel_pool_manager import GRPCChannelPool
+from ..core.tracing import TRACEPARENT, current_traceparent
 from grpc.aio import Metadata
 
 FullNameType = Union[str, Callable]
@@ -70,6 +71,9 @@ class GRPCClient:
             request_type: a grpc request type, it is a required fields when full_name type is string type
             request_serializer: function scope request serializer, its will take precedence over the global request serializer
             response_deserializer:function scope response deserializer, its will take precedence over the global response deserializer
+
+        inside an rpc handler the `traceparent` of the current trace is added to the metadata,
+        unless the metadata already carries one
         """
         if request_type:
             if isinstance(request_type, str):
@@ -90,7 +94,19 @@ class GRPCClient:
             target_call_func = self.make_call_func(request_type, final_host, final_port)
             call_func = target_call_func(full_name, request_serializer=req_ser,
                                          response_deserializer=res_des)
-        return call_func(request_data, timeout=self.timeout, metadata=metadata)
+        return call_func(request_data, timeout=self.timeout, metadata=self.inject_trace_context(metadata))
+
+    @staticmethod
+    def inject_trace_context(metadata: Optional[MetadataType]) -> Optional[MetadataType]:
+        """propagate the trace of the rpc being handled to the outbound call"""
+        traceparent = current_traceparent()
+        if traceparent is None:
+            return metadata
+        if metadata is None:
+            return ((TRACEPARENT, traceparent),)
+        if any(key == TRACEPARENT for key, _ in metadata):
+            return metadata
+        return (*metadata, (TRACEPARENT, traceparent))
 
     def make_call_func(self, request_type: GRPCRequestType, host: str, port: int):
         channel = self.channel_pool_manager.get(host, port)
@@ -1,5 +1,6 @@
 import os
 import grpc
+import signal
 import importlib
 from dataclasses import dataclass
 from typing import Type, Union, Optional, Sequence, Any, Literal
@@ -52,6 +53,57 @@ class GRPCFrameworkConfig:
         workers: Start multiple grpc services,
             and the configuration of 'grpc.so_reuseport=1' will be added to the 'grpc_options' by default,
             warning: this feature is not available in Windows!
+        serialization_offload_threshold: payload size in bytes from which requests are decoded and responses encoded
+            in the executor instead of the event loop thread, None keeps all serialization inline
+        codec_metadata_key: request metadata key a client sets to the name of a serializer registered
+            with `GRPCFramework.add_serializer` to pick the wire format of the call
+        metrics: record per method call counts, status codes, latency and message size histograms
+            and in flight gauges in shared memory, aggregated over all workers
+        metrics_file: write an OpenMetrics snapshot to this file every `metrics_interval` seconds
+        metrics_interval: seconds between two snapshots written to `metrics_file`
+        metrics_service: serve the OpenMetrics snapshot by the `/grpc_framework.Metrics/Snapshot` rpc,
+            the response is the snapshot text, the request is ignored
+        stage_timing: measure where the time of every call goes (interceptor, middleware, before request hooks,
+            dependencies, deserialization, handler, serialization, after request hooks),
+            the timed call paths are only compiled in when enabled
+        server_timing: send the stage durations of a call to the client as `server-timing` trailing metadata
+        profiler_signal: name of a signal (e.g. 'SIGUSR2') that starts/stops the sampling profiler
+            of the worker receiving it, send it to a worker pid to profile that worker
+        profiler_service: start/stop the sampling profiler by the `/grpc_framework.Profiler/Start`
+            and `/grpc_framework.Profiler/Stop` rpcs, a Start request may carry the duration in seconds as text,
+            both respond with the path of the profile
+        profiler_dir: directory the collapsed stack files and the memory snapshots are written to
+        profiler_interval: seconds between two samples of the profiler
+        profiler_duration: seconds a profile runs at most, it is written to `profiler_dir` afterwards
+        tracing: record rpc traces propagated by the W3C `traceparent` metadata,
+            with child spans for dependencies, deserialization, handler and serialization
+        trace_sample_rate: share of new traces recorded, a request continuing a trace follows its sampled flag
+        trace_slow_threshold: seconds from which a request that was not sampled is kept anyway
+        trace_keep_errors: keep requests that were not sampled and failed
+        trace_file: json lines file every worker writes its last `trace_buffer_size` traces to,
+            the worker index is added to the name when there are several workers
+        trace_buffer_size: number of finished traces a worker keeps
+        trace_flush_interval: seconds between two writes of `trace_file`
+        loop_monitor: measure the event loop lag of every worker, it is exported with the metrics when enabled,
+            a loop blocked longer than `loop_stall_threshold` is logged with its stack and rpc method
+        loop_monitor_interval: seconds between two lag measurements
+        loop_stall_threshold: seconds the event loop is blocked before the stall is reported
+        cpu_accounting: account the cpu time every call spends on the event loop and in executor threads,
+            per method and per tenant, it is exported with the metrics when enabled
+        cpu_tenant_key: metadata key naming the tenant of a call, all calls share one tenant when None
+        cpu_tenant_slots: tenants accounted per worker, further tenants are summed up as `<other>`
+        executor_metrics: count the submitted, queued and running calls of the runtime executor
+            and their queue wait by subsystem (handler, dependency, hook, ...), exported with the metrics when enabled,
+            a call waiting longer than `executor_wait_threshold` is logged with the methods occupying the threads
+        executor_wait_threshold: seconds a call waits for an executor thread before the saturation is reported
+        memory_tracing: trace the allocations of every worker with tracemalloc from its start,
+            else the first memory snapshot starts tracing and is the baseline
+        memory_snapshot_signal: name of a signal (e.g. 'SIGUSR1') that writes a memory snapshot of the worker
+            receiving it, diffed with its previous snapshot
+        memory_snapshot_service: write memory snapshots by the `/grpc_framework.MemoryProfiler/Snapshot` rpc,
+            it responds with the path of the snapshot, `/grpc_framework.MemoryProfiler/Stop` stops tracing
+        memory_trace_frames: frames kept per traced allocation, deep enough to reach the endpoint handlers
+        memory_snapshot_top: source lines written per memory snapshot
     """
 
     package: str = 'grpc'
@@ -73,6 +125,39 @@ class GRPCFrameworkConfig:
     maximum_concurrent_rpc: Optional[int] = None
     grpc_compression: Optional[grpc.Compression] = None
     workers: int = 1
+    serialization_offload_threshold: Optional[int] = None
+    codec_metadata_key: str = 'x-grpc-codec'
+    metrics: bool = False
+    metrics_file: Optional[str] = None
+    metrics_interval: float = 10.0
+    metrics_service: bool = False
+    stage_timing: bool = False
+    server_timing: bool = False
+    profiler_signal: Optional[str] = None
+    profiler_service: bool = False
+    profiler_dir: str = 'profiles'
+    profiler_interval: float = 0.005
+    profiler_duration: float = 30.0
+    tracing: bool = False
+    trace_sample_rate: float = 0.01
+    trace_slow_threshold: Optional[float] = None
+    trace_keep_errors: bool = True
+    trace_file: Optional[str] = None
+    trace_buffer_size: int = 1000
+    trace_flush_interval: float = 5.0
+    loop_monitor: bool = False
+    loop_monitor_interval: float = 0.05
+    loop_stall_threshold: float = 0.1
+    cpu_accounting: bool = False
+    cpu_tenant_key: Optional[str] = None
+    cpu_tenant_slots: int = 64
+    executor_metrics: bool = False
+    executor_wait_threshold: float = 0.1
+    memory_tracing: bool = False
+    memory_snapshot_signal: Optional[str] = None
+    memory_snapshot_service: bool = False
+    memory_trace_frames: int = 32
+    memory_snapshot_top: int = 50
 
     @classmethod
     def from_file(cls, filename: FilePath, options: ConfigParserOptions = None) -> 'GRPCFrameworkConfig':
@@ -119,3 +204,38 @@ class GRPCFrameworkConfig:
             raise ValueError("The number of workers started is at least 1.")
         if self.execute_workers < 1:
             raise ValueError("The number of execute_workers started is at least 1.")
+        if self.serialization_offload_threshold is not None and self.serialization_offload_threshold < 1:
+            raise ValueError("The `serialization_offload_threshold` is at least 1 byte.")
+        if (self.metrics_file is not None or self.metrics_service) and not self.metrics:
+            raise ValueError("Enable `metrics` to use `metrics_file` or `metrics_service`.")
+        if self.metrics_interval <= 0:
+            raise ValueError("The `metrics_interval` must be greater than 0.")
+        if self.server_timing and not self.stage_timing:
+            raise ValueError("Enable `stage_timing` to use `server_timing`.")
+        if self.profiler_signal is not None and not isinstance(
+                getattr(signal, self.profiler_signal, None), signal.Signals):
+            raise ValueError(f"Unknown `profiler_signal` {self.profiler_signal!r}, set a name like 'SIGUSR2'.")
+        if self.profiler_interval <= 0 or self.profiler_duration <= 0:
+            raise ValueError("The `profiler_interval` and `profiler_duration` must be greater than 0.")
+        if not 0 <= self.trace_sample_rate <= 1:
+            raise ValueError("The `trace_sample_rate` must be between 0 and 1.")
+        if self.trace_buffer_size < 1 or self.trace_flush_interval <= 0:
+            raise ValueError("The `trace_buffer_size` is at least 1 and `trace_flush_interval` greater than 0.")
+        if self.trace_file is not None and not self.tracing:
+            raise ValueError("Enable `tracing` to use `trace_file`.")
+        if self.loop_monitor_interval <= 0 or self.loop_stall_threshold <= 0:
+            raise ValueError("The `loop_monitor_interval` and `loop_stall_threshold` must be greater than 0.")
+        if self.cpu_tenant_slots < 1:
+            raise ValueError("The `cpu_tenant_slots` must be at least 1.")
+        if self.executor_metrics and self.executor_type != 'threading':
+            raise ValueError("The `executor_metrics` require the `threading` executor type.")
+        if self.executor_wait_threshold <= 0:
+            raise ValueError("The `executor_wait_threshold` must be greater than 0.")
+        if self.memory_snapshot_signal is not None and not isinstance(
+                getattr(signal, self.memory_snapshot_signal, None), signal.Signals):
+            raise ValueError(f"Unknown `memory_snapshot_signal` {self.memory_snapshot_signal!r}, "
+                             f"set a name like 'SIGUSR1'.")
+        if self.memory_snapshot_signal is not None and self.memory_snapshot_signal == self.profiler_signal:
+            raise ValueError("The `memory_snapshot_signal` and `profiler_signal` must be different signals.")
+        if self.memory_trace_frames < 1 or self.memory_snapshot_top < 0:
+            raise ValueError("The `memory_trace_frames` is at least 1 and `memory_snapshot_top` not negative.")
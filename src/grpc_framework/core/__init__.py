@@ -1,9 +1,9 @@
 from .serialization import (
     Serializer, TransportCodec,
-    ModelConverter, JsonProtobufConverter,
-    ORJSONCodec, JSONCodec, ProtobufCodec,
+    ModelConverter, JsonProtobufConverter, CompiledJsonProtobufConverter,
+    ORJSONCodec, JSONCodec, ProtobufCodec, MsgPackCodec,
     JsonConverter, ProtobufConverter, DataclassesCodec,
-    DataclassesConverter
+    DataclassesConverter, SchemaModelConverter
 )
 from .service import (
     rpc, Service, RPCFunctionMetadata,
@@ -11,7 +11,7 @@ from .service import (
 )
 from .adaptor import (
     GRPCAdaptor, RequestAdaptor,
-    StreamRequest
+    StreamRequest, ReusableStreamRequest
 )
 from .error_handler import (
     ErrorHandler
@@ -25,11 +25,14 @@ __all__ = [
     'JSONCodec',
     'ORJSONCodec',
     'ProtobufCodec',
+    'MsgPackCodec',
     'JsonProtobufConverter',
+    'CompiledJsonProtobufConverter',
     'JsonConverter',
     'ProtobufConverter',
     'DataclassesConverter',
     'DataclassesCodec',
+    'SchemaModelConverter',
 
     # service
     'rpc',
@@ -44,6 +47,7 @@ __all__ = [
     'GRPCAdaptor',
     'RequestAdaptor',
     'StreamRequest',
+    'ReusableStreamRequest',
 
     # error handler
     'ErrorHandler'
@@ -1,9 +1,14 @@
 from .grpc_adaptor import GRPCAdaptor
 from .request_adaptor import RequestAdaptor
-from .domain import StreamRequest
+from .domain import StreamRequest, ReusableStreamRequest
+from .invocation_plan import InvocationPlan, ArgumentResolver, NegotiatedSerializer
 
 __all__ = [
     'GRPCAdaptor',
     'RequestAdaptor',
-    'StreamRequest'
+    'StreamRequest',
+    'ReusableStreamRequest',
+    'InvocationPlan',
+    'ArgumentResolver',
+    'NegotiatedSerializer'
 ]
@@ -1,4 +1,7 @@
 from typing import Any, Optional, Callable, Generic, AsyncIterator
+from google.protobuf.message import Message
+from ..serialization.message_pool import MessagePool
+from ..serialization.offload import SerializationOffloader
 from ...types import AsyncIteratorType, T
 from ..request.request import Request
 from ..params.domain import ParamInfo
@@ -22,12 +25,57 @@ class StreamRequest(Generic[T]):
     def __init__(self,
                  request: Request,
                  deserialization_handler: Callable,
-                 model_type: Optional[ParamInfo] = None):
+                 model_type: Optional[ParamInfo] = None,
+                 offloader: Optional[SerializationOffloader] = None):
         self.request = request
         self.request_iter = request.request_bytes
         self.deserialization_handler = deserialization_handler
         self.model_type = model_type
+        self.offloader = offloader
 
     async def __aiter__(self) -> AsyncIterator[T]:
+        if self.offloader is None:
+            async for item in self.request_iter:
+                yield self.deserialization_handler(item, self.model_type)
+            return
+        # large items are decoded in the executor
+        offloader = self.offloader
         async for item in self.request_iter:
-            yield self.deserialization_handler(item, self.model_type)
+            if offloader.should_offload_request(item):
+                yield await offloader.decode(self.deserialization_handler, item, self.model_type)
+            else:
+                yield self.deserialization_handler(item, self.model_type)
+
+
+class ReusableStreamRequest(StreamRequest[T]):
+    """a stream request of protobuf messages that reuses message instances instead of allocating one per item
+
+    the items are parsed into a ring of `pool_size` pooled messages,
+    an item is only valid until `pool_size` more items are read, keep it longer with `retain`.
+    subclass it as `class Window(ReusableStreamRequest[T])` and set `pool_size` for a larger window.
+    messages are only pooled for the binary protobuf serializer, otherwise it behaves like `StreamRequest`
+    and `retain` returns the item as it is.
+
+    eg.
+    >>> async def ingest(points: ReusableStreamRequest[Point]):
+    >>>     async for point in points:
+    >>>         if point.alert:
+    >>>             alerts.append(points.retain(point))
+
+    """
+    pool_size: int = 1
+
+    def __init__(self,
+                 request: Request,
+                 deserialization_handler: Callable,
+                 model_type: Optional[ParamInfo] = None,
+                 offloader: Optional[SerializationOffloader] = None):
+        super().__init__(request, deserialization_handler, model_type, offloader)
+        # the items are pooled when they are parsed by a `MessagePool`
+        self.pooled = isinstance(getattr(deserialization_handler, '__self__', None), MessagePool)
+
+    def retain(self, item: T) -> T:
+        """copy an item so it survives the reuse of its message, items that are not pooled are kept as they are"""
+        if self.pooled and isinstance(item, Message):
+            return MessagePool.retain(item)
+        return item
@@ -1,12 +1,23 @@
+import time
+import grpc
+import asyncio
 import inspect
+from dataclasses import replace
 from functools import partial
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Tuple, Type, Optional, Union, get_origin
 from grpc.aio import ServicerContext
-from .request_adaptor import RequestAdaptor
-from .response_adaptor import ResponseAdaptor
-from ..enums import Interaction
+from google.protobuf.message import Message
+from .request_adaptor import RequestAdaptor, TimedRequestAdaptor, UndecodableMessage
+from .response_adaptor import ResponseAdaptor, TimedResponseAdaptor
+from .domain import ReusableStreamRequest
+from .invocation_plan import InvocationPlan, ArgumentResolver, NegotiatedSerializer
+from .union_decoder import UnionDecoder
+from ..enums import Interaction, HandlerType
 from ..params import ParamInfo
-from ..request.request import Request
+from ..serialization import Serializer, ProtobufCodec, ProtobufConverter
+from ..metrics import MethodMetrics, StageTimer, CpuAccount, NO_TENANT, NO_STAGE_TIMER, metered
+from ..tracing import Trace, Tracer
+from ..request.request import Request, RouteType
 from ..response.response import Response
 from ...exceptions import GRPCException
 from ...utils import Sync2AsyncUtils
@@ -14,10 +25,84 @@ from ..service import RPCFunctionMetadata
 from ..di.depends import Depends
 from concurrent.futures import ThreadPoolExecutor
 
+RAW_BUFFER_TYPES = (bytes, memoryview)
+# `ServicerContext.code()` may report the integer value of a status code
+STATUS_NAMES = {code.value[0]: code.name for code in grpc.StatusCode}
+
 if TYPE_CHECKING:
     from ...application import GRPCFramework
 
 
+class _EmptyDependencyScope:
+    """stand-in scope for endpoints without any dependency, nothing is allocated or resolved"""
+
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return None
+
+
+class _MeasuredCall:
+    """records a call in the method metrics, around a unary or a streaming response alike"""
+    __slots__ = ('metrics', 'context', 'started')
+
+    def __init__(self, metrics: MethodMetrics, context: ServicerContext):
+        self.metrics = metrics
+        self.context = context
+        self.started = 0.0
+
+    def __enter__(self):
+        self.metrics.start()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            code = self.context.code()
+        elif issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+            code = grpc.StatusCode.CANCELLED
+        else:
+            code = grpc.StatusCode.UNKNOWN
+        self.metrics.finish(self.started, code)
+        return False
+
+
+class _TracedCall:
+    """traces a call, or only measures it for tail sampling, around a unary or a streaming response alike"""
+    __slots__ = ('tracer', 'method', 'context', 'request', 'trace', 'started')
+
+    def __init__(self, tracer: Tracer, method: str, context: ServicerContext):
+        self.tracer = tracer
+        self.method = method
+        self.context = context
+        self.request: Optional[Request] = None
+        self.trace: Optional[Trace] = None
+        self.started = 0
+
+    def __enter__(self):
+        self.request = Request.current()
+        self.trace = self.tracer.start(self.request, self.method)
+        if self.trace is None and self.tracer.tail_sampling:
+            self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            status = GRPCAdaptor.status_name(self.context.code())
+        elif issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+            status = 'CANCELLED'
+        elif issubclass(exc_type, Exception):
+            status = GRPCAdaptor.status_name(self.context.code(), default='UNKNOWN')
+        else:
+            status = 'UNKNOWN'
+        if self.trace is not None:
+            self.tracer.finish(self.trace, status)
+        elif self.started:
+            self.tracer.finish_unsampled(self.request, self.method, self.started, status)
+        return False
+
+
 class GRPCAdaptor:
     """grpc adaptor, its will adaptation one request dispatch
 
@@ -29,150 +114,576 @@ class GRPCAdaptor:
         self.app = app
         self.s2a = None
 
-    def wrap_unary_unary_handler(self, rpc_metadata: RPCFunctionMetadata):
+    def compile_plan(self, rpc_metadata: RPCFunctionMetadata, route: Optional[RouteType] = None) -> InvocationPlan:
+        """compile an endpoint into an invocation plan, all introspection happens here once"""
+        handler = rpc_metadata['handler']
+        if inspect.iscoroutinefunction(handler):
+            handler_type = HandlerType.coroutine
+        elif inspect.isasyncgenfunction(handler):
+            handler_type = HandlerType.async_generator
+        elif inspect.isgeneratorfunction(handler):
+            handler_type = HandlerType.generator
+        else:
+            handler_type = HandlerType.function
+        input_params = rpc_metadata['input_param_info']
+        service_class = rpc_metadata['rpc_service'] if inspect.isclass(rpc_metadata['rpc_service']) else None
+        service_dependencies = ()
+        param_names = list(input_params.keys())
+        if service_class is not None:
+            # cbv mode, the first argument is the service instance
+            service_dependencies = self.collect_service_dependencies(service_class)
+            param_names = param_names[1:]
+        serializer = self.resolve_serializer(rpc_metadata)
+        # with per request codec negotiation the wire format is unknown until the metadata is read
+        negotiable = self.app._negotiable_serializers
+        keyword_only = self.keyword_only_params(handler)
+        arguments = []
+        for key in param_names:
+            param_info = input_params[key]
+            raw_type = self.raw_buffer_type(param_info)
+            pooled_stream = self.pooled_stream_type(param_info, serializer) if not negotiable else None
+            keyword = key in keyword_only
+            if self.is_dependency(param_info):
+                argument = ArgumentResolver(
+                    name=key, param_info=param_info, dependency=self.extract_dependency_key(param_info),
+                    keyword=keyword
+                )
+            elif raw_type is not None:
+                argument = ArgumentResolver(name=key, param_info=param_info, raw_type=raw_type, keyword=keyword)
+            elif pooled_stream is not None:
+                argument = ArgumentResolver(
+                    name=key, param_info=param_info, pooled_stream=pooled_stream, keyword=keyword
+                )
+            else:
+                argument = ArgumentResolver(
+                    name=key, param_info=param_info,
+                    union_decoder=UnionDecoder.build(
+                        [*(param_info.union_types or []), *(param_info.generic_args or [])], serializer
+                    ),
+                    keyword=keyword
+                )
+            arguments.append(argument)
+        native_response = not negotiable and self.is_native_protobuf(serializer)
+        native_request_type = self.native_request_type(arguments) if native_response else None
+        if native_request_type is not None:
+            # grpc decodes the request, the arguments receive the message as it is
+            arguments = [
+                argument if argument.dependency is not None else replace(argument, raw_type=native_request_type)
+                for argument in arguments
+            ]
+        return InvocationPlan(
+            metadata=rpc_metadata,
+            handler=handler,
+            handler_type=handler_type,
+            service_class=service_class,
+            service_dependencies=service_dependencies,
+            arguments=tuple(arguments),
+            need_dependency=bool(service_dependencies) or any(arg.dependency is not None for arg in arguments),
+            serializer=serializer,
+            route=route,
+            union_decoders={
+                argument.name: argument.union_decoder
+                for argument in arguments
+                if argument.union_decoder is not None
+            },
+            raw_types={
+                argument.name: argument.raw_type
+                for argument in arguments
+                if argument.raw_type is not None
+            },
+            pooled_streams={
+                argument.name: argument.pooled_stream
+                for argument in arguments
+                if argument.pooled_stream is not None
+            },
+            native_request_type=native_request_type,
+            native_response=native_response,
+            metrics=self.method_metrics(route),
+            stage_timing=self.app.config.stage_timing,
+            request_adaptor_type=TimedRequestAdaptor if self.app.config.stage_timing else RequestAdaptor,
+            response_adaptor_type=TimedResponseAdaptor if self.app.config.stage_timing else ResponseAdaptor,
+            negotiated_serializers={
+                name: NegotiatedSerializer(
+                    serializer=negotiated,
+                    union_decoders={
+                        argument.name: UnionDecoder.build(
+                            [*(argument.param_info.union_types or []), *(argument.param_info.generic_args or [])],
+                            negotiated
+                        )
+                        for argument in arguments
+                        if argument.union_decoder is not None
+                    }
+                )
+                for name, negotiated in negotiable.items()
+            }
+        )
+
+    def method_metrics(self, route: Optional[RouteType]) -> Optional[MethodMetrics]:
+        """the metrics row of an endpoint in this worker"""
+        if self.app.metrics is None or route is None:
+            return None
+        package, service_name, method_name = route
+        return self.app.metrics.method(f'/{package}.{service_name}/{method_name}')
+
+    def resolve_serializer(self, rpc_metadata: RPCFunctionMetadata) -> Serializer:
+        """the endpoint serializer, else the service serializer, else the application serializer"""
+        serializer = rpc_metadata.get('serializer')
+        if serializer is None:
+            serializer = getattr(rpc_metadata['rpc_service'], 'serializer', None)
+        if serializer is None:
+            serializer = self.app._serializer
+        return serializer
+
+    def wrap_unary_unary_handler(self, plan: InvocationPlan):
         """wrap unary_unary endpoint"""
+        respond = self.select_unary_response(plan)
+        dispatch = self.select_dispatch(plan)
 
         async def wrapper(request_bytes: Any, context: ServicerContext):
             request_adaptor = self.make_request_adaptor(
                 request_bytes=request_bytes,
                 context=context,
-                request_metadata=rpc_metadata,
+                plan=plan,
                 interaction_type=Interaction.unary
             )
-            await self.app.dispatch(request_adaptor.request, request_adaptor.request.grpc_context)
-            return await self.unary_response(request_adaptor, rpc_metadata)
+            await dispatch(request_adaptor.request, request_adaptor.request.grpc_context)
+            return await respond(request_adaptor, plan)
 
-        return wrapper
+        wrapper = self.instrument_unary_stages(plan, wrapper)
+        wrapper = self.instrument_unary_trace(plan, wrapper)
+        wrapper = self.instrument_unary_cpu(plan, wrapper)
+        return self.instrument_unary_response(plan, wrapper, stream_request=False)
 
-    def wrap_unary_stream_handler(self, rpc_metadata: RPCFunctionMetadata):
+    def wrap_unary_stream_handler(self, plan: InvocationPlan):
         """wrap unary_stream endpoint"""
+        stream = self.select_stream_response(plan)
+        dispatch = self.select_dispatch(plan)
 
         async def wrapper(request_bytes: Any, context: ServicerContext):
             request_adaptor = self.make_request_adaptor(
                 request_bytes=request_bytes,
                 context=context,
-                request_metadata=rpc_metadata,
+                plan=plan,
                 interaction_type=Interaction.unary
             )
-            await self.app.dispatch(request_adaptor.request, request_adaptor.request.grpc_context)
-            async for response in self.stream_response(request_adaptor, rpc_metadata):
+            await dispatch(request_adaptor.request, request_adaptor.request.grpc_context)
+            async for response in stream(request_adaptor, plan):
                 yield response
 
-        return wrapper
+        wrapper = self.instrument_stream_stages(plan, wrapper)
+        wrapper = self.instrument_stream_trace(plan, wrapper)
+        wrapper = self.instrument_stream_cpu(plan, wrapper)
+        return self.instrument_stream_response(plan, wrapper, stream_request=False)
 
-    def wrap_stream_unary_handler(self, rpc_metadata: RPCFunctionMetadata):
+    def wrap_stream_unary_handler(self, plan: InvocationPlan):
         """wrap stream_unary endpoint"""
+        respond = self.select_unary_response(plan)
+        dispatch = self.select_dispatch(plan)
 
         async def wrapper(request_bytes: Any, context: ServicerContext):
             request_adaptor = self.make_request_adaptor(
                 request_bytes=request_bytes,
                 context=context,
-                request_metadata=rpc_metadata,
+                plan=plan,
                 interaction_type=Interaction.stream
             )
-            await self.app.dispatch(request_adaptor.request, request_adaptor.request.grpc_context)
-            return await self.unary_response(request_adaptor, rpc_metadata)
+            await dispatch(request_adaptor.request, request_adaptor.request.grpc_context)
+            return await respond(request_adaptor, plan)
 
-        return wrapper
+        wrapper = self.instrument_unary_stages(plan, wrapper)
+        wrapper = self.instrument_unary_trace(plan, wrapper)
+        wrapper = self.instrument_unary_cpu(plan, wrapper)
+        return self.instrument_unary_response(plan, wrapper, stream_request=True)
 
-    def wrap_stream_stream_handler(self, rpc_metadata: RPCFunctionMetadata):
+    def wrap_stream_stream_handler(self, plan: InvocationPlan):
         """wrap stream_stream endpoint"""
+        stream = self.select_stream_response(plan)
+        dispatch = self.select_dispatch(plan)
 
         async def wrapper(request_bytes: Any, context: ServicerContext):
             request_adaptor = self.make_request_adaptor(
                 request_bytes=request_bytes,
                 context=context,
-                request_metadata=rpc_metadata,
+                plan=plan,
                 interaction_type=Interaction.stream
             )
-            await self.app.dispatch(request_adaptor.request, request_adaptor.request.grpc_context)
-            async for response in self.stream_response(request_adaptor, rpc_metadata):
+            await dispatch(request_adaptor.request, request_adaptor.request.grpc_context)
+            async for response in stream(request_adaptor, plan):
+                yield response
+
+        wrapper = self.instrument_stream_stages(plan, wrapper)
+        wrapper = self.instrument_stream_trace(plan, wrapper)
+        wrapper = self.instrument_stream_cpu(plan, wrapper)
+        return self.instrument_stream_response(plan, wrapper, stream_request=True)
+
+    @staticmethod
+    def instrument_unary_response(plan: InvocationPlan, wrapper, stream_request: bool = False):
+        """record the call in the method metrics, the wrapper is returned as it is when metrics are disabled"""
+        metrics = plan.metrics
+        if metrics is None:
+            return wrapper
+
+        async def instrumented(request_bytes: Any, context: ServicerContext):
+            with _MeasuredCall(metrics, context):
+                if stream_request:
+                    request_bytes = metrics.observe_request_stream(request_bytes)
+                else:
+                    metrics.observe_request(request_bytes)
+                response = await wrapper(request_bytes, context)
+                code = context.code()
+                if code is None or code == 0 or code is grpc.StatusCode.OK:
+                    metrics.observe_response(response)
+                return response
+
+        return instrumented
+
+    @staticmethod
+    def instrument_stream_response(plan: InvocationPlan, wrapper, stream_request: bool = False):
+        """`instrument_unary_response` for endpoints streaming their responses, every item is measured"""
+        metrics = plan.metrics
+        if metrics is None:
+            return wrapper
+
+        async def instrumented(request_bytes: Any, context: ServicerContext):
+            with _MeasuredCall(metrics, context):
+                if stream_request:
+                    request_bytes = metrics.observe_request_stream(request_bytes)
+                else:
+                    metrics.observe_request(request_bytes)
+                async for response in wrapper(request_bytes, context):
+                    metrics.observe_response(response)
+                    yield response
+
+        return instrumented
+
+    def instrument_unary_stages(self, plan: InvocationPlan, wrapper):
+        """report the stage durations of a call, the wrapper is returned as it is when stage timing is disabled"""
+        if not plan.stage_timing:
+            return wrapper
+        method = self.full_method_name(plan)
+
+        async def timed(request_bytes: Any, context: ServicerContext):
+            stage_timer = Request.current().stage_timer
+            response = await wrapper(request_bytes, context)
+            self.report_stages(method, stage_timer, context)
+            return response
+
+        return timed
+
+    def instrument_stream_stages(self, plan: InvocationPlan, wrapper):
+        """`instrument_unary_stages` for endpoints streaming their responses"""
+        if not plan.stage_timing:
+            return wrapper
+        method = self.full_method_name(plan)
+
+        async def timed(request_bytes: Any, context: ServicerContext):
+            stage_timer = Request.current().stage_timer
+            async for response in wrapper(request_bytes, context):
                 yield response
+            self.report_stages(method, stage_timer, context)
+
+        return timed
+
+    def instrument_unary_trace(self, plan: InvocationPlan, wrapper):
+        """trace the call, the wrapper is returned as it is when tracing is disabled"""
+        tracer = self.app.tracer
+        if tracer is None:
+            return wrapper
+        method = self.full_method_name(plan)
+
+        async def traced(request_bytes: Any, context: ServicerContext):
+            with _TracedCall(tracer, method, context):
+                return await wrapper(request_bytes, context)
+
+        return traced
+
+    def instrument_stream_trace(self, plan: InvocationPlan, wrapper):
+        """`instrument_unary_trace` for endpoints streaming their responses"""
+        tracer = self.app.tracer
+        if tracer is None:
+            return wrapper
+        method = self.full_method_name(plan)
+
+        async def traced(request_bytes: Any, context: ServicerContext):
+            with _TracedCall(tracer, method, context):
+                async for response in wrapper(request_bytes, context):
+                    yield response
+
+        return traced
+
+    def instrument_unary_cpu(self, plan: InvocationPlan, wrapper):
+        """account the cpu time of the call, the wrapper is returned as it is when cpu accounting is disabled"""
+        if self.app.cpu_stats is None:
+            return wrapper
+        method = self.full_method_name(plan)
+
+        async def accounted(request_bytes: Any, context: ServicerContext):
+            account = CpuAccount(self.tenant_of(Request.current()))
+            token = account.activate()
+            try:
+                return await metered(wrapper(request_bytes, context), account)
+            finally:
+                account.deactivate(token)
+                self.report_cpu(method, plan.metrics, account)
+
+        return accounted
+
+    def instrument_stream_cpu(self, plan: InvocationPlan, wrapper):
+        """`instrument_unary_cpu` for endpoints streaming their responses, every item is metered"""
+        if self.app.cpu_stats is None:
+            return wrapper
+        method = self.full_method_name(plan)
+
+        async def accounted(request_bytes: Any, context: ServicerContext):
+            account = CpuAccount(self.tenant_of(Request.current()))
+            # not reset, the generator may be closed from another context; it lives as long as the call task
+            account.activate()
+            responses = wrapper(request_bytes, context)
+            try:
+                while True:
+                    try:
+                        response = await metered(responses.__anext__(), account)
+                    except StopAsyncIteration:
+                        break
+                    yield response
+            finally:
+                await metered(responses.aclose(), account)
+                self.report_cpu(method, plan.metrics, account)
+
+        return accounted
+
+    def tenant_of(self, request: Request) -> str:
+        """the tenant a call is accounted to, read from the `config.cpu_tenant_key` metadata"""
+        key = self.app.config.cpu_tenant_key
+        if key is None:
+            return NO_TENANT
+        tenant = request.get_metadata(key)
+        if tenant is None:
+            return NO_TENANT
+        return tenant.decode('utf-8', 'replace') if isinstance(tenant, bytes) else str(tenant)
+
+    def report_cpu(self, method: str, metrics: Optional[MethodMetrics], account: CpuAccount):
+        """pass the cpu time of a finished call to the cpu stats, and to the shared metrics when enabled"""
+        wall = account.wall()
+        self.app.cpu_stats.record(method, account, wall)
+        if metrics is not None:
+            metrics.observe_cpu(account.loop_cpu, account.executor_cpu)
+            tenant_metrics = self.app.metrics.tenant(account.tenant)
+            if tenant_metrics is not None:
+                tenant_metrics.observe(account.loop_cpu, account.executor_cpu, wall)
+
+    @staticmethod
+    def status_name(code: Union[grpc.StatusCode, int, None], default: str = 'OK') -> str:
+        """name of the status code a handler set, `default` when none was set"""
+        if code is None:
+            return default
+        if isinstance(code, grpc.StatusCode):
+            return code.name
+        return STATUS_NAMES.get(code, default)
+
+    def report_stages(self, method: str, stage_timer: StageTimer, context: ServicerContext):
+        """pass the durations to the stage recorders, and to the client when `config.server_timing`"""
+        for recorder in self.app.stage_recorders:
+            recorder.record(method, stage_timer.durations)
+        if self.app.config.server_timing:
+            # keep the trailing metadata the endpoint has set
+            context.set_trailing_metadata(
+                (*(context.trailing_metadata() or ()), ('server-timing', stage_timer.server_timing()))
+            )
 
-        return wrapper
+    @staticmethod
+    def full_method_name(plan: InvocationPlan) -> str:
+        if plan.route is None:
+            return plan.handler.__qualname__
+        package, service_name, method_name = plan.route
+        return f'/{package}.{service_name}/{method_name}'
 
     def make_request_adaptor(self,
                              request_bytes: Any,
                              context: ServicerContext,
                              interaction_type: Interaction,
-                             request_metadata: RPCFunctionMetadata) -> RequestAdaptor:
+                             plan: InvocationPlan) -> RequestAdaptor:
         """make a request adaptor for a once request"""
         request = self.adapt_request(Request.current(), request_bytes, context)
-        request.current_request_metadata = request_metadata
-        request_adaptor = RequestAdaptor(
+        request.current_request_metadata = plan.metadata
+        request.set_route(plan.route)
+        request.native_response = plan.native_response
+        serializer, union_decoders = plan.serializer, plan.union_decoders
+        if plan.negotiated_serializers:
+            # the client picks the wire format, unknown names keep the endpoint serializer
+            codec = request.get_metadata(self.app.config.codec_metadata_key)
+            negotiated = plan.negotiated_serializers.get(codec)
+            if negotiated is not None:
+                serializer, union_decoders = negotiated.serializer, negotiated.union_decoders
+        request.serializer = serializer
+        profiler = self.app.profiler
+        if profiler is not None and profiler.running:
+            # the samples of the event loop thread are attributed to the task running the call
+            profiler.tag_task(request.full_method)
+        loop_monitor = self.app.loop_monitor
+        if loop_monitor is not None:
+            loop_monitor.tag_task(request.full_method)
+        request_adaptor = plan.request_adaptor_type(
             interaction_type=interaction_type,
             app=self.app,
             request=request,
-            input_param_info=request_metadata['input_param_info']
+            input_param_info=plan.metadata['input_param_info'],
+            serializer=serializer,
+            union_decoders=union_decoders,
+            raw_types=plan.raw_types,
+            pooled_streams=plan.pooled_streams,
+            offloader=self.app.serialization_offloader if self.app.serialization_offloader.enabled else None
         )
         return request_adaptor
 
-    async def unary_response(self, request_adaptor: RequestAdaptor, rpc_metadata: RPCFunctionMetadata):
-        """handle unary endpoint"""
+    def open_dependency_scope(self, plan: InvocationPlan):
+        """open a dependency scope only when the plan needs to resolve dependencies"""
+        if plan.need_dependency:
+            return self.app.dependency_scope()
+        return _EmptyDependencyScope()
+
+    def select_dispatch(self, plan: InvocationPlan):
+        """the middleware chain, timed when the plan is compiled with stage timing"""
+        if plan.stage_timing:
+            return self.timed_dispatch
+        return self.app.dispatch
+
+    def select_unary_response(self, plan: InvocationPlan):
+        """an untimed coroutine handler can be awaited directly, everything else goes through call_handler"""
+        if plan.handler_type is HandlerType.coroutine and not plan.stage_timing:
+            return self.direct_unary_response
+        return self.unary_response
+
+    def select_stream_response(self, plan: InvocationPlan):
+        return self.stream_response
+
+    async def direct_unary_response(self, request_adaptor: RequestAdaptor, plan: InvocationPlan):
+        """handle unary endpoint whose handler is a coroutine function, without the async generator detour"""
         request = request_adaptor.request
-        async with self.app.dependency_scope() as scope:
+        async with self.open_dependency_scope(plan) as scope:
             request.dependency_scope = scope
             async with self.app.start_request_context(request) as ctx:
-                async for response in self.call_handler(rpc_metadata, request_adaptor, scope):
-                    response = Response(content=response, app=self.app)
-                    response_adaptor = ResponseAdaptor(
-                        app=self.app,
-                        response=response,
-                        request=request,
-                        ctx=ctx
-                    )
-                    response_content = await response_adaptor.get_response()
-                    return response_content
-        raise GRPCException.unknown(f'Can not handle endpoint: {rpc_metadata["handler"]}')
-
-    async def stream_response(self, request_adaptor: RequestAdaptor, rpc_metadata: RPCFunctionMetadata):
-        """handle stream endpoint"""
+                try:
+                    args, kwargs = await self.get_run_handler_args(plan, request_adaptor, scope)
+                    if request.trace is None:
+                        content = await plan.handler(*args, **kwargs)
+                    else:
+                        content = await self.trace_awaitable(
+                            request.trace, 'handler', plan.handler(*args, **kwargs)
+                        )
+                except Exception as endpoint_runtime_error:
+                    self.app.logger.exception(endpoint_runtime_error)
+                    content = endpoint_runtime_error
+                response_adaptor = ResponseAdaptor(
+                    app=self.app,
+                    response=Response(content=content, app=self.app),
+                    request=request,
+                    ctx=ctx
+                )
+                return await response_adaptor.get_response()
+
+    async def unary_response(self, request_adaptor: RequestAdaptor, plan: InvocationPlan):
+        """handle unary endpoint, the dependency scope teardown counts to the dependencies stage"""
         request = request_adaptor.request
-        async with self.app.dependency_scope() as scope:
+        stage_timer = request.stage_timer or NO_STAGE_TIMER
+        try:
+            async with self.open_dependency_scope(plan) as scope:
+                request.dependency_scope = scope
+                stage_timer.lap('dependencies')
+                async with self.app.start_request_context(request) as ctx:
+                    stage_timer.lap('before_request')
+                    async for response in self.call_handler(plan, request_adaptor, scope, stage_timer):
+                        response_adaptor = plan.response_adaptor_type(
+                            app=self.app,
+                            response=Response(content=response, app=self.app),
+                            request=request,
+                            ctx=ctx
+                        )
+                        return await response_adaptor.get_response()
+        finally:
+            stage_timer.lap('dependencies')
+        raise GRPCException.unknown(f'Can not handle endpoint: {plan.handler}')
+
+    async def stream_response(self, request_adaptor: RequestAdaptor, plan: InvocationPlan):
+        """handle stream endpoint, the time grpc spends writing a response is left out of the stages"""
+        request = request_adaptor.request
+        stage_timer = request.stage_timer or NO_STAGE_TIMER
+        async with self.open_dependency_scope(plan) as scope:
             request.dependency_scope = scope
+            stage_timer.lap('dependencies')
             async with self.app.start_request_context(request) as ctx:
-                async for response in self.call_handler(rpc_metadata, request_adaptor, scope):
-                    response = Response(content=response, app=self.app)
-                    response_adaptor = ResponseAdaptor(
+                stage_timer.lap('before_request')
+                async for response in self.call_handler(plan, request_adaptor, scope, stage_timer):
+                    response_adaptor = plan.response_adaptor_type(
                         app=self.app,
-                        response=response,
+                        response=Response(content=response, app=self.app),
                         request=request,
                         ctx=ctx
                     )
                     response_content = await response_adaptor.get_response()
                     yield response_content
-
-    async def call_handler(self, run_metadata: RPCFunctionMetadata, request_adaptor: RequestAdaptor, scope):
+                    stage_timer.skip()
+        stage_timer.lap('dependencies')
+
+    async def call_handler(self,
+                           plan: InvocationPlan,
+                           request_adaptor: RequestAdaptor,
+                           scope,
+                           stage_timer: StageTimer = NO_STAGE_TIMER):
         """
         At the end of the request context,
         the processing function is called asynchronously,
-        which will convert any function into an asynchronous generator
+        which will convert any function into an asynchronous generator,
+        the dependencies and the handler stages are lapped on `stage_timer`
         """
+        stage = 'dependencies'
         try:
-            handler = run_metadata['handler']
-            params = await self.get_run_handler_args(run_metadata, request_adaptor, scope)
-            if inspect.iscoroutinefunction(handler):
-                # async function
-                async def _to_async_iter(h):
-                    yield await h(**params)
-
-                run_handler = partial(_to_async_iter, h=handler)
-            elif inspect.isgeneratorfunction(handler):
-                # generator
-                run_handler = partial(self.s2a.run_generate, gene=handler, *(params.values()))
-            elif inspect.isasyncgenfunction(handler):
-                run_handler = partial(handler, **params)
+            handler = plan.handler
+            handler_type = plan.handler_type
+            # deserialization is recorded on its own by the timed request adaptor
+            args, kwargs = await self.get_run_handler_args(plan, request_adaptor, scope)
+            stage_timer.lap(stage)
+            stage = 'handler'
+            trace = request_adaptor.request.trace
+            if handler_type in (HandlerType.function, HandlerType.generator):
+                handler = self.bind_keywords(handler, kwargs)
+            if trace is not None and handler_type in (HandlerType.coroutine, HandlerType.function):
+                # streaming handlers are covered by the server span only
+                if handler_type is HandlerType.coroutine:
+                    call = handler(*args, **kwargs)
+                else:
+                    call = self.s2a.run_function(handler, *args)
+                response = await self.trace_awaitable(trace, 'handler', call)
+            elif handler_type is HandlerType.coroutine:
+                response = await handler(*args, **kwargs)
+            elif handler_type is HandlerType.function:
+                response = await self.s2a.run_function(handler, *args)
             else:
-                async def _sync_to_async_iter(h):
-                    yield await self.s2a.run_function(h, *(params.values()))
-
-                run_handler = partial(_sync_to_async_iter, h=handler)
-            async for response in run_handler():
-                yield response
+                if handler_type is HandlerType.async_generator:
+                    responses = handler(*args, **kwargs)
+                else:
+                    responses = self.s2a.run_generate(handler, *args)
+                async for response in responses:
+                    stage_timer.lap(stage)
+                    yield response
+                    stage_timer.skip()
+                return
+            stage_timer.lap(stage)
+            yield response
         except Exception as endpoint_runtime_error:
+            stage_timer.lap(stage)
             self.app.logger.exception(endpoint_runtime_error)
             yield endpoint_runtime_error
 
+    async def timed_dispatch(self, request: Request, context: ServicerContext):
+        """`app.dispatch` closing the interceptor stage and recording the middleware stage"""
+        stage_timer = request.stage_timer
+        stage_timer.lap('interceptor')
+        try:
+            return await self.app.dispatch(request, context)
+        finally:
+            stage_timer.lap('middleware')
+
     @staticmethod
     def adapt_request(request: Request, request_data: bytes, context) -> Request:
         """second parse Request：supplement the original request data and context information"""
@@ -185,70 +696,81 @@ class GRPCAdaptor:
         return request
 
     @classmethod
-    async def get_run_handler_args(cls, metadata: RPCFunctionMetadata, request_adaptor: RequestAdaptor, scope):
-        result = {}
-        input_params = metadata['input_param_info']
-        if inspect.isclass(metadata['rpc_service']):
+    async def get_run_handler_args(cls,
+                                   plan: InvocationPlan,
+                                   request_adaptor: RequestAdaptor,
+                                   scope) -> Tuple[List[Any], Dict[str, Any]]:
+        """resolve the handler arguments in signature order, the keyword-only ones by name"""
+        result = []
+        keywords = {}
+        if plan.service_class is not None:
             # cbv mode
-            rpc_service_class = metadata['rpc_service']
-            service_instance = rpc_service_class()
+            service_instance = plan.service_class()
             service_instance.__post_init__()  # call post init
-            
-            # Inject dependencies into service instance
-            await cls.inject_service_dependencies(service_instance, scope)
-            
-            for index, key in enumerate(input_params.keys()):
-                if index == 0:
-                    result[key] = service_instance
-                    continue
-                param_info = input_params[key]
-                result[key] = await cls.transport_request_args(param_info, request_adaptor, key, scope)
-        else:
-            # root service or fbv mode
-            for key in input_params.keys():
-                param_info = input_params[key]
-                result[key] = await cls.transport_request_args(param_info, request_adaptor, key, scope)
-        return result
+            trace = request_adaptor.request.trace
+            for name, dependency in plan.service_dependencies:
+                if trace is None:
+                    setattr(service_instance, name, await scope.resolve(dependency))
+                else:
+                    setattr(service_instance, name, await cls.trace_awaitable(
+                        trace, f'resolve {name}', scope.resolve(dependency)
+                    ))
+            result.append(service_instance)
+        for argument in plan.arguments:
+            value = await cls.transport_request_args(argument, request_adaptor, scope)
+            if argument.keyword:
+                keywords[argument.name] = value
+            else:
+                result.append(value)
+        return result, keywords
 
     @staticmethod
-    async def inject_service_dependencies(service_instance: Any, scope):
-        """Inject dependencies into CBV service instance."""
-        # Inspect the service class for annotated dependencies
-        # e.g., db: Depends[DBFactory] or db: DBFactory = Depends(get_db)
-        
-        # We need to look at the class annotations and class attributes
-        cls = service_instance.__class__
-        
+    def keyword_only_params(handler: Callable) -> Tuple[str, ...]:
+        """names of the keyword-only parameters of the handler"""
+        return tuple(
+            name for name, param in inspect.signature(handler).parameters.items()
+            if param.kind is inspect.Parameter.KEYWORD_ONLY
+        )
+
+    @staticmethod
+    def bind_keywords(handler: Callable, kwargs: Dict[str, Any]) -> Callable:
+        """the handler with its keyword-only arguments bound, an executor hop passes positional arguments only"""
+        return partial(handler, **kwargs) if kwargs else handler
+
+    @staticmethod
+    def collect_service_dependencies(service_class: Type[Any]) -> Tuple[Tuple[str, Depends], ...]:
+        """Collect the dependencies declared on a CBV service class."""
+        dependencies = []
         # 1. Check annotations (for Depends[T])
-        if hasattr(cls, "__annotations__"):
-            for name, annotation in cls.__annotations__.items():
-                # Check if it's Depends[T]
-                origin = getattr(annotation, "__origin__", None)
-                if origin is Depends:
-                    args = getattr(annotation, "__args__", [])
-                    if args:
-                        dep_key = Depends(dependency=args[0])
-                        value = await scope.resolve(dep_key)
-                        setattr(service_instance, name, value)
-        
+        for name, annotation in getattr(service_class, '__annotations__', {}).items():
+            origin = getattr(annotation, "__origin__", None)
+            if origin is Depends:
+                args = getattr(annotation, "__args__", [])
+                if args:
+                    dependencies.append((name, Depends(dependency=args[0])))
         # 2. Check class attributes (for default values = Depends(...))
-        # Note: Class attributes are shared, so we shouldn't modify them on the class.
-        # But we are setting attributes on the *instance*.
-        for name, value in inspect.getmembers(cls):
+        # Note: Class attributes are shared, the resolved value is set on the *instance*.
+        for name, value in inspect.getmembers(service_class):
             if isinstance(value, Depends):
-                resolved_value = await scope.resolve(value)
-                setattr(service_instance, name, resolved_value)
+                dependencies.append((name, value))
+        return tuple(dependencies)
 
-    @staticmethod
-    async def transport_request_args(param_info: ParamInfo, request_adaptor: RequestAdaptor, key: str, scope):
+    @classmethod
+    async def transport_request_args(cls, argument: ArgumentResolver, request_adaptor: RequestAdaptor, scope):
+        param_info = argument.param_info
         try:
-            # Check if the parameter is a dependency
-            if GRPCAdaptor.is_dependency(param_info):
-                # Extract dependency factory or key
-                dep_key = GRPCAdaptor.extract_dependency_key(param_info)
-                return await scope.resolve(dep_key)
-
-            return request_adaptor.request_model(key)
+            trace = request_adaptor.request.trace
+            if argument.dependency is not None:
+                if trace is not None:
+                    return await cls.trace_awaitable(
+                        trace, f'resolve {argument.name}', scope.resolve(argument.dependency)
+                    )
+                return await scope.resolve(argument.dependency)
+            if trace is not None:
+                return await cls.trace_awaitable(
+                    trace, f'deserialize {argument.name}', request_adaptor.load_request_model(argument.name)
+                )
+            return await request_adaptor.load_request_model(argument.name)
         except Exception as e:
             if param_info.optional:
                 return None
@@ -256,6 +778,91 @@ class GRPCAdaptor:
                 raise GRPCException.invalid_argument(
                     detail=f"The server can't parse some data for type {param_info.type}") from e
 
+    @staticmethod
+    async def trace_awaitable(trace: Trace, name: str, awaitable: Awaitable) -> Any:
+        """await and record it as a child span of the trace"""
+        started = time.perf_counter_ns()
+        error = True
+        try:
+            result = await awaitable
+            error = False
+            return result
+        finally:
+            trace.add_span(name, started, error)
+
+    @staticmethod
+    def is_native_protobuf(serializer: Serializer) -> bool:
+        """protobuf messages can be decoded and encoded by grpc itself, nothing else is done by the serializer"""
+        return type(serializer.codec) is ProtobufCodec and type(serializer.converter) is ProtobufConverter
+
+    @staticmethod
+    def native_request_type(arguments: List[ArgumentResolver]) -> Optional[Type[Message]]:
+        """the message class every request argument is typed with, None when grpc can not decode the request"""
+        request_arguments = [argument for argument in arguments if argument.dependency is None]
+        if not request_arguments or any(
+                argument.raw_type is not None or argument.pooled_stream is not None for argument in request_arguments
+        ):
+            # raw buffers and pooled streams need the undecoded request
+            return None
+        message_types = set()
+        for argument in request_arguments:
+            param_info = argument.param_info
+            members = param_info.union_types or param_info.generic_args or [param_info.type]
+            if len(members) != 1 or not inspect.isclass(members[0]) or not issubclass(members[0], Message):
+                return None
+            message_types.add(members[0])
+        return message_types.pop() if len(message_types) == 1 else None
+
+    @staticmethod
+    def native_request_deserializer(message_type: Type[Message]) -> Callable[[bytes], Any]:
+        """the `request_deserializer` of grpc, a request it can not decode is handed to the adaptor undecoded"""
+
+        def deserialize(data: bytes) -> Any:
+            try:
+                return message_type.FromString(data)
+            except Exception as e:
+                undecodable = UndecodableMessage(data)
+                undecodable.message_type = message_type
+                undecodable.error = e
+                return undecodable
+
+        return deserialize
+
+    def pooled_stream_type(self,
+                           param_info: ParamInfo,
+                           serializer: Serializer) -> Optional[Type[ReusableStreamRequest]]:
+        """the `ReusableStreamRequest` class when the parameter streams protobuf messages that can be pooled"""
+        origin = get_origin(param_info.type)
+        if not (inspect.isclass(origin) and issubclass(origin, ReusableStreamRequest)):
+            return None
+        members = param_info.generic_args or []
+        if (
+                len(members) != 1 or not inspect.isclass(members[0]) or not issubclass(members[0], Message)
+                or not self.is_native_protobuf(serializer)
+        ):
+            return None
+        return origin
+
+    @staticmethod
+    def serialize_native_response(response: Any) -> bytes:
+        """`response_serializer` of native protobuf endpoints, rendered bytes (e.g. errors) are sent as they are"""
+        if isinstance(response, Message):
+            return response.SerializeToString()
+        return response
+
+    @staticmethod
+    def raw_buffer_type(param_info: ParamInfo) -> Optional[Type]:
+        """`bytes`/`memoryview` when the parameter asks for the undecoded request buffer
+
+        `data: bytes`, `data: Optional[memoryview]` and `data: StreamRequest[bytes]` all opt out of the serializer.
+        """
+        if param_info.type in RAW_BUFFER_TYPES:
+            return param_info.type
+        members = param_info.union_types or param_info.generic_args
+        if members and len(members) == 1 and members[0] in RAW_BUFFER_TYPES:
+            return members[0]
+        return None
+
     @staticmethod
     def is_dependency(param_info: ParamInfo) -> bool:
         # Check origin type for Depends[T]
@@ -283,11 +890,17 @@ class GRPCAdaptor:
             if args:
                 return Depends(dependency=args[0])
         
+        # Check Annotated
+        if param_info.annotated_args:
+            for arg in param_info.annotated_args:
+                if isinstance(arg, Depends):
+                    return arg
+
         # Check default value
         if isinstance(param_info.default_value, Depends):
             return param_info.default_value
 
         return None
 
-    def init_s2a(self, executor: ThreadPoolExecutor):
-        self.s2a = Sync2AsyncUtils(executor)
+    def init_s2a(self, executor: ThreadPoolExecutor, s2a_type: Type[Sync2AsyncUtils] = Sync2AsyncUtils):
+        self.s2a = s2a_type(executor)
@@ -0,0 +1,92 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple, Type, TYPE_CHECKING
+from google.protobuf.message import Message
+from ..enums import HandlerType
+from ..params import ParamInfo
+from ..di.depends import Depends
+from ..serialization import Serializer
+from ..request.request import RouteType
+from .union_decoder import UnionDecoder
+from .request_adaptor import RequestAdaptor
+from .response_adaptor import ResponseAdaptor
+from ..metrics import MethodMetrics
+
+if TYPE_CHECKING:
+    from ..service import RPCFunctionMetadata, Service
+    from .domain import ReusableStreamRequest
+
+
+@dataclass(frozen=True)
+class ArgumentResolver:
+    """how to produce one handler argument
+
+    Args:
+        name: parameter name in the handler signature
+        param_info: parsed parameter type information
+        dependency: the dependency key when the argument is injected, None when it comes from the request
+        union_decoder: decoder built for a request argument typed with a union of several models
+        raw_type: the type of a request argument that is passed through without the serializer,
+            `bytes`/`memoryview` for the request buffer, or a protobuf message class decoded by grpc itself
+        pooled_stream: the `ReusableStreamRequest` class of a stream argument whose messages are parsed into a pool
+        keyword: the parameter is keyword-only, the argument is passed by name
+    """
+    name: str
+    param_info: ParamInfo
+    dependency: Optional[Depends] = None
+    union_decoder: Optional[UnionDecoder] = None
+    raw_type: Optional[Type] = None
+    pooled_stream: Optional[Type['ReusableStreamRequest']] = None
+    keyword: bool = False
+
+
+@dataclass(frozen=True)
+class NegotiatedSerializer:
+    """a serializer a client can select with the request metadata, with the union decoders built for it"""
+    serializer: Serializer
+    union_decoders: Dict[str, UnionDecoder] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class InvocationPlan:
+    """an endpoint compiled once at registration, the adaptor executes it without any introspection
+
+    Args:
+        metadata: the original endpoint metadata
+        handler: the endpoint callable
+        handler_type: calling convention of the handler
+        service_class: cbv service class, an instance is created for every call and passed as the first argument
+        service_dependencies: cbv attributes that must be injected into the service instance
+        arguments: ordered resolvers for the remaining handler arguments
+        need_dependency: whether a dependency scope must be opened for the call
+        serializer: the serializer used to load request content
+        route: precomputed (package, service, method) of the endpoint
+        union_decoders: union decoders of the request arguments, by parameter name
+        raw_types: types of the request arguments that skip the serializer, by parameter name
+        pooled_streams: stream request classes of the arguments that reuse pooled messages, by parameter name
+        native_request_type: protobuf message class grpc decodes the request into (`request_deserializer`)
+        native_response: whether messages returned by the handler are serialized by grpc (`response_serializer`)
+        negotiated_serializers: serializers a client can select instead of `serializer`, by codec name
+        metrics: the metrics row of the method in this worker, None when metrics are disabled
+        stage_timing: the timed call path is compiled in, see `config.stage_timing`
+        request_adaptor_type: `RequestAdaptor`, or its timed variant when `stage_timing`
+        response_adaptor_type: `ResponseAdaptor`, or its timed variant when `stage_timing`
+    """
+    metadata: 'RPCFunctionMetadata'
+    handler: Callable
+    handler_type: HandlerType
+    service_class: Optional[Type['Service']]
+    service_dependencies: Tuple[Tuple[str, Depends], ...]
+    arguments: Tuple[ArgumentResolver, ...]
+    need_dependency: bool
+    serializer: Serializer
+    route: Optional[RouteType] = None
+    union_decoders: Dict[str, UnionDecoder] = field(default_factory=dict)
+    raw_types: Dict[str, Type] = field(default_factory=dict)
+    pooled_streams: Dict[str, Type['ReusableStreamRequest']] = field(default_factory=dict)
+    native_request_type: Optional[Type[Message]] = None
+    native_response: bool = False
+    negotiated_serializers: Dict[str, NegotiatedSerializer] = field(default_factory=dict)
+    metrics: Optional[MethodMetrics] = None
+    stage_timing: bool = False
+    request_adaptor_type: Type[RequestAdaptor] = RequestAdaptor
+    response_adaptor_type: Type[ResponseAdaptor] = ResponseAdaptor
@@ -1,37 +1,105 @@
+from functools import partial
+from time import perf_counter_ns
 from ...core.enums import Interaction
-from typing import Any, TYPE_CHECKING, Optional, Dict
+from typing import Any, TYPE_CHECKING, Optional, Dict, Type, get_origin
+from google.protobuf.message import Message
 from ..request.request import Request
-from .domain import StreamRequest
-from ...types import T
+from .domain import StreamRequest, ReusableStreamRequest
+from .union_decoder import UnionDecoder
+from ...types import T, BufferLike
 from ..params import ParamInfo
+from ..serialization import Serializer, MessagePool, SerializationOffloader
 from ...exceptions import GRPCException
 
 if TYPE_CHECKING:
     from ...application import GRPCFramework
 
 
+class UndecodableMessage(bytes):
+    """a request grpc could not decode into the protobuf message of the endpoint,
+    loading the argument fails so the error goes through the error handlers like any other invalid request"""
+    message_type: Type[Message]
+    error: Exception
+
+
 class RequestAdaptor:
     def __init__(self,
                  interaction_type: Interaction,
                  app: 'GRPCFramework',
                  input_param_info: Dict[str, ParamInfo],
-                 request: Request):
+                 request: Request,
+                 serializer: Optional[Serializer] = None,
+                 union_decoders: Optional[Dict[str, UnionDecoder]] = None,
+                 raw_types: Optional[Dict[str, Type]] = None,
+                 pooled_streams: Optional[Dict[str, Type[ReusableStreamRequest]]] = None,
+                 offloader: Optional[SerializationOffloader] = None):
         self.interaction_type = interaction_type
         self.request_bytes = request.request_bytes
         self.app = app
         self.input_param_info = input_param_info
         self.request = request
+        self.load_content = serializer.deserialize if serializer is not None else app.load_content
+        self.union_decoders = union_decoders or {}
+        self.raw_types = raw_types or {}
+        self.pooled_streams = pooled_streams or {}
+        self.offloader = offloader
 
     def unary_request(self, key: str):
-        return self.deserialize_request(self.request_bytes, self.input_param_info[key])
+        raw_type = self.raw_types.get(key)
+        if raw_type is not None:
+            return self.raw_request(self.request_bytes, raw_type=raw_type)
+        return self.deserialize_request(self.request_bytes, self.input_param_info[key], self.union_decoders.get(key))
 
     def stream_request(self, key: str) -> StreamRequest[T]:
-        return StreamRequest(self.request, self.deserialize_request, self.input_param_info[key])
+        pooled_stream = self.pooled_streams.get(key)
+        if pooled_stream is not None:
+            # one pool per call, the messages are shared by the items of this stream only
+            model_type = self.input_param_info[key]
+            pool = MessagePool(model_type.generic_args[0], pooled_stream.pool_size)
+            return pooled_stream(self.request, pool.parse, model_type, self.offloader)
+        model_type = self.input_param_info[key]
+        stream_type = self.stream_type(model_type)
+        union_decoder = self.union_decoders.get(key)
+        raw_type = self.raw_types.get(key)
+        if raw_type is not None:
+            # nothing is decoded, nothing to offload
+            return stream_type(self.request, partial(self.raw_request, raw_type=raw_type), model_type)
+        if union_decoder is None:
+            deserialization_handler = self.deserialize_request
+        else:
+            deserialization_handler = partial(self.deserialize_request, union_decoder=union_decoder)
+        return stream_type(self.request, deserialization_handler, model_type, self.offloader)
+
+    @staticmethod
+    def stream_type(model_type: ParamInfo) -> Type[StreamRequest]:
+        """the declared stream request class, e.g. a `ReusableStreamRequest` whose messages can not be pooled"""
+        origin = get_origin(model_type.type)
+        if isinstance(origin, type) and issubclass(origin, StreamRequest):
+            return origin
+        return StreamRequest
+
+    @staticmethod
+    def raw_request(request_bytes: BufferLike, model_type: Optional[ParamInfo] = None, raw_type: Type = bytes) -> Any:
+        """hand the request to the endpoint without decoding, a memoryview wraps the buffer without copying
+        and messages already decoded by grpc are passed as they are"""
+        if type(request_bytes) is UndecodableMessage:
+            raise GRPCException.invalid_argument(
+                detail=f"The server can't parse some data for type {request_bytes.message_type}"
+            ) from request_bytes.error
+        if raw_type is memoryview and not isinstance(request_bytes, memoryview):
+            return memoryview(request_bytes)
+        return request_bytes
 
-    def deserialize_request(self, request_bytes: Any, model_type: ParamInfo) -> Any:
+    def deserialize_request(self,
+                            request_bytes: Any,
+                            model_type: ParamInfo,
+                            union_decoder: Optional[UnionDecoder] = None) -> Any:
         """Deserialize the original request data into a domain model"""
         if self.request.is_request_bytes_empty():
             raise ValueError("Request bytes not set. Call adapt_request first.")
+        if union_decoder is not None:
+            # union of several models, the target type is chosen by the decoder in one pass
+            return union_decoder.decode(request_bytes)
         if model_type.union_types or model_type.generic_args:
             model_list = [
                 *(model_type.union_types or []),
@@ -40,15 +108,39 @@ class RequestAdaptor:
             errors = []
             for mt in model_list:
                 try:
-                    return self.app.load_content(request_bytes, mt)
+                    return self.load_content(request_bytes, mt)
                 except Exception as e:
                     errors.append(e)
-                    continue
-            return self.request_bytes
+            raise GRPCException.invalid_argument(
+                detail=f"The server can't parse the data as any of {model_list}"
+            ) from errors[-1]
         else:
-            return self.app.load_content(request_bytes, model_type.type)
+            return self.load_content(request_bytes, model_type.type)
 
     def request_model(self, key: str):
         if self.interaction_type is Interaction.unary:
             return self.unary_request(key)
         return self.stream_request(key)
+
+    async def load_request_model(self, key: str):
+        """`request_model`, a large unary request is decoded in the executor"""
+        if (
+                self.offloader is not None and self.interaction_type is Interaction.unary
+                and key not in self.raw_types and self.offloader.should_offload_request(self.request_bytes)
+        ):
+            return await self.offloader.decode(self.unary_request, key)
+        return self.request_model(key)
+
+
+class TimedRequestAdaptor(RequestAdaptor):
+    """`RequestAdaptor` recording the `deserialize` stage, used by plans compiled with stage timing
+
+    a stream request is decoded while the handler iterates it, that time counts to the handler.
+    """
+
+    async def load_request_model(self, key: str):
+        started = perf_counter_ns()
+        try:
+            return await super().load_request_model(key)
+        finally:
+            self.request.stage_timer.add('deserialize', started)
@@ -1,4 +1,5 @@
 import grpc
+from time import perf_counter_ns
 from typing import TYPE_CHECKING, Tuple, Any
 from ..response.response import Response
 from ..request.request import Request
@@ -37,7 +38,7 @@ class ResponseAdaptor:
                 )
             else:
                 # Step 2: try to render a normal response
-                rendered = self._safe_render()
+                rendered = await self._safe_render()
                 if rendered is _Empty:
                     # success
                     error_resp, content = self._build_error_response_from_render_failure()
@@ -52,13 +53,13 @@ class ResponseAdaptor:
                 await self.call_error_handler(error_resp.content)
                 return b''
             else:
-                # a successful response also requires sending (for middleware use).
-                success_resp = Response(
-                    content=self.original_response.content,
-                    status_code=grpc.StatusCode.OK,
-                    app=self.app
-                )
-                await self.ctx.send(success_resp)
+                # a successful response also requires sending (for middleware use),
+                # the original response is already an OK response and is sent as it is.
+                request_context_manager = self.app._request_context_manager
+                if request_context_manager.has_after_request_handlers:
+                    await self.ctx.send(self.original_response)
+                else:
+                    request_context_manager.log_response(self.original_response)
                 return content
 
         except Exception as unexpected:
@@ -72,11 +73,29 @@ class ResponseAdaptor:
             await self.call_error_handler(unexpected)
             return b''
 
-    def _safe_render(self) -> Any | _Empty:
+    async def _safe_render(self) -> Any | _Empty:
         """safe rendering failed and returned _Empty"""
+        trace = self.request.trace
+        started = perf_counter_ns() if trace is not None else 0
         try:
-            return self.original_response.render()
+            offloader = self.app.serialization_offloader
+            if not offloader.enabled:
+                rendered = self.original_response.render()
+            else:
+                # a route whose last response was large is encoded in the executor
+                route = self.request.full_method
+                if offloader.should_offload_response(route):
+                    self.original_response._set_grpc_metadata()
+                    rendered = await offloader.encode(self.original_response.render_content)
+                else:
+                    rendered = self.original_response.render()
+                offloader.observe_response(route, rendered)
+            if trace is not None:
+                trace.add_span('serialize', started)
+            return rendered
         except Exception as e:
+            if trace is not None:
+                trace.add_span('serialize', started, error=True)
             self.app.logger.exception("Response rendering failed")
             self.app.logger.exception(e)
             return _Empty
@@ -98,3 +117,21 @@ class ResponseAdaptor:
 
     async def call_error_handler(self, exc: Exception):
         await self.app._error_handler.call_error_handler(exc, self.request)
+
+
+class TimedResponseAdaptor(ResponseAdaptor):
+    """`ResponseAdaptor` recording the `serialize` and `after_request` stages"""
+
+    async def get_response(self) -> bytes:
+        try:
+            return await super().get_response()
+        finally:
+            # rendering is excluded from the lap, it is recorded by `_safe_render`
+            self.request.stage_timer.lap('after_request')
+
+    async def _safe_render(self) -> Any | _Empty:
+        started = perf_counter_ns()
+        try:
+            return await super()._safe_render()
+        finally:
+            self.request.stage_timer.add('serialize', started)
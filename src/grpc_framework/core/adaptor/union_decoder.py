@@ -0,0 +1,235 @@
+import inspect
+from dataclasses import is_dataclass, fields, MISSING
+from typing import (
+    Any, Dict, FrozenSet, List, Optional, Sequence, Tuple, Type, Union,
+    Literal, get_args, get_origin, get_type_hints
+)
+from google.protobuf.message import Message
+from ..serialization import Serializer
+
+_PROTOBUF_TYPE_KEY = '@type'
+# payload key sets remembered per decoder, the keys come from the clients
+_KEYS_CACHE_SIZE = 256
+
+
+class _Candidate:
+    """precomputed decoding information of one union member"""
+    __slots__ = ('type', 'fields', 'required', 'full_name')
+
+    def __init__(self, type_: Type):
+        self.type = type_
+        self.fields, self.required = self._collect_keys(type_)
+        self.full_name: Optional[str] = type_.DESCRIPTOR.full_name if self._is_message(type_) else None
+
+    def matches_keys(self, keys: FrozenSet[str]) -> bool:
+        """the payload has every required key and no unknown key"""
+        return self.required <= keys <= self.fields
+
+    def score(self, keys: FrozenSet[str]) -> int:
+        """how well the payload keys fit this candidate, -1 when a required key is missing"""
+        if not self.required <= keys:
+            return -1
+        return len(keys & self.fields) - len(keys - self.fields)
+
+    @staticmethod
+    def _is_message(type_: Type) -> bool:
+        return inspect.isclass(type_) and issubclass(type_, Message)
+
+    @classmethod
+    def _collect_keys(cls, type_: Type) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """(all known keys, required keys) of a model type"""
+        if cls._is_message(type_):
+            names = set()
+            for f in type_.DESCRIPTOR.fields:
+                names.add(f.name)
+                names.add(f.json_name)
+            return frozenset(names), frozenset()
+        if is_dataclass(type_):
+            dc_fields = fields(type_)
+            required = [
+                f.name for f in dc_fields
+                if f.default is MISSING and f.default_factory is MISSING
+            ]
+            return frozenset(f.name for f in dc_fields), frozenset(required)
+        if inspect.isclass(type_) and getattr(type_, '__annotations__', None) and hasattr(type_, '__required_keys__'):
+            # TypedDict
+            return frozenset(type_.__annotations__), frozenset(type_.__required_keys__)
+        if inspect.isclass(type_) and type_.__init__ is not object.__init__:
+            try:
+                parameters = list(inspect.signature(type_.__init__).parameters.values())[1:]
+            except (TypeError, ValueError):
+                return frozenset(), frozenset()
+            names = [
+                p.name for p in parameters
+                if p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+            ]
+            required = [p.name for p in parameters if p.name in names and p.default is inspect.Parameter.empty]
+            return frozenset(names), frozenset(required)
+        return frozenset(), frozenset()
+
+
+class UnionDecoder:
+    """decode a request whose parameter is a union of several model types
+
+    The decoder is built once per endpoint parameter. For self describing transports (json like codecs)
+    the payload is decoded once and the target type is chosen with a discriminator:
+
+    1. a tag field: a field that every candidate declares as `Literal[...]` with distinct values
+    2. the protobuf descriptor full name in a `@type` key
+    3. the payload keys, matched against the fields of every candidate
+
+    For transports that need a schema to decode (protobuf) the candidates are tried in declaration order,
+    a decoding that succeeds proves little there, so the order never depends on the previous requests.
+    The candidate chosen by the payload keys is remembered per key set, the same keys always choose
+    the same candidate, so the cache does not depend on the order of the requests. Decoding runs concurrently
+    in the offload executor threads, a key set is only ever stored with that one candidate by a single
+    dict assignment, racing requests store the same value.
+
+    Args:
+        candidates: union member types
+        serializer: the serializer of the endpoint
+    """
+
+    def __init__(self, candidates: Sequence[Type], serializer: Serializer):
+        self.serializer = serializer
+        self.accept_bytes = any(c in (bytes, bytearray) for c in candidates)
+        self.candidates: List[_Candidate] = [
+            _Candidate(c) for c in candidates
+            if c not in (bytes, bytearray, type(None))
+        ]
+        self.tag_field, self.tags = self._find_tag_field(self.candidates)
+        self.full_names: Dict[str, _Candidate] = {
+            c.full_name: c for c in self.candidates if c.full_name
+        }
+        self.self_describing = not self.serializer.codec.requires_schema
+        self._by_keys: Dict[FrozenSet[str], _Candidate] = {}
+
+    @classmethod
+    def build(cls, candidates: Sequence[Type], serializer: Serializer) -> Optional['UnionDecoder']:
+        """build a decoder when there is a real choice between model types, None otherwise"""
+        # StreamRequest[Union[A, B]] carries the union as its generic argument
+        candidates = [
+            member
+            for c in candidates
+            for member in (get_args(c) if get_origin(c) is Union else (c,))
+            if member is not type(None)
+        ]
+        models = [c for c in candidates if c not in (bytes, bytearray)]
+        if len(candidates) < 2 or not models:
+            return None
+        return cls(candidates, serializer)
+
+    def decode(self, data: Any) -> Any:
+        if self.self_describing:
+            return self._decode_self_describing(data)
+        return self._decode_by_trial(data)
+
+    def _decode_self_describing(self, data: Any) -> Any:
+        try:
+            transport_obj = self.serializer.codec.decode(data, into=self.candidates[0].type)
+        except Exception:
+            if self.accept_bytes:
+                return data
+            raise
+        sample = transport_obj[0] if isinstance(transport_obj, list) and transport_obj else transport_obj
+        candidate = self._discriminate(sample)
+        if candidate is not None:
+            try:
+                return self._to_model(transport_obj, candidate)
+            except Exception:
+                pass
+        # no discriminator matched, try the remaining candidates on the already decoded payload
+        errors = []
+        for c in self.candidates:
+            if c is candidate:
+                continue
+            try:
+                return self._to_model(transport_obj, c)
+            except Exception as e:
+                errors.append(e)
+        return self._no_match(data, errors)
+
+    def _decode_by_trial(self, data: Any) -> Any:
+        errors = []
+        for c in self.candidates:
+            try:
+                return self.serializer.deserialize(data, c.type)
+            except Exception as e:
+                errors.append(e)
+        return self._no_match(data, errors)
+
+    def _discriminate(self, sample: Any) -> Optional[_Candidate]:
+        if not isinstance(sample, dict):
+            for c in self.candidates:
+                if inspect.isclass(c.type) and isinstance(sample, c.type):
+                    return c
+            return None
+        if self.tag_field is not None and self.tag_field in sample:
+            candidate = self.tags.get(sample[self.tag_field])
+            if candidate is not None:
+                return candidate
+        if self.full_names and _PROTOBUF_TYPE_KEY in sample:
+            full_name = str(sample[_PROTOBUF_TYPE_KEY]).rsplit('/', 1)[-1]
+            candidate = self.full_names.get(full_name)
+            if candidate is not None:
+                return candidate
+        keys = frozenset(sample)
+        candidate = self._by_keys.get(keys)
+        if candidate is not None:
+            return candidate
+        best, best_score = None, -1
+        for c in self.candidates:
+            score = c.score(keys)
+            if score > best_score:
+                best, best_score = c, score
+        if best is not None and best.matches_keys(keys) and len(self._by_keys) < _KEYS_CACHE_SIZE:
+            self._by_keys[keys] = best
+        return best
+
+    def _to_model(self, transport_obj: Any, candidate: _Candidate) -> Any:
+        if not isinstance(transport_obj, (dict, list)) and \
+                inspect.isclass(candidate.type) and isinstance(transport_obj, candidate.type):
+            model = transport_obj
+        else:
+            if candidate.full_name is not None:
+                # the type url is a discriminator only, it is not a field of the message
+                for item in (transport_obj if isinstance(transport_obj, list) else (transport_obj,)):
+                    if isinstance(item, dict):
+                        item.pop(_PROTOBUF_TYPE_KEY, None)
+            model = self.serializer.converter.to_model(transport_obj, candidate.type)
+        return model
+
+    def _no_match(self, data: Any, errors: List[Exception]) -> Any:
+        if self.accept_bytes:
+            return data
+        raise ValueError(
+            f'The request data does not match any of {[c.type for c in self.candidates]}, errors: {errors}'
+        )
+
+    @staticmethod
+    def _find_tag_field(candidates: List[_Candidate]) -> Tuple[Optional[str], Dict[Any, _Candidate]]:
+        """find a field declared as Literal by every candidate, with distinct values"""
+        literal_fields = []
+        for c in candidates:
+            try:
+                hints = get_type_hints(c.type)
+            except Exception:
+                return None, {}
+            literal_fields.append({
+                name: get_args(hint) for name, hint in hints.items()
+                if get_origin(hint) is Literal
+            })
+        if len(literal_fields) < 2:
+            return None, {}
+        common = set(literal_fields[0]).intersection(*literal_fields[1:])
+        for name in sorted(common):
+            tags = {}
+            distinct = True
+            for c, literal in zip(candidates, literal_fields):
+                for value in literal[name]:
+                    if value in tags:
+                        distinct = False
+                    tags[value] = c
+            if distinct:
+                return name, tags
+        return None, {}
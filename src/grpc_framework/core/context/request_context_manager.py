@@ -1,5 +1,5 @@
 import inspect
-from typing import Optional, TYPE_CHECKING, Callable, Any, List
+from typing import Optional, TYPE_CHECKING, Callable, Any, List, Type
 from ...utils import Sync2AsyncUtils, AsyncReactiveContext
 from ..request.request import Request
 from ..response.response import Response
@@ -18,6 +18,7 @@ class RequestContextManager:
         self.s2a = None
         self._before_request_handlers: List[BEFORE_HOOK_TYPE] = []
         self._after_request_handlers: List[AFTER_HOOK_TYPE] = []
+        self._request_logger: Optional[AFTER_HOOK_TYPE] = None
 
     def before_request(self, func: BEFORE_HOOK_TYPE, index: Optional[int] = None):
         if index is not None:
@@ -33,6 +34,21 @@ class RequestContextManager:
             self._after_request_handlers.append(func)
         return func
 
+    def set_request_logger(self, func: AFTER_HOOK_TYPE):
+        """log every response after the after request hooks,
+        it is not a hook: it is called on the event loop and keeps responses off the hook path"""
+        self._request_logger = func
+        return func
+
+    @property
+    def has_after_request_handlers(self) -> bool:
+        """whether any after request hook is registered, responses are only sent to the hooks when it is"""
+        return bool(self._after_request_handlers)
+
+    def log_response(self, response: Response):
+        if self._request_logger is not None:
+            self._request_logger(response)
+
     def context(self, request: Request):
         return AsyncReactiveContext(
             self.on_before_request,
@@ -53,6 +69,7 @@ class RequestContextManager:
                 await call(response)
             else:
                 await self.s2a.run_function(call, response)
+        self.log_response(response)
 
-    def init_s2a(self, executor: ThreadPoolExecutor):
-        self.s2a = Sync2AsyncUtils(executor)
+    def init_s2a(self, executor: ThreadPoolExecutor, s2a_type: Type[Sync2AsyncUtils] = Sync2AsyncUtils):
+        self.s2a = s2a_type(executor)
@@ -1,5 +1,6 @@
-from .grpc import Interaction
+from .grpc import Interaction, HandlerType
 
 __all__ = [
-    'Interaction'
+    'Interaction',
+    'HandlerType'
 ]
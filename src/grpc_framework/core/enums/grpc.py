@@ -4,3 +4,11 @@ import enum
 class Interaction(enum.Enum):
     unary = 'unary'
     stream = 'stream'
+
+
+class HandlerType(enum.Enum):
+    """the calling convention of an endpoint handler, resolved once at registration"""
+    coroutine = 'coroutine'
+    async_generator = 'async_generator'
+    generator = 'generator'
+    function = 'function'
@@ -14,7 +14,7 @@ class ErrorHandler:
     def __init__(self, app: 'GRPCFramework'):
         self.app = app
         self._error_handlers: Dict[Type[Exception], Callable[[Request, Exception], Any]] = {
-            GRPCException: self.common_error_handler
+            GRPCException: self.grpc_error_handler
         }
         self.s2a = None
 
@@ -49,5 +49,5 @@ class ErrorHandler:
         request.grpc_context.set_code(exc.code)
         request.grpc_context.set_details(f'Internal Error: {exc.detail}')
 
-    def init_s2a(self, executor: ThreadPoolExecutor):
-        self.s2a = Sync2AsyncUtils(executor)
+    def init_s2a(self, executor: ThreadPoolExecutor, s2a_type: Type[Sync2AsyncUtils] = Sync2AsyncUtils):
+        self.s2a = s2a_type(executor)
@@ -1,5 +1,6 @@
-from .request_context_interceptor import RequestContextInterceptor
+from .request_context_interceptor import RequestContextInterceptor, TimedRequestContextInterceptor
 
 __all__ = [
-    'RequestContextInterceptor'
+    'RequestContextInterceptor',
+    'TimedRequestContextInterceptor'
 ]
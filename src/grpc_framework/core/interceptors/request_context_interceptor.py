@@ -2,6 +2,7 @@ import grpc
 import grpc.aio as grpc_aio
 from typing import TYPE_CHECKING, Callable, Awaitable
 from ..request.request import Request
+from ..metrics import StageTimer
 
 if TYPE_CHECKING:
     from ...application import GRPCFramework
@@ -14,7 +15,25 @@ class RequestContextInterceptor(grpc_aio.ServerInterceptor):
     async def intercept_service(self, continuation: Callable[
         [grpc.HandlerCallDetails], Awaitable[grpc.RpcMethodHandler]
     ], handler_call_details: grpc.HandlerCallDetails):
+        if handler_call_details.method not in self.app._route_table:
+            # not an application endpoint, e.g. health check, reflection or legacy stubs
+            return await continuation(handler_call_details)
         # 初步解析Request
         request = Request()
         request.from_handler_details(handler_call_details)
         return await continuation(handler_call_details)
+
+
+class TimedRequestContextInterceptor(RequestContextInterceptor):
+    """`RequestContextInterceptor` starting the stage timer of the request, used when `config.stage_timing`"""
+
+    async def intercept_service(self, continuation: Callable[
+        [grpc.HandlerCallDetails], Awaitable[grpc.RpcMethodHandler]
+    ], handler_call_details: grpc.HandlerCallDetails):
+        if handler_call_details.method not in self.app._route_table:
+            return await continuation(handler_call_details)
+        stage_timer = StageTimer()
+        request = Request()
+        request.from_handler_details(handler_call_details)
+        request.stage_timer = stage_timer
+        return await continuation(handler_call_details)
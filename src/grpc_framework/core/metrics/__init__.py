@@ -0,0 +1,38 @@
+from .registry import (
+    MetricsRegistry, MethodMetrics, TenantMetrics, LoopLagHistogram, ExecutorStats, OffloadStats,
+    LATENCY_BUCKETS, SIZE_BUCKETS, EXECUTOR_SUBSYSTEMS
+)
+from .exposition import render_openmetrics, CONTENT_TYPE
+from .stages import STAGES, StageTimer, NullStageTimer, NO_STAGE_TIMER, StageRecorder, StageStats
+from .loop_monitor import LoopLagMonitor
+from .executor import InstrumentedExecutor, SubsystemExecutor
+from .cpu import NO_TENANT, CpuAccount, CpuStats, AccountedSync2AsyncUtils, current_cpu_account, metered
+
+__all__ = [
+    'MetricsRegistry',
+    'MethodMetrics',
+    'TenantMetrics',
+    'LoopLagHistogram',
+    'LoopLagMonitor',
+    'ExecutorStats',
+    'OffloadStats',
+    'InstrumentedExecutor',
+    'SubsystemExecutor',
+    'EXECUTOR_SUBSYSTEMS',
+    'LATENCY_BUCKETS',
+    'SIZE_BUCKETS',
+    'render_openmetrics',
+    'CONTENT_TYPE',
+    'STAGES',
+    'StageTimer',
+    'NullStageTimer',
+    'NO_STAGE_TIMER',
+    'StageRecorder',
+    'StageStats',
+    'NO_TENANT',
+    'CpuAccount',
+    'CpuStats',
+    'AccountedSync2AsyncUtils',
+    'current_cpu_account',
+    'metered'
+]
@@ -0,0 +1,169 @@
+"""cpu time accounting of the calls
+
+A call is only accounted when `config.cpu_accounting` is enabled, its `CpuAccount` then becomes the current account:
+    - loop: the coroutine of the call is driven through `metered`, every step it runs on the event loop
+      is measured with `time.thread_time()`, the steps of the other calls sharing the loop are not
+    - executor: `AccountedSync2AsyncUtils` measures the `thread_time` of every executor hop made
+      while the account is current
+
+The wall time minus both cpu times is what the call spent waiting (io, executor queue, other calls on the loop).
+"""
+import threading
+from contextvars import ContextVar, Context
+from functools import partial
+from time import perf_counter, thread_time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from .registry import OTHER_TENANT
+from ...utils import Sync2AsyncUtils
+
+__all__ = [
+    'NO_TENANT',
+    'CpuAccount',
+    'CpuStats',
+    'AccountedSync2AsyncUtils',
+    'current_cpu_account',
+    'metered'
+]
+
+NO_TENANT = '<none>'
+
+_current_cpu_account: ContextVar[Optional['CpuAccount']] = ContextVar('current_cpu_account', default=None)
+
+
+def current_cpu_account() -> Optional['CpuAccount']:
+    """the account of the call being handled, None when cpu accounting is disabled"""
+    return _current_cpu_account.get()
+
+
+class CpuAccount:
+    """cpu seconds of one call on the event loop and in executor threads"""
+    __slots__ = ('tenant', 'loop_cpu', 'executor_cpu', 'started', '_lock')
+
+    def __init__(self, tenant: str = NO_TENANT):
+        self.tenant = tenant
+        self.loop_cpu = 0.0
+        self.executor_cpu = 0.0
+        self.started = perf_counter()
+        # executor hops of one call may overlap, e.g. dependencies resolved concurrently
+        self._lock = threading.Lock()
+
+    def activate(self):
+        """make it the current account, the executor hops of the current task are accounted to it"""
+        return _current_cpu_account.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current_cpu_account.reset(token)
+
+    def run(self, func: Callable, *args) -> Any:
+        """run `func(*args)` in an executor thread, its thread time is accounted"""
+        started = thread_time()
+        try:
+            return func(*args)
+        finally:
+            elapsed = thread_time() - started
+            with self._lock:
+                self.executor_cpu += elapsed
+
+    def wall(self) -> float:
+        return perf_counter() - self.started
+
+
+class _Metered:
+    __slots__ = ('awaitable', 'account')
+
+    def __init__(self, awaitable: Awaitable, account: CpuAccount):
+        self.awaitable = awaitable
+        self.account = account
+
+    def __await__(self):
+        iterator = self.awaitable.__await__()
+        account = self.account
+        send, value = iterator.send, None
+        while True:
+            started = thread_time()
+            try:
+                yielded = send(value)
+            except StopIteration as e:
+                account.loop_cpu += thread_time() - started
+                return e.value
+            except BaseException:
+                account.loop_cpu += thread_time() - started
+                raise
+            account.loop_cpu += thread_time() - started
+            try:
+                value = yield yielded
+                send = iterator.send
+            except GeneratorExit:
+                iterator.close()
+                raise
+            except BaseException as e:
+                # e.g. the cancellation of the task, it is delivered to the awaitable
+                send, value = iterator.throw, e
+
+
+def metered(awaitable: Awaitable, account: CpuAccount) -> Awaitable:
+    """await `awaitable`, the cpu time of every step it runs on the event loop is added to `account.loop_cpu`"""
+    return _Metered(awaitable, account)
+
+
+class AccountedSync2AsyncUtils(Sync2AsyncUtils):
+    """`Sync2AsyncUtils` accounting the thread time of the hops to the current `CpuAccount`"""
+
+    def bind(self, ctx: Context, func: Callable, *args) -> Callable:
+        account = _current_cpu_account.get()
+        if account is None:
+            return partial(ctx.run, func, *args)
+        return partial(ctx.run, account.run, func, *args)
+
+
+class CpuStats:
+    """calls, cpu and wall seconds per method and tenant, kept in process
+
+    Args:
+        max_tenants: tenants kept per method, the others are summed up as `<other>`
+    """
+
+    def __init__(self, max_tenants: int = 64):
+        self.max_tenants = max_tenants
+        # method -> tenant -> [calls, loop cpu, executor cpu, wall]
+        self._stats: Dict[str, Dict[str, List]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, account: CpuAccount, wall: float):
+        with self._lock:
+            tenants = self._stats.get(method)
+            if tenants is None:
+                tenants = self._stats[method] = {}
+            tenant = account.tenant
+            stats = tenants.get(tenant)
+            if stats is None:
+                if len(tenants) >= self.max_tenants - 1 and tenant != OTHER_TENANT:
+                    tenant = OTHER_TENANT
+                    stats = tenants.get(tenant)
+                if stats is None:
+                    stats = tenants[tenant] = [0, 0.0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += account.loop_cpu
+            stats[2] += account.executor_cpu
+            stats[3] += wall
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict]]:
+        """`{method: {tenant: {'calls', 'loop_cpu_seconds', 'executor_cpu_seconds', 'wall_seconds'}}}`"""
+        with self._lock:
+            return {
+                method: {
+                    tenant: {
+                        'calls': calls,
+                        'loop_cpu_seconds': loop_cpu,
+                        'executor_cpu_seconds': executor_cpu,
+                        'wall_seconds': wall
+                    }
+                    for tenant, (calls, loop_cpu, executor_cpu, wall) in tenants.items()
+                }
+                for method, tenants in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
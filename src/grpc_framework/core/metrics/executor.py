@@ -0,0 +1,164 @@
+"""saturation metrics of the runtime executor
+
+Handlers, dependency providers, request hooks, error handlers, lifecycle hooks and offloaded serialization
+share the runtime executor, every subsystem submits through its own `SubsystemExecutor` view.
+The executor counts the submitted, queued and running calls of every subsystem and records
+how long a call waited in the queue before a thread took it.
+
+A call waiting longer than `wait_threshold` means every thread is busy, the warning names the rpc methods
+that occupy the threads and wait in the queue, it is logged once per `warn_interval` seconds at most.
+"""
+import math
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from time import perf_counter
+from typing import Callable, Dict, Optional
+from logging import Logger
+from .registry import EXECUTOR_SUBSYSTEMS, ExecutorStats
+from ..request.request import _current_request, _EmptyRequest
+
+__all__ = [
+    'InstrumentedExecutor',
+    'SubsystemExecutor'
+]
+
+NO_REQUEST = '<no request>'
+# methods named in a saturation warning
+TOP_METHODS = 5
+
+_SUBSYSTEM_INDEX: Dict[str, int] = {subsystem: i for i, subsystem in enumerate(EXECUTOR_SUBSYSTEMS)}
+
+
+def _current_method() -> str:
+    request = _current_request.get()
+    if request is _EmptyRequest or not request.full_method:
+        return NO_REQUEST
+    return request.full_method
+
+
+def _decrement(counter: Counter, key: str):
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """a `ThreadPoolExecutor` recording its backlog and queue wait by subsystem
+
+    Args:
+        max_workers: threads of the pool
+        thread_name_prefix: prefix of the thread names
+        stats: where the counters are written, in process counters by default
+        wait_threshold: seconds a call waits in the queue before the saturation is reported
+        logger: saturation warnings are logged when set
+        warn_interval: seconds between two saturation warnings
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 thread_name_prefix: str = '',
+                 stats: Optional[ExecutorStats] = None,
+                 wait_threshold: float = 0.1,
+                 logger: Optional[Logger] = None,
+                 warn_interval: float = 10.0):
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.stats = stats if stats is not None else ExecutorStats()
+        self.wait_threshold = wait_threshold
+        self.logger = logger
+        self.warn_interval = warn_interval
+        self._stats_lock = threading.Lock()
+        self._queued_methods: Counter = Counter()
+        self._running_methods: Counter = Counter()
+        self._warned_at = -math.inf
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def labeled(self, subsystem: str) -> 'SubsystemExecutor':
+        """the view a subsystem submits its calls through"""
+        if subsystem not in _SUBSYSTEM_INDEX:
+            raise ValueError(f'unknown executor subsystem {subsystem!r}, one of {EXECUTOR_SUBSYSTEMS}')
+        return SubsystemExecutor(self, subsystem)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        return self.submit_as('other', fn, *args, **kwargs)
+
+    def submit_as(self, subsystem: str, fn: Callable, *args, **kwargs) -> Future:
+        """submit a call on behalf of `subsystem`, it is attributed to the rpc method being handled"""
+        index = _SUBSYSTEM_INDEX[subsystem]
+        method = _current_method()
+        with self._stats_lock:
+            self.stats.submit(index)
+            self._queued_methods[method] += 1
+        future = super().submit(self._run, index, method, perf_counter(), fn, args, kwargs)
+        future.add_done_callback(partial(self._cancelled, index, method))
+        return future
+
+    def running_methods(self) -> Dict[str, int]:
+        """calls running in the threads by rpc method"""
+        with self._stats_lock:
+            return dict(self._running_methods)
+
+    def queued_methods(self) -> Dict[str, int]:
+        """calls waiting for a thread by rpc method"""
+        with self._stats_lock:
+            return dict(self._queued_methods)
+
+    def _run(self, index: int, method: str, submitted: float, fn: Callable, args: tuple, kwargs: dict):
+        wait = perf_counter() - submitted
+        with self._stats_lock:
+            self.stats.start(index, wait)
+            _decrement(self._queued_methods, method)
+            self._running_methods[method] += 1
+        if wait >= self.wait_threshold:
+            self._report(EXECUTOR_SUBSYSTEMS[index], method, wait)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._stats_lock:
+                self.stats.finish(index)
+                _decrement(self._running_methods, method)
+
+    def _cancelled(self, index: int, method: str, future: Future):
+        # a call cancelled while queued never runs, e.g. the asyncio future of a cancelled rpc
+        if future.cancelled():
+            with self._stats_lock:
+                self.stats.cancel(index)
+                _decrement(self._queued_methods, method)
+
+    def _report(self, subsystem: str, method: str, wait: float):
+        now = perf_counter()
+        with self._stats_lock:
+            if self.logger is None or now - self._warned_at < self.warn_interval:
+                return
+            self._warned_at = now
+            running = self._running_methods.most_common()
+            queued = self._queued_methods.most_common()
+        self.logger.warning(
+            f'Executor saturated, a `{subsystem}` call of `{method}` waited {wait:.3f}s for a thread, '
+            f'{sum(count for _, count in running)} of {self._max_workers} threads busy with: '
+            f'{", ".join(f"{name} x{count}" for name, count in running[:TOP_METHODS])}; '
+            f'{sum(count for _, count in queued)} calls queued by: '
+            f'{", ".join(f"{name} x{count}" for name, count in queued[:TOP_METHODS]) or "-"}'
+        )
+
+
+class SubsystemExecutor:
+    """the view of an `InstrumentedExecutor` its calls are counted under `subsystem` through"""
+    __slots__ = ('executor', 'subsystem')
+
+    def __init__(self, executor: InstrumentedExecutor, subsystem: str):
+        self.executor = executor
+        self.subsystem = subsystem
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        return self.executor.submit_as(self.subsystem, fn, *args, **kwargs)
+
+    def map(self, fn: Callable, *iterables, timeout: Optional[float] = None, chunksize: int = 1):
+        return self.executor.map(fn, *iterables, timeout=timeout, chunksize=chunksize)
+
+    def shutdown(self, wait: bool = True, **kwargs):
+        self.executor.shutdown(wait, **kwargs)
@@ -0,0 +1,201 @@
+"""render a `MetricsRegistry` as OpenMetrics text
+
+Request counts and in flight gauges are reported per worker, which shows how the
+`so_reuseport` balancing spreads the calls, status codes and histograms are summed over the workers.
+The cpu time of the methods and the tenants, the event loop lag, the runtime executor and the offloaded
+serialization of every worker are only reported when the registry records them.
+"""
+import math
+from typing import Dict, List, Sequence, TYPE_CHECKING
+from .registry import (
+    LATENCY_BUCKETS, SIZE_BUCKETS, STATUS_CODES,
+    REQUESTS, IN_FLIGHT, CODES, LATENCY, REQUEST_SIZE, RESPONSE_SIZE, INT_FIELDS,
+    LATENCY_SUM, REQUEST_SIZE_SUM, RESPONSE_SIZE_SUM, LOOP_CPU_SUM, EXECUTOR_CPU_SUM, FLOAT_FIELDS, LAG_STALLS,
+    TENANT_LOOP_CPU, TENANT_EXECUTOR_CPU, TENANT_WALL,
+    EXECUTOR_SUBMITTED, EXECUTOR_QUEUED, EXECUTOR_RUNNING, EXECUTOR_WAIT, OFFLOADED_DECODES, OFFLOADED_ENCODES
+)
+
+if TYPE_CHECKING:
+    from .registry import MetricsRegistry
+
+__all__ = ['render_openmetrics']
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _histogram(lines: List[str], name: str, labels: Dict[str, object], bounds: Sequence[float],
+               counts: Sequence[int], total: float):
+    cumulative = 0
+    for bound, count in zip((*bounds, math.inf), counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels(**labels, le=_number(float(bound)))} {cumulative}')
+    lines.append(f'{name}_count{_labels(**labels)} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {_number(float(total))}')
+
+
+def render_openmetrics(registry: 'MetricsRegistry') -> str:
+    """one aggregated snapshot of every worker"""
+    rows = registry.read()
+    started, in_flight, handled, latency, request_size, response_size, cpu = [], [], [], [], [], [], []
+    for method, worker_rows in rows.items():
+        ints = [sum(column) for column in zip(*(row[0] for row in worker_rows))] or [0] * INT_FIELDS
+        floats = [sum(column) for column in zip(*(row[1] for row in worker_rows))] or [0.0] * FLOAT_FIELDS
+        for worker, (worker_ints, _) in enumerate(worker_rows):
+            started.append(f'grpc_server_started_total{_labels(grpc_method=method, worker=worker)} '
+                           f'{worker_ints[REQUESTS]}')
+            in_flight.append(f'grpc_server_in_flight{_labels(grpc_method=method, worker=worker)} '
+                             f'{worker_ints[IN_FLIGHT]}')
+        for i, code in enumerate(STATUS_CODES):
+            count = ints[CODES + i]
+            if count:
+                handled.append(f'grpc_server_handled_total{_labels(grpc_method=method, grpc_code=code.name)} {count}')
+        _histogram(latency, 'grpc_server_handling_seconds', {'grpc_method': method}, LATENCY_BUCKETS,
+                   ints[LATENCY:LATENCY + len(LATENCY_BUCKETS) + 1], floats[LATENCY_SUM])
+        _histogram(request_size, 'grpc_server_request_bytes', {'grpc_method': method}, SIZE_BUCKETS,
+                   ints[REQUEST_SIZE:REQUEST_SIZE + len(SIZE_BUCKETS) + 1], floats[REQUEST_SIZE_SUM])
+        _histogram(response_size, 'grpc_server_response_bytes', {'grpc_method': method}, SIZE_BUCKETS,
+                   ints[RESPONSE_SIZE:RESPONSE_SIZE + len(SIZE_BUCKETS) + 1], floats[RESPONSE_SIZE_SUM])
+        if registry.cpu_accounting:
+            cpu.append(f'grpc_server_cpu_seconds_total{_labels(grpc_method=method, thread="loop")} '
+                       f'{_number(floats[LOOP_CPU_SUM])}')
+            cpu.append(f'grpc_server_cpu_seconds_total{_labels(grpc_method=method, thread="executor")} '
+                       f'{_number(floats[EXECUTOR_CPU_SUM])}')
+    loop = []
+    if registry.loop_monitor:
+        loop_lag, stalls = [], []
+        for worker in range(registry.workers):
+            counts, total = registry.loop_lag(worker).read()
+            _histogram(loop_lag, 'grpc_server_loop_lag_seconds', {'worker': worker}, LATENCY_BUCKETS,
+                       counts[:LAG_STALLS], total)
+            stalls.append(f'grpc_server_loop_stalls_total{_labels(worker=worker)} {counts[LAG_STALLS]}')
+        loop.extend((
+            '# TYPE grpc_server_loop_lag_seconds histogram',
+            '# UNIT grpc_server_loop_lag_seconds seconds',
+            '# HELP grpc_server_loop_lag_seconds Event loop scheduling delay, by worker.',
+            *loop_lag,
+            '# TYPE grpc_server_loop_stalls counter',
+            '# HELP grpc_server_loop_stalls Event loop stalls above the monitor threshold, by worker.',
+            *stalls
+        ))
+    tenant_requests, tenant_cpu, tenant_wall = [], [], []
+    for tenant, (requests, sums) in sorted(registry.read_tenants().items()):
+        tenant_requests.append(f'grpc_server_tenant_requests_total{_labels(tenant=tenant)} {requests}')
+        tenant_cpu.append(f'grpc_server_tenant_cpu_seconds_total{_labels(tenant=tenant, thread="loop")} '
+                          f'{_number(sums[TENANT_LOOP_CPU])}')
+        tenant_cpu.append(f'grpc_server_tenant_cpu_seconds_total{_labels(tenant=tenant, thread="executor")} '
+                          f'{_number(sums[TENANT_EXECUTOR_CPU])}')
+        tenant_wall.append(f'grpc_server_tenant_wall_seconds_total{_labels(tenant=tenant)} '
+                           f'{_number(sums[TENANT_WALL])}')
+    executor = []
+    if registry.executor_metrics:
+        submitted, queued, running, wait = [], [], [], []
+        rows = [registry.executor_stats(worker).read() for worker in range(registry.workers)]
+        for subsystem in rows[0]:
+            if not any(worker_rows[subsystem][0][EXECUTOR_SUBMITTED] for worker_rows in rows):
+                continue
+            for worker, worker_rows in enumerate(rows):
+                ints = worker_rows[subsystem][0]
+                labels = _labels(subsystem=subsystem, worker=worker)
+                submitted.append(f'grpc_server_executor_submitted_total{labels} {ints[EXECUTOR_SUBMITTED]}')
+                queued.append(f'grpc_server_executor_queued{labels} {ints[EXECUTOR_QUEUED]}')
+                running.append(f'grpc_server_executor_running{labels} {ints[EXECUTOR_RUNNING]}')
+            wait_counts = [sum(column) for column in zip(*(worker_rows[subsystem][0][EXECUTOR_WAIT:] for worker_rows in rows))]
+            wait_sum = sum(worker_rows[subsystem][1] for worker_rows in rows)
+            _histogram(wait, 'grpc_server_executor_queue_wait_seconds', {'subsystem': subsystem}, LATENCY_BUCKETS,
+                       wait_counts, wait_sum)
+        executor.extend((
+            '# TYPE grpc_server_executor_submitted counter',
+            '# HELP grpc_server_executor_submitted Calls submitted to the runtime executor, by subsystem and worker.',
+            *submitted,
+            '# TYPE grpc_server_executor_queued gauge',
+            '# HELP grpc_server_executor_queued Calls waiting for an executor thread, by subsystem and worker.',
+            *queued,
+            '# TYPE grpc_server_executor_running gauge',
+            '# HELP grpc_server_executor_running Calls running in executor threads, by subsystem and worker.',
+            *running,
+            '# TYPE grpc_server_executor_queue_wait_seconds histogram',
+            '# UNIT grpc_server_executor_queue_wait_seconds seconds',
+            '# HELP grpc_server_executor_queue_wait_seconds Time calls waited for an executor thread, by subsystem.',
+            *wait
+        ))
+    offload = []
+    if registry.serialization_offload:
+        offloaded = []
+        for worker in range(registry.workers):
+            counts = registry.offload_stats(worker).read()
+            for direction, index in (('decode', OFFLOADED_DECODES), ('encode', OFFLOADED_ENCODES)):
+                offloaded.append(
+                    f'grpc_server_serialization_offloaded_total{_labels(direction=direction, worker=worker)} '
+                    f'{counts[index]}'
+                )
+        offload.extend((
+            '# TYPE grpc_server_serialization_offloaded counter',
+            '# HELP grpc_server_serialization_offloaded Payloads serialized in the executor, '
+            'by direction and worker.',
+            *offloaded
+        ))
+    accounting = []
+    if registry.cpu_accounting:
+        accounting.extend((
+            '# TYPE grpc_server_cpu_seconds counter',
+            '# UNIT grpc_server_cpu_seconds seconds',
+            '# HELP grpc_server_cpu_seconds Cpu time of the calls, by method and thread (event loop or executor).',
+            *cpu
+        ))
+    if registry.tenant_slots:
+        accounting.extend((
+            '# TYPE grpc_server_tenant_requests counter',
+            '# HELP grpc_server_tenant_requests Calls completed, by tenant.',
+            *tenant_requests,
+            '# TYPE grpc_server_tenant_cpu_seconds counter',
+            '# UNIT grpc_server_tenant_cpu_seconds seconds',
+            '# HELP grpc_server_tenant_cpu_seconds Cpu time of the calls, by tenant and thread.',
+            *tenant_cpu,
+            '# TYPE grpc_server_tenant_wall_seconds counter',
+            '# UNIT grpc_server_tenant_wall_seconds seconds',
+            '# HELP grpc_server_tenant_wall_seconds Wall time of the calls, by tenant.',
+            *tenant_wall
+        ))
+    lines = [
+        '# TYPE grpc_server_started counter',
+        '# HELP grpc_server_started Calls started, by method and worker.',
+        *started,
+        '# TYPE grpc_server_in_flight gauge',
+        '# HELP grpc_server_in_flight Calls in progress, by method and worker.',
+        *in_flight,
+        '# TYPE grpc_server_handled counter',
+        '# HELP grpc_server_handled Calls completed, by method and status code.',
+        *handled,
+        '# TYPE grpc_server_handling_seconds histogram',
+        '# UNIT grpc_server_handling_seconds seconds',
+        '# HELP grpc_server_handling_seconds Call latency.',
+        *latency,
+        '# TYPE grpc_server_request_bytes histogram',
+        '# UNIT grpc_server_request_bytes bytes',
+        '# HELP grpc_server_request_bytes Request message size.',
+        *request_size,
+        '# TYPE grpc_server_response_bytes histogram',
+        '# UNIT grpc_server_response_bytes bytes',
+        '# HELP grpc_server_response_bytes Response message size.',
+        *response_size,
+        *loop,
+        *accounting,
+        *executor,
+        *offload,
+        '# EOF',
+    ]
+    return '\n'.join(lines) + '\n'
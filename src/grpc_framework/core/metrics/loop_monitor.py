@@ -0,0 +1,119 @@
+"""event loop lag monitor of a worker
+
+A task on the loop sleeps `interval` seconds in a row, the time it wakes up late is the scheduling delay
+every other callback of the loop suffered, it is recorded in a `LoopLagHistogram`.
+
+A blocked loop can not report itself, a watchdog thread compares the last heartbeat of the task with
+the clock, once the loop is blocked longer than `stall_threshold` it captures the stack of the loop thread
+and the rpc method of the task that is running, while the stall is still going on.
+"""
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+import weakref
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from .registry import LoopLagHistogram
+
+__all__ = [
+    'LoopLagMonitor'
+]
+
+NO_REQUEST = '<no request>'
+
+
+class LoopLagMonitor:
+    """measure the event loop lag and report stalls with the method and the stack that blocked the loop
+
+    Args:
+        loop: event loop of the worker, the monitor is started in the thread running it
+        interval: seconds between two lag measurements
+        stall_threshold: seconds the loop is blocked before the stall is captured
+        histogram: where the lag is recorded, an in process histogram by default
+        logger: stalls are logged as warnings when set
+        max_stalls: number of captured stalls kept in `stalls`
+    """
+
+    def __init__(self,
+                 loop: asyncio.AbstractEventLoop,
+                 interval: float = 0.05,
+                 stall_threshold: float = 0.1,
+                 histogram: Optional[LoopLagHistogram] = None,
+                 logger: Optional[logging.Logger] = None,
+                 max_stalls: int = 100):
+        self.loop = loop
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.histogram = histogram if histogram is not None else LoopLagHistogram()
+        self.logger = logger
+        self.stalls: Deque[Dict] = deque(maxlen=max_stalls)
+        self._task_methods: 'weakref.WeakKeyDictionary[asyncio.Task, str]' = weakref.WeakKeyDictionary()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+        self._reported_heartbeat = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """schedule the measuring task and start the watchdog thread"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stop_event.clear()
+        self._task = self.loop.create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name='grpc-framework-loop-monitor', daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def tag_task(self, method: str):
+        """name the method of the current task, a stall while it runs is attributed to it"""
+        task = asyncio.current_task()
+        if task is not None:
+            self._task_methods[task] = method
+
+    async def _measure(self):
+        interval = self.interval
+        histogram = self.histogram
+        while True:
+            before = time.perf_counter()
+            self._heartbeat = before
+            await asyncio.sleep(interval)
+            histogram.observe(max(time.perf_counter() - before - interval, 0.0))
+
+    def _watch(self):
+        check_interval = min(self.interval, self.stall_threshold) / 2
+        while not self._stop_event.wait(check_interval):
+            heartbeat = self._heartbeat
+            blocked = time.perf_counter() - heartbeat - self.interval
+            if blocked >= self.stall_threshold and heartbeat != self._reported_heartbeat:
+                # one report per stall, the heartbeat moves on once the loop runs again
+                self._reported_heartbeat = heartbeat
+                self._capture(blocked)
+
+    def _capture(self, blocked: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack: List[str] = traceback.format_stack(frame) if frame is not None else []
+        task = asyncio.current_task(self.loop)
+        method = self._task_methods.get(task, NO_REQUEST) if task is not None else NO_REQUEST
+        self.histogram.stall()
+        self.stalls.append({
+            'time': time.time(),
+            'method': method,
+            'blocked_seconds': blocked,
+            'stack': stack
+        })
+        if self.logger is not None:
+            self.logger.warning(
+                f'Event loop blocked for more than {blocked:.3f}s by `{method}`, stack of the loop thread:\n'
+                + ''.join(stack)
+            )
@@ -0,0 +1,454 @@
+"""per method metrics kept in shared memory
+
+Every worker owns one row of counters per method, so a worker only ever writes its own row and no lock is needed.
+The block is created by the main process before the workers start, any process can read all rows
+and render one aggregated snapshot.
+
+Layout of a row, all int64 except the float64 sums:
+    requests, in flight, one counter per grpc status code,
+    latency / request size / response size histogram buckets (the last bucket is +Inf)
+Every worker also owns one event loop lag row: lag histogram buckets, stalls, and the lag sum.
+With cpu accounting every method row also sums the loop and executor cpu time, and every worker owns
+`tenant_slots` tenant rows: requests, loop / executor cpu and wall time sums, the tenant names follow the floats.
+With executor metrics every worker owns one executor row per subsystem: submitted, queued, running,
+queue wait histogram buckets, and the queue wait sum.
+With serialization offloading every worker owns one row: the requests decoded and the responses encoded
+in the executor.
+"""
+import os
+import bisect
+from array import array
+import time
+import grpc
+from multiprocessing import shared_memory, resource_tracker
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
+from ...types import BufferLike
+
+__all__ = [
+    'LATENCY_BUCKETS',
+    'SIZE_BUCKETS',
+    'STATUS_CODES',
+    'MethodMetrics',
+    'LoopLagHistogram',
+    'TenantMetrics',
+    'EXECUTOR_SUBSYSTEMS',
+    'ExecutorStats',
+    'OffloadStats',
+    'MetricsRegistry'
+]
+
+# log-linear (1-2-5) buckets in seconds, from 100us to 50s
+LATENCY_BUCKETS: Tuple[float, ...] = tuple(
+    round(mantissa * 10 ** exponent, 6) for exponent in range(-4, 2) for mantissa in (1, 2, 5)
+)
+# powers of 4 in bytes, from 64B to 64MiB
+SIZE_BUCKETS: Tuple[int, ...] = tuple(64 * 4 ** i for i in range(11))
+STATUS_CODES: Tuple[grpc.StatusCode, ...] = tuple(grpc.StatusCode)
+# `ServicerContext.code()` reports the code set by the handler, as the enum or as its integer value
+_CODE_INDEX: Dict[object, int] = {
+    **{code: i for i, code in enumerate(STATUS_CODES)},
+    **{code.value[0]: i for i, code in enumerate(STATUS_CODES)}
+}
+
+REQUESTS = 0
+IN_FLIGHT = 1
+CODES = 2
+LATENCY = CODES + len(STATUS_CODES)
+REQUEST_SIZE = LATENCY + len(LATENCY_BUCKETS) + 1
+RESPONSE_SIZE = REQUEST_SIZE + len(SIZE_BUCKETS) + 1
+INT_FIELDS = RESPONSE_SIZE + len(SIZE_BUCKETS) + 1
+
+LATENCY_SUM = 0
+REQUEST_SIZE_SUM = 1
+RESPONSE_SIZE_SUM = 2
+LOOP_CPU_SUM = 3
+EXECUTOR_CPU_SUM = 4
+FLOAT_FIELDS = 5
+
+LAG_STALLS = len(LATENCY_BUCKETS) + 1
+LAG_INT_FIELDS = LAG_STALLS + 1
+
+# tenants a worker has published, then the requests of every slot
+TENANT_COUNT = 0
+TENANT_LOOP_CPU = 0
+TENANT_EXECUTOR_CPU = 1
+TENANT_WALL = 2
+TENANT_FLOAT_FIELDS = 3
+TENANT_NAME_BYTES = 64
+# tenants beyond the slots of a worker are summed up in its last slot
+OTHER_TENANT = '<other>'
+
+# who submits the work to the runtime executor, `other` is everything else (e.g. grpc itself)
+EXECUTOR_SUBSYSTEMS: Tuple[str, ...] = (
+    'handler', 'dependency', 'hook', 'error_handler', 'lifecycle', 'serialization', 'other'
+)
+EXECUTOR_SUBMITTED = 0
+EXECUTOR_QUEUED = 1
+EXECUTOR_RUNNING = 2
+EXECUTOR_WAIT = 3
+EXECUTOR_INT_FIELDS = EXECUTOR_WAIT + len(LATENCY_BUCKETS) + 1
+
+OFFLOADED_DECODES = 0
+OFFLOADED_ENCODES = 1
+OFFLOAD_INT_FIELDS = 2
+
+
+def payload_size(payload) -> Optional[int]:
+    """size of a request/response payload, None when it is not a buffer or a message"""
+    if isinstance(payload, BufferLike):
+        return len(payload)
+    byte_size = getattr(payload, 'ByteSize', None)
+    if byte_size is not None:
+        # decoded/encoded by grpc itself
+        return byte_size()
+    return None
+
+
+class MethodMetrics:
+    """the row of one method in the current worker"""
+    __slots__ = ('method', '_ints', '_floats', '_int_base', '_float_base')
+
+    def __init__(self, method: str, ints: memoryview, floats: memoryview, int_base: int, float_base: int):
+        self.method = method
+        self._ints = ints
+        self._floats = floats
+        self._int_base = int_base
+        self._float_base = float_base
+
+    def start(self):
+        """a call of the method started"""
+        self._ints[self._int_base + REQUESTS] += 1
+        self._ints[self._int_base + IN_FLIGHT] += 1
+
+    def finish(self, started: float, code: Union[grpc.StatusCode, int, None]):
+        """a call finished, `started` is its `time.perf_counter()` start, None code means OK"""
+        elapsed = time.perf_counter() - started
+        ints, base = self._ints, self._int_base
+        ints[base + IN_FLIGHT] -= 1
+        ints[base + CODES + _CODE_INDEX.get(code, 0)] += 1
+        ints[base + LATENCY + bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        self._floats[self._float_base + LATENCY_SUM] += elapsed
+
+    def observe_request(self, payload):
+        size = payload_size(payload)
+        if size is not None:
+            self._ints[self._int_base + REQUEST_SIZE + bisect.bisect_left(SIZE_BUCKETS, size)] += 1
+            self._floats[self._float_base + REQUEST_SIZE_SUM] += size
+
+    def observe_response(self, payload):
+        size = payload_size(payload)
+        if size is not None:
+            self._ints[self._int_base + RESPONSE_SIZE + bisect.bisect_left(SIZE_BUCKETS, size)] += 1
+            self._floats[self._float_base + RESPONSE_SIZE_SUM] += size
+
+    def observe_cpu(self, loop_cpu: float, executor_cpu: float):
+        """cpu seconds a call spent on the event loop and in executor threads"""
+        self._floats[self._float_base + LOOP_CPU_SUM] += loop_cpu
+        self._floats[self._float_base + EXECUTOR_CPU_SUM] += executor_cpu
+
+    async def observe_request_stream(self, request_iterator: AsyncIterator) -> AsyncIterator:
+        """pass a request stream through, recording the size of every item"""
+        async for item in request_iterator:
+            self.observe_request(item)
+            yield item
+
+
+class TenantMetrics:
+    """the row of one tenant in the current worker"""
+    __slots__ = ('tenant', '_ints', '_floats', '_int_index', '_float_base')
+
+    def __init__(self, tenant: str, ints: memoryview, floats: memoryview, int_index: int, float_base: int):
+        self.tenant = tenant
+        self._ints = ints
+        self._floats = floats
+        self._int_index = int_index
+        self._float_base = float_base
+
+    def observe(self, loop_cpu: float, executor_cpu: float, wall: float):
+        self._ints[self._int_index] += 1
+        floats, base = self._floats, self._float_base
+        floats[base + TENANT_LOOP_CPU] += loop_cpu
+        floats[base + TENANT_EXECUTOR_CPU] += executor_cpu
+        floats[base + TENANT_WALL] += wall
+
+
+class LoopLagHistogram:
+    """event loop lag of one worker, backed by the registry or by plain arrays in process"""
+    __slots__ = ('_ints', '_floats', '_int_base', '_float_base')
+
+    def __init__(self, ints=None, floats=None, int_base: int = 0, float_base: int = 0):
+        self._ints = ints if ints is not None else array('q', bytes(LAG_INT_FIELDS * 8))
+        self._floats = floats if floats is not None else array('d', bytes(8))
+        self._int_base = int_base
+        self._float_base = float_base
+
+    def observe(self, lag: float):
+        self._ints[self._int_base + bisect.bisect_left(LATENCY_BUCKETS, lag)] += 1
+        self._floats[self._float_base] += lag
+
+    def stall(self):
+        """count a stall above the monitor threshold"""
+        self._ints[self._int_base + LAG_STALLS] += 1
+
+    def read(self) -> Tuple[List[int], float]:
+        """(bucket counts + stalls, lag sum)"""
+        return (
+            list(self._ints[self._int_base:self._int_base + LAG_INT_FIELDS]),
+            self._floats[self._float_base]
+        )
+
+
+class ExecutorStats:
+    """runtime executor counters of one worker by subsystem, backed by the registry or by plain arrays in process
+
+    the counters are written from the event loop and from the executor threads, the caller serializes the writes
+    """
+    __slots__ = ('_ints', '_floats', '_int_base', '_float_base')
+
+    def __init__(self, ints=None, floats=None, int_base: int = 0, float_base: int = 0):
+        self._ints = ints if ints is not None else array('q', bytes(len(EXECUTOR_SUBSYSTEMS) * EXECUTOR_INT_FIELDS * 8))
+        self._floats = floats if floats is not None else array('d', bytes(len(EXECUTOR_SUBSYSTEMS) * 8))
+        self._int_base = int_base
+        self._float_base = float_base
+
+    def submit(self, subsystem: int):
+        base = self._int_base + subsystem * EXECUTOR_INT_FIELDS
+        self._ints[base + EXECUTOR_SUBMITTED] += 1
+        self._ints[base + EXECUTOR_QUEUED] += 1
+
+    def cancel(self, subsystem: int):
+        """a queued call was cancelled before a thread took it"""
+        self._ints[self._int_base + subsystem * EXECUTOR_INT_FIELDS + EXECUTOR_QUEUED] -= 1
+
+    def start(self, subsystem: int, wait: float):
+        """a thread took a queued call after `wait` seconds"""
+        base = self._int_base + subsystem * EXECUTOR_INT_FIELDS
+        ints = self._ints
+        ints[base + EXECUTOR_QUEUED] -= 1
+        ints[base + EXECUTOR_RUNNING] += 1
+        ints[base + EXECUTOR_WAIT + bisect.bisect_left(LATENCY_BUCKETS, wait)] += 1
+        self._floats[self._float_base + subsystem] += wait
+
+    def finish(self, subsystem: int):
+        self._ints[self._int_base + subsystem * EXECUTOR_INT_FIELDS + EXECUTOR_RUNNING] -= 1
+
+    def read(self) -> Dict[str, Tuple[List[int], float]]:
+        """`{subsystem: ([submitted, queued, running, wait buckets...], wait sum)}`"""
+        result = {}
+        for i, subsystem in enumerate(EXECUTOR_SUBSYSTEMS):
+            base = self._int_base + i * EXECUTOR_INT_FIELDS
+            result[subsystem] = (list(self._ints[base:base + EXECUTOR_INT_FIELDS]), self._floats[self._float_base + i])
+        return result
+
+
+class OffloadStats:
+    """serializer calls of one worker run in the executor, backed by the registry or by a plain array in process"""
+    __slots__ = ('_ints', '_int_base')
+
+    def __init__(self, ints=None, int_base: int = 0):
+        self._ints = ints if ints is not None else array('q', bytes(OFFLOAD_INT_FIELDS * 8))
+        self._int_base = int_base
+
+    def decode(self):
+        self._ints[self._int_base + OFFLOADED_DECODES] += 1
+
+    def encode(self):
+        self._ints[self._int_base + OFFLOADED_ENCODES] += 1
+
+    def read(self) -> List[int]:
+        """[decodes, encodes]"""
+        return list(self._ints[self._int_base:self._int_base + OFFLOAD_INT_FIELDS])
+
+
+class MetricsRegistry:
+    """per method, per worker counters in one shared memory block
+
+    Args:
+        methods: full method names (`/package.Service/Method`) known before the workers start
+        workers: number of worker processes
+        cpu_accounting: whether the cpu time of the calls is recorded and exported
+        tenant_slots: tenants every worker records on its own, 0 disables the tenant rows
+        executor_metrics: whether the runtime executor rows are recorded and exported
+        loop_monitor: whether the event loop lag rows are recorded and exported
+        serialization_offload: whether the offloaded serializer calls are recorded and exported
+    """
+
+    def __init__(self,
+                 methods: Sequence[str],
+                 workers: int = 1,
+                 cpu_accounting: bool = False,
+                 tenant_slots: int = 0,
+                 executor_metrics: bool = False,
+                 loop_monitor: bool = False,
+                 serialization_offload: bool = False):
+        self.methods: List[str] = sorted(set(methods))
+        self.workers = workers
+        self.worker_index = 0
+        self.cpu_accounting = cpu_accounting
+        self.tenant_slots = tenant_slots
+        self.executor_metrics = executor_metrics
+        self.loop_monitor = loop_monitor
+        self.serialization_offload = serialization_offload
+        self._method_index: Dict[str, int] = {method: i for i, method in enumerate(self.methods)}
+        self._tenants: Dict[str, TenantMetrics] = {}
+        self._rows = max(len(self.methods), 1) * workers
+        self._lag_int_base = self._rows * INT_FIELDS
+        self._lag_float_base = self._rows * FLOAT_FIELDS
+        self._tenant_int_base = self._lag_int_base + workers * LAG_INT_FIELDS
+        self._tenant_float_base = self._lag_float_base + workers
+        self._executor_int_base = self._tenant_int_base + workers * (tenant_slots + 1)
+        self._executor_float_base = self._tenant_float_base + workers * tenant_slots * TENANT_FLOAT_FIELDS
+        executor_rows = workers * len(EXECUTOR_SUBSYSTEMS) if executor_metrics else 0
+        self._offload_int_base = self._executor_int_base + executor_rows * EXECUTOR_INT_FIELDS
+        offload_rows = workers if serialization_offload else 0
+        self._int_bytes = (self._offload_int_base + offload_rows * OFFLOAD_INT_FIELDS) * 8
+        self._float_bytes = (self._executor_float_base + executor_rows) * 8
+        self._name_bytes = workers * tenant_slots * TENANT_NAME_BYTES
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=self._int_bytes + self._float_bytes + max(self._name_bytes, 1)
+        )
+        self._owner_pid = os.getpid()
+        self._owner = True
+        self._attach_views()
+
+    def _attach_views(self):
+        buf = self._shm.buf
+        self._ints = buf[:self._int_bytes].cast('q')
+        self._floats = buf[self._int_bytes:self._int_bytes + self._float_bytes].cast('d')
+        names_start = self._int_bytes + self._float_bytes
+        self._names = buf[names_start:names_start + self._name_bytes]
+
+    def set_worker(self, worker_index: int):
+        """select the rows the current process writes"""
+        if not 0 <= worker_index < self.workers:
+            raise ValueError(f'worker index {worker_index} out of range, there are {self.workers} workers')
+        self.worker_index = worker_index
+        self._tenants = {}
+
+    def method(self, method: str) -> Optional[MethodMetrics]:
+        """the row of a method in the current worker, None for a method unknown when the registry was created"""
+        index = self._method_index.get(method)
+        if index is None:
+            return None
+        row = self.worker_index * len(self.methods) + index
+        return MethodMetrics(method, self._ints, self._floats, row * INT_FIELDS, row * FLOAT_FIELDS)
+
+    def loop_lag(self, worker_index: Optional[int] = None) -> LoopLagHistogram:
+        """the loop lag row of a worker, the current worker by default"""
+        worker = self.worker_index if worker_index is None else worker_index
+        return LoopLagHistogram(
+            self._ints, self._floats,
+            self._lag_int_base + worker * LAG_INT_FIELDS, self._lag_float_base + worker
+        )
+
+    def executor_stats(self, worker_index: Optional[int] = None) -> Optional[ExecutorStats]:
+        """the executor rows of a worker, the current worker by default; None without executor metrics"""
+        if not self.executor_metrics:
+            return None
+        worker = self.worker_index if worker_index is None else worker_index
+        return ExecutorStats(
+            self._ints, self._floats,
+            self._executor_int_base + worker * len(EXECUTOR_SUBSYSTEMS) * EXECUTOR_INT_FIELDS,
+            self._executor_float_base + worker * len(EXECUTOR_SUBSYSTEMS)
+        )
+
+    def offload_stats(self, worker_index: Optional[int] = None) -> Optional[OffloadStats]:
+        """the offload row of a worker, the current worker by default; None without serialization offloading"""
+        if not self.serialization_offload:
+            return None
+        worker = self.worker_index if worker_index is None else worker_index
+        return OffloadStats(self._ints, self._offload_int_base + worker * OFFLOAD_INT_FIELDS)
+
+    def tenant(self, tenant: str) -> Optional[TenantMetrics]:
+        """the row of a tenant in the current worker, a new tenant takes the next free slot
+
+        once the slots but one are taken, the remaining tenants share the last slot as `OTHER_TENANT`.
+        None when the registry has no tenant rows.
+        """
+        metrics = self._tenants.get(tenant)
+        if metrics is not None:
+            return metrics
+        if not self.tenant_slots:
+            return None
+        if len(self._tenants) >= self.tenant_slots - 1 and tenant != OTHER_TENANT:
+            return self.tenant(OTHER_TENANT)
+        count_index = self._tenant_int_base + self.worker_index * (self.tenant_slots + 1) + TENANT_COUNT
+        slot = self._ints[count_index]
+        name_start = (self.worker_index * self.tenant_slots + slot) * TENANT_NAME_BYTES
+        encoded = tenant.encode('utf-8')[:TENANT_NAME_BYTES]
+        self._names[name_start:name_start + TENANT_NAME_BYTES] = encoded.ljust(TENANT_NAME_BYTES, b'\0')
+        # the name is complete before a reader sees the slot
+        self._ints[count_index] = slot + 1
+        metrics = self._tenants[tenant] = TenantMetrics(
+            tenant, self._ints, self._floats, count_index + 1 + slot,
+            self._tenant_float_base + (self.worker_index * self.tenant_slots + slot) * TENANT_FLOAT_FIELDS
+        )
+        return metrics
+
+    def read_tenants(self) -> Dict[str, Tuple[int, List[float]]]:
+        """`{tenant: (requests, [loop cpu, executor cpu, wall])}` summed over the workers"""
+        result: Dict[str, Tuple[int, List[float]]] = {}
+        ints, floats = self._ints.tolist(), self._floats.tolist()
+        for worker in range(self.workers):
+            count_index = self._tenant_int_base + worker * (self.tenant_slots + 1) + TENANT_COUNT
+            for slot in range(ints[count_index]):
+                name_start = (worker * self.tenant_slots + slot) * TENANT_NAME_BYTES
+                name = bytes(self._names[name_start:name_start + TENANT_NAME_BYTES]).rstrip(b'\0').decode(
+                    'utf-8', 'replace'
+                )
+                float_base = self._tenant_float_base + (worker * self.tenant_slots + slot) * TENANT_FLOAT_FIELDS
+                requests, sums = result.get(name, (0, [0.0] * TENANT_FLOAT_FIELDS))
+                result[name] = (
+                    requests + ints[count_index + 1 + slot],
+                    [total + value for total, value in zip(sums, floats[float_base:float_base + TENANT_FLOAT_FIELDS])]
+                )
+        return result
+
+    def read(self) -> Dict[str, List[Tuple[List[int], List[float]]]]:
+        """a copy of the raw rows, `{method: [(ints, floats) of every worker]}`"""
+        result = {}
+        ints, floats = self._ints.tolist(), self._floats.tolist()
+        for index, method in enumerate(self.methods):
+            rows = []
+            for worker in range(self.workers):
+                row = worker * len(self.methods) + index
+                rows.append((
+                    ints[row * INT_FIELDS:(row + 1) * INT_FIELDS],
+                    floats[row * FLOAT_FIELDS:(row + 1) * FLOAT_FIELDS]
+                ))
+            result[method] = rows
+        return result
+
+    def close(self):
+        """release the views, the main process also removes the shared memory block"""
+        if self._shm is None:
+            return
+        self._tenants = {}
+        self._ints.release()
+        self._floats.release()
+        self._names.release()
+        self._shm.close()
+        # a forked worker inherits the registry as it is, it is no owner in another process
+        if self._owner and os.getpid() == self._owner_pid:
+            self._shm.unlink()
+        self._shm = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shm'] = self._shm.name
+        del state['_ints'], state['_floats'], state['_names']
+        state['_tenants'] = {}
+        return state
+
+    def __setstate__(self, state):
+        name = state.pop('_shm')
+        self.__dict__.update(state)
+        self._owner = False
+        self._shm = shared_memory.SharedMemory(name=name)
+        if os.getpid() != self._owner_pid:
+            try:
+                # only the main process owns the block, an attached worker must not remove it when it exits
+                resource_tracker.unregister(self._shm._name, 'shared_memory')
+            except Exception:
+                pass
+        self._attach_views()
@@ -0,0 +1,135 @@
+"""per call latency breakdown over the stages of a request
+
+A `StageTimer` is only created when `config.stage_timing` is enabled, the adaptors then compile
+the timed variants of their request and response adaptors; the call path is shared and laps
+`NO_STAGE_TIMER` when the call is not timed.
+
+The timer takes `perf_counter_ns` laps: a lap attributes the time since the previous mark to a stage.
+Stages nested in a lap (deserialization while resolving the arguments, serialization while
+sending the response) are measured on their own and excluded from the enclosing lap.
+"""
+import threading
+from time import perf_counter_ns
+from typing import Dict, List, Optional
+
+__all__ = [
+    'STAGES',
+    'StageTimer',
+    'NullStageTimer',
+    'NO_STAGE_TIMER',
+    'StageRecorder',
+    'StageStats'
+]
+
+STAGES = (
+    'interceptor',
+    'middleware',
+    'before_request',
+    'dependencies',
+    'deserialize',
+    'handler',
+    'serialize',
+    'after_request'
+)
+
+
+class StageTimer:
+    """stage durations of one call in nanoseconds"""
+    __slots__ = ('durations', '_mark', '_nested')
+
+    def __init__(self, started: Optional[int] = None):
+        self.durations: Dict[str, int] = dict.fromkeys(STAGES, 0)
+        self._mark = perf_counter_ns() if started is None else started
+        self._nested = 0
+
+    def lap(self, stage: str):
+        """attribute the time since the previous mark to `stage`, nested stages excluded"""
+        now = perf_counter_ns()
+        self.durations[stage] += now - self._mark - self._nested
+        self._mark = now
+        self._nested = 0
+
+    def skip(self):
+        """drop the time since the previous mark, e.g. while a streamed response is written by grpc"""
+        self._mark = perf_counter_ns()
+        self._nested = 0
+
+    def add(self, stage: str, started: int):
+        """attribute the time since `started` to a stage nested in the current lap"""
+        elapsed = perf_counter_ns() - started
+        self.durations[stage] += elapsed
+        self._nested += elapsed
+
+    def server_timing(self) -> str:
+        """the durations as a `server-timing` header value, in milliseconds, stages without time are left out"""
+        return ', '.join(
+            f'{stage};dur={duration / 1e6:.3f}' for stage, duration in self.durations.items() if duration > 0
+        )
+
+
+class NullStageTimer:
+    """the timer of an untimed call, every lap is dropped"""
+    __slots__ = ()
+
+    def lap(self, stage: str):
+        pass
+
+    def skip(self):
+        pass
+
+    def add(self, stage: str, started: int):
+        pass
+
+
+NO_STAGE_TIMER = NullStageTimer()
+
+
+class StageRecorder:
+    """receives the stage durations of every finished call, subclass it to export them"""
+
+    def record(self, method: str, durations: Dict[str, int]):
+        """`method` is the full method name, `durations` the nanoseconds spent in every stage"""
+        raise NotImplementedError
+
+
+class StageStats(StageRecorder):
+    """count, total and max duration per method and stage, kept in process"""
+
+    def __init__(self):
+        # method -> [calls, totals by stage, maxima by stage]
+        self._stats: Dict[str, List] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, durations: Dict[str, int]):
+        with self._lock:
+            stats = self._stats.get(method)
+            if stats is None:
+                stats = self._stats[method] = [0, dict.fromkeys(STAGES, 0), dict.fromkeys(STAGES, 0)]
+            stats[0] += 1
+            totals, maxima = stats[1], stats[2]
+            for stage, duration in durations.items():
+                totals[stage] += duration
+                if duration > maxima[stage]:
+                    maxima[stage] = duration
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """`{method: {'calls': n, 'stages': {stage: {'mean_ms', 'max_ms', 'total_ms'}}}}`"""
+        with self._lock:
+            return {
+                method: {
+                    'calls': calls,
+                    'stages': {
+                        stage: {
+                            'mean_ms': totals[stage] / calls / 1e6,
+                            'max_ms': maxima[stage] / 1e6,
+                            'total_ms': totals[stage] / 1e6
+                        }
+                        for stage in STAGES
+                    }
+                }
+                for method, (calls, totals, maxima) in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
@@ -1,7 +1,7 @@
 import abc
 import asyncio
 import inspect
-from typing import Callable, TYPE_CHECKING
+from typing import Callable, TYPE_CHECKING, Optional
 from ..request import Request
 
 if TYPE_CHECKING:
@@ -21,11 +21,27 @@ class MiddlewareManager:
     def __init__(self, app: 'GRPCFramework'):
         self.app = app
         self._middlewares = []
+        self._chain: Optional[Callable] = None
 
     def add_middleware(self, middleware: BaseMiddleware):
         self._middlewares.append(middleware)
+        # the compiled chain is stale now, it will be rebuilt on next use
+        self._chain = None
+
+    def build(self, _=None) -> Callable:
+        """compile the middleware chain, class based middlewares are instantiated only here"""
+        self._chain = self._build_chain(None)
+        return self._chain
 
     async def dispatch(self, request: 'Request', handler):
+        """call the middleware chain"""
+        if callable(handler):
+            # a chain ending with a specific handler can not be shared, build it for this call
+            return await self._build_chain(handler)(request)
+        chain = self._chain or self.build()
+        return await chain(request)
+
+    def _build_chain(self, handler) -> Callable:
         """construct the middleware call chain"""
 
         async def call_next(req: 'Request'):
@@ -50,4 +66,10 @@ class MiddlewareManager:
                     return await _mw_inst.dispatch(req, _next)
             else:
                 raise TypeError(f"Invalid middleware type: {mw}")
-        return await call_next(request)
+        return call_next
+
+    def __getstate__(self):
+        # the compiled chain is made of closures, every worker compiles its own
+        state = self.__dict__.copy()
+        state['_chain'] = None
+        return state
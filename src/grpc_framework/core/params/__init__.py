@@ -1,7 +1,10 @@
 from .utils import ParamParser
 from .domain import ParamInfo
+from .converter import compile_converter, TypeConverter
 
 __all__ = [
     'ParamParser',
-    'ParamInfo'
+    'ParamInfo',
+    'compile_converter',
+    'TypeConverter'
 ]
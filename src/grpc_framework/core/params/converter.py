@@ -0,0 +1,192 @@
+import inspect
+from dataclasses import is_dataclass, fields
+from typing import (
+    Any, Callable, Dict, List, Tuple, Type, Union,
+    get_args, get_origin, get_type_hints
+)
+from typing_extensions import Annotated
+from ..serialization.schema_models import is_schema_model, get_schema_adapter
+from ..serialization.compile_cache import CompileCache
+
+__all__ = [
+    'TypeConverter',
+    'compile_converter'
+]
+
+TypeConverter = Callable[[Any], Any]
+
+_converters = CompileCache()
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def compile_converter(type_: Type) -> TypeConverter:
+    """compile a converter that turns plain values (dicts, lists) into instances of `type_`
+
+    The converter is built once per type and cached, all type reflection happens here,
+    so calling it only walks the value.
+    """
+    try:
+        return _converters.get(type_, _build)
+    except TypeError:
+        # unhashable type annotation, it can not be cached
+        return _build(type_)
+
+
+def _build(type_: Type) -> TypeConverter:
+    origin = get_origin(type_) or type_
+    args = get_args(type_)
+
+    if origin is Annotated:
+        return compile_converter(args[0])
+
+    if origin is Union:
+        non_none_types = [t for t in args if t is not type(None)]
+        if len(non_none_types) == 1:
+            # Optional[T]
+            return _nullable(compile_converter(non_none_types[0]))
+        return _identity
+
+    if origin is list or origin is List:
+        if not args:
+            return _identity
+        return _list_converter(compile_converter(args[0]))
+
+    if origin is dict or origin is Dict:
+        if not args:
+            return _identity
+        return _dict_converter(compile_converter(args[0]), compile_converter(args[1]))
+
+    if origin is tuple or origin is Tuple:
+        if not args:
+            return _identity
+        if len(args) == 2 and args[1] is Ellipsis:
+            return _variadic_tuple_converter(compile_converter(args[0]))
+        return _tuple_converter(tuple(compile_converter(t) for t in args))
+
+    if not inspect.isclass(type_):
+        return _identity
+
+    if is_schema_model(type_):
+        # msgspec / pydantic models are validated by their own compiled adapter
+        return get_schema_adapter(type_).from_builtins
+
+    if is_dataclass(type_):
+        hints = _type_hints(type_)
+        return _object_converter(type_, [
+            (f.name, compile_converter(hints.get(f.name, Any)))
+            for f in fields(type_) if f.init
+        ])
+
+    # read from the classes themselves, since python 3.10 `type_.__annotations__` is `{}` for any class without them
+    annotations = {
+        name: annotation
+        for cls in reversed(type_.__mro__)
+        for name, annotation in cls.__dict__.get('__annotations__', {}).items()
+    }
+    if annotations and not issubclass(type_, (int, float, str, bytes, bool)):
+        # TypedDict or an annotated class
+        hints = _type_hints(type_)
+        return _object_converter(type_, [
+            (name, compile_converter(hints.get(name, Any)))
+            for name in annotations
+        ])
+
+    if type_.__init__ is not object.__init__ and type_.__module__ != 'builtins':
+        # plain class, use the parameters of __init__
+        try:
+            parameters = list(inspect.signature(type_.__init__).parameters.items())[1:]
+        except (TypeError, ValueError):
+            return _identity
+        return _object_converter(type_, [
+            (name, compile_converter(param.annotation if param.annotation is not inspect.Parameter.empty else Any))
+            for name, param in parameters
+            if param.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+        ])
+
+    return _identity
+
+
+def _type_hints(type_: Type) -> Dict[str, Any]:
+    try:
+        return get_type_hints(type_)
+    except Exception:
+        return dict(getattr(type_, '__annotations__', {}))
+
+
+def _nullable(item: TypeConverter) -> TypeConverter:
+    if item is _identity:
+        return _identity
+
+    def convert(value: Any) -> Any:
+        if value is None:
+            return None
+        return item(value)
+
+    return convert
+
+
+def _list_converter(item: TypeConverter) -> TypeConverter:
+    if item is _identity:
+        def convert(value: Any) -> Any:
+            if value is None:
+                return None
+            return list(value)
+    else:
+        def convert(value: Any) -> Any:
+            if value is None:
+                return None
+            return [None if i is None else item(i) for i in value]
+
+    return convert
+
+
+def _dict_converter(key: TypeConverter, val: TypeConverter) -> TypeConverter:
+    def convert(value: Any) -> Any:
+        if value is None:
+            return None
+        return {
+            None if k is None else key(k): None if v is None else val(v)
+            for k, v in value.items()
+        }
+
+    return convert
+
+
+def _tuple_converter(items: Tuple[TypeConverter, ...]) -> TypeConverter:
+    def convert(value: Any) -> Any:
+        if value is None:
+            return None
+        return tuple(
+            None if v is None else item(v)
+            for v, item in zip(value, items)
+        )
+
+    return convert
+
+
+def _variadic_tuple_converter(item: TypeConverter) -> TypeConverter:
+    def convert(value: Any) -> Any:
+        if value is None:
+            return None
+        return tuple(None if v is None else item(v) for v in value)
+
+    return convert
+
+
+def _object_converter(type_: Type, field_converters: List[Tuple[str, TypeConverter]]) -> TypeConverter:
+    field_converters = tuple(field_converters)
+
+    def convert(value: Any) -> Any:
+        if not isinstance(value, dict):
+            return value
+        kwargs = {}
+        for name, field_converter in field_converters:
+            if name in value:
+                field_value = value[name]
+                kwargs[name] = None if field_value is None else field_converter(field_value)
+        return type_(**kwargs)
+
+    return convert
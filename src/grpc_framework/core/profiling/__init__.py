@@ -0,0 +1,7 @@
+from .sampler import SamplingProfiler
+from .memory import MemoryProfiler
+
+__all__ = [
+    'SamplingProfiler',
+    'MemoryProfiler'
+]
@@ -0,0 +1,235 @@
+"""memory snapshots of a worker process
+
+Allocations are traced with `tracemalloc` once the profiler is started, every snapshot is compared with
+the previous one of the worker, the first snapshot is the baseline.
+
+A snapshot holds the blocks still allocated, grouped by:
+    - rpc method: a block allocated below an endpoint handler frame belongs to its method
+      (the innermost handler of the traceback, `frames` must be deep enough to reach it)
+    - framework: a block with a frame in the framework package, the memory the framework itself retains
+    - source line: the lines retaining the most memory, and the lines that grew the most
+The live instances of the tracked framework types (requests, responses, dependency scopes, ...) are counted by gc.
+
+Every snapshot is written as one json document beside the collapsed profiles.
+"""
+import os
+import gc
+import dis
+import json
+import time
+import threading
+import tracemalloc
+from collections import defaultdict
+from types import CodeType
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+__all__ = [
+    'MemoryProfiler'
+]
+
+UNTAGGED = '<untagged>'
+FRAMEWORK_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# blocks allocated last by these files are left out, `tracemalloc.Filter` matches them much slower
+_IGNORED_FILES = frozenset((
+    tracemalloc.__file__,
+    os.path.abspath(__file__),
+    '<frozen importlib._bootstrap>',
+    '<frozen importlib._bootstrap_external>',
+    '<unknown>'
+))
+
+
+def _rss() -> Optional[int]:
+    """resident set size of this process in bytes, None where `/proc` is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _code_lines(code: CodeType) -> Tuple[int, int]:
+    lines = [line for _, line in dis.findlinestarts(code) if line is not None]
+    return code.co_firstlineno, max(lines, default=code.co_firstlineno)
+
+
+class MemoryProfiler:
+    """trace the allocations of this process and write snapshots diffed with the previous one to `directory`
+
+    Args:
+        directory: where the snapshot reports are written
+        frames: frames kept per traced allocation
+        top: source lines written per report
+        name: part of the file names, e.g. the worker index
+        tracked_types: `{name: type}` of the objects whose live instances are counted
+    """
+
+    def __init__(self,
+                 directory: str,
+                 frames: int = 32,
+                 top: int = 50,
+                 name: str = 'worker',
+                 tracked_types: Optional[Dict[str, Type]] = None):
+        self.directory = directory
+        self.frames = frames
+        self.top = top
+        self.name = name
+        self.tracked_types: Dict[str, Type] = dict(tracked_types or {})
+        self.path: Optional[str] = None
+        # file name -> [(first line, last line, method)] of the endpoint handlers
+        self._handler_lines: Dict[str, List[Tuple[int, int, str]]] = defaultdict(list)
+        self._previous_groups: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def add_handler(self, handler: Callable, method: str):
+        """attribute the blocks allocated below `handler` to `method`"""
+        code = getattr(handler, '__code__', None)
+        if code is not None:
+            first, last = _code_lines(code)
+            self._handler_lines[code.co_filename].append((first, last, method))
+
+    def start(self):
+        """start tracing the allocations, the next snapshot is the baseline"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self._previous_groups = {}
+
+    def stop(self):
+        """stop tracing, the traces and the previous snapshot are released"""
+        with self._lock:
+            tracemalloc.stop()
+            self._previous_groups = {}
+
+    def snapshot(self) -> str:
+        """take a snapshot, write its report and return the path, tracing is started when it is not running
+
+        it walks every traced block, call it outside of the event loop
+        """
+        self.start()
+        with self._lock:
+            traced, peak = tracemalloc.get_traced_memory()
+            groups = self._group(tracemalloc.take_snapshot())
+            previous = self._previous_groups
+            lines = {
+                line: self._diff(stats, previous.get('lines', {}).get(line, (0, 0)))
+                for line, stats in groups['lines'].items()
+            }
+            report = {
+                'name': self.name,
+                'pid': os.getpid(),
+                'time': time.time(),
+                'baseline': not previous,
+                'rss_bytes': _rss(),
+                'traced_bytes': traced,
+                'peak_traced_bytes': peak,
+                'methods': {
+                    method: self._diff(stats, previous.get('methods', {}).get(method, (0, 0)))
+                    for method, stats in sorted(groups['methods'].items(), key=lambda item: -item[1][0])
+                },
+                'framework': self._diff(groups['framework'], previous.get('framework', (0, 0))),
+                'objects': {
+                    name: {'count': count, 'count_diff': count - previous.get('objects', {}).get(name, 0)}
+                    for name, count in groups['objects'].items()
+                },
+                'top_size': self._top(lines, 'size'),
+                'top_growth': self._top(lines, 'size_diff') if previous else []
+            }
+            self._previous_groups = groups
+            self.path = self._write(report)
+            return self.path
+
+    def _group(self, snapshot: tracemalloc.Snapshot) -> Dict[str, Any]:
+        """`[size, count]` of the blocks by method, by the line that allocated them and of the framework blocks,
+        live tracked objects by type"""
+        methods: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        lines: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        framework = [0, 0]
+        # the blocks allocated by the same code share their traceback
+        attributions: Dict[tracemalloc.Traceback, Optional[Tuple[str, str, bool]]] = {}
+        for trace in snapshot.traces:
+            traceback = trace.traceback
+            if traceback in attributions:
+                attribution = attributions[traceback]
+            else:
+                attribution = attributions[traceback] = self._attribute(traceback)
+            if attribution is None:
+                continue
+            method, line, in_framework = attribution
+            size = trace.size
+            stats = methods[method]
+            stats[0] += size
+            stats[1] += 1
+            stats = lines[line]
+            stats[0] += size
+            stats[1] += 1
+            if in_framework:
+                framework[0] += size
+                framework[1] += 1
+        return {
+            'methods': dict(methods),
+            'lines': dict(lines),
+            'framework': framework,
+            'objects': self._count_objects()
+        }
+
+    def _attribute(self, traceback: tracemalloc.Traceback) -> Optional[Tuple[str, str, bool]]:
+        """`(method, allocating line, has a framework frame)` of a traceback, None when it is left out"""
+        # oldest frame first, the last one allocated the block
+        allocated_by = traceback[-1]
+        if allocated_by.filename in _IGNORED_FILES:
+            return None
+        method = UNTAGGED
+        in_framework = False
+        for frame in traceback:
+            filename = frame.filename
+            if filename.startswith(FRAMEWORK_DIR):
+                in_framework = True
+            for first, last, handler_method in self._handler_lines.get(filename, ()):
+                if first <= frame.lineno <= last:
+                    # the innermost handler wins
+                    method = handler_method
+        return method, f'{allocated_by.filename}:{allocated_by.lineno}', in_framework
+
+    def _count_objects(self) -> Dict[str, int]:
+        counts = dict.fromkeys(self.tracked_types, 0)
+        if not counts:
+            return counts
+        tracked = tuple(self.tracked_types.items())
+        for obj in gc.get_objects():
+            for name, tracked_type in tracked:
+                if isinstance(obj, tracked_type):
+                    counts[name] += 1
+        return counts
+
+    @staticmethod
+    def _diff(current, previous) -> Dict[str, int]:
+        return {
+            'size': current[0],
+            'count': current[1],
+            'size_diff': current[0] - previous[0],
+            'count_diff': current[1] - previous[1]
+        }
+
+    def _top(self, lines: Dict[str, Dict[str, int]], key: str) -> List[Dict[str, Any]]:
+        return [
+            {'line': line, **stats}
+            for line, stats in sorted(lines.items(), key=lambda item: -abs(item[1][key]))[:self.top]
+        ]
+
+    def _write(self, report: Dict[str, Any]) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        now = report['time']
+        path = os.path.join(
+            self.directory,
+            f'memory-{self.name}-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S", time.localtime(now))}'
+            f'-{int(now * 1000) % 1000:03d}.json'
+        )
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(report, f, separators=(',', ':'))
+        os.replace(f'{path}.tmp', path)
+        return path
@@ -0,0 +1,186 @@
+"""sampling profiler of a worker process
+
+A daemon thread reads the stacks of every other thread with `sys._current_frames()` at a fixed interval,
+nothing is hooked into the interpreter (`sys.setprofile` would slow down every call) and nothing
+runs in the worker threads while the profiler is stopped.
+
+Every sample is tagged with the rpc method it belongs to:
+    - the event loop thread takes the method of the task that is running, requests tag their task
+      while the profiler runs
+    - executor threads take the method of the endpoint handler found in their stack
+
+The sampler needs the GIL to read the stacks, a busy thread hands it over when its switch interval
+expires, the interval is lowered to the sampling interval while a profile runs.
+Code that runs much shorter than the interval between two GIL releases is under sampled.
+
+The stacks are aggregated and written in the collapsed format (`method;thread;frame;frame count`)
+that flamegraph.pl, speedscope and inferno read.
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+import weakref
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Callable, Dict, List, Optional
+
+__all__ = [
+    'SamplingProfiler'
+]
+
+UNTAGGED = '<untagged>'
+# deeper stacks are cut at the root side
+MAX_DEPTH = 128
+
+
+class SamplingProfiler:
+    """sample the threads of this process for a bounded window and write the collapsed stacks to `directory`
+
+    Args:
+        directory: where the `.collapsed` files are written
+        interval: seconds between two samples
+        duration: seconds a profile runs at most, it is stopped and written afterwards
+        loop: event loop of the worker, its running task is used to tag the loop thread samples,
+            the profiler is created in the thread running the loop
+        name: part of the file names, e.g. the worker index
+    """
+
+    def __init__(self,
+                 directory: str,
+                 interval: float = 0.005,
+                 duration: float = 30.0,
+                 loop: Optional[asyncio.AbstractEventLoop] = None,
+                 name: str = 'worker'):
+        self.directory = directory
+        self.interval = interval
+        self.duration = duration
+        self.loop = loop
+        self.name = name
+        self.path: Optional[str] = None
+        self.samples = 0
+        self._loop_thread_id: Optional[int] = threading.get_ident() if loop is not None else None
+        self._handler_methods: Dict[CodeType, str] = {}
+        self._task_methods: 'weakref.WeakKeyDictionary[asyncio.Task, str]' = weakref.WeakKeyDictionary()
+        self._labels: Dict[CodeType, str] = {}
+        self._stacks: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._switch_interval: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def add_handler(self, handler: Callable, method: str):
+        """tag the samples of executor threads running `handler` with `method`"""
+        code = getattr(handler, '__code__', None)
+        if code is not None:
+            self._handler_methods.setdefault(code, method)
+
+    def tag_task(self, method: str):
+        """tag the samples taken while the current task runs, called from the event loop"""
+        task = asyncio.current_task()
+        if task is not None:
+            self._task_methods[task] = method
+
+    def start(self, duration: Optional[float] = None) -> str:
+        """start a profile of `duration` seconds (`self.duration` by default), the path it is written to"""
+        with self._lock:
+            if self._thread is not None:
+                return self.path
+            os.makedirs(self.directory, exist_ok=True)
+            now = time.time()
+            self.path = os.path.join(
+                self.directory,
+                f'profile-{self.name}-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S", time.localtime(now))}'
+                f'-{int(now * 1000) % 1000:03d}.collapsed'
+            )
+            self.samples = 0
+            self._stacks = Counter()
+            self._stop_event.clear()
+            self._switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self._switch_interval, self.interval))
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(self.duration if duration is None else duration, self.path),
+                name=f'grpc-framework-profiler-{self.name}',
+                daemon=True
+            )
+            self._thread.start()
+            return self.path
+
+    def stop(self, wait: bool = False) -> Optional[str]:
+        """stop the running profile, it is written by the sampler thread, `wait` blocks until then"""
+        thread = self._thread
+        self._stop_event.set()
+        if wait and thread is not None:
+            thread.join()
+        return self.path
+
+    def toggle(self) -> Optional[str]:
+        """start a profile when none runs, else stop it"""
+        if self.running:
+            return self.stop()
+        return self.start()
+
+    def _run(self, duration: float, path: str):
+        deadline = time.monotonic() + duration
+        own_id = threading.get_ident()
+        try:
+            while not self._stop_event.wait(self.interval):
+                self._sample(own_id)
+                if time.monotonic() >= deadline:
+                    break
+            self._write(path)
+        finally:
+            self._task_methods.clear()
+            with self._lock:
+                sys.setswitchinterval(self._switch_interval)
+                self._thread = None
+
+    def _sample(self, own_id: int):
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = self._stacks
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            frames = self._collapse(frame)
+            method = self._method_of(thread_id, frame)
+            stacks[f'{method};{thread_names.get(thread_id, thread_id)};{frames}'] += 1
+        self.samples += 1
+
+    def _method_of(self, thread_id: int, frame: FrameType) -> str:
+        if thread_id == self._loop_thread_id:
+            task = asyncio.current_task(self.loop)
+            method = self._task_methods.get(task) if task is not None else None
+            if method is not None:
+                return method
+        handler_methods = self._handler_methods
+        while frame is not None:
+            method = handler_methods.get(frame.f_code)
+            if method is not None:
+                return method
+            frame = frame.f_back
+        return UNTAGGED
+
+    def _collapse(self, frame: FrameType) -> str:
+        labels = self._labels
+        names: List[str] = []
+        while frame is not None and len(names) < MAX_DEPTH:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            names.append(label)
+            frame = frame.f_back
+        names.reverse()
+        return ';'.join(names)
+
+    def _write(self, path: str):
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        os.replace(f'{path}.tmp', path)
@@ -1,12 +1,16 @@
 import grpc
 from grpc.aio import ServicerContext
 from contextvars import ContextVar
-from typing import Type, TYPE_CHECKING, Union, Optional, Any
+from typing import Type, TYPE_CHECKING, Union, Optional, Any, Tuple, Sequence
 from dataclasses import dataclass
 from ...types import StrAnyDict, BytesLike, StrDict
 
 if TYPE_CHECKING:
     from ..service import RPCFunctionMetadata
+    from ..di.container import DependencyScope
+    from ..serialization import Serializer
+    from ..metrics import StageTimer
+    from ..tracing import Trace
 
 
 # Default Request Context Var
@@ -36,10 +40,31 @@ class PeerInfo:
     port: Optional[int] = None
     raw: Optional[str] = None
 
+    @classmethod
+    def parse(cls, raw: Optional[str]) -> 'PeerInfo':
+        """parse a grpc peer string, .temp: ip_version:ip:port"""
+        if not raw:
+            return cls()
+        try:
+            ip_version, rest = raw.split(':', 1)
+            if ':' in rest:
+                ip, port = rest.rsplit(':', 1)
+                return cls(ip_version=ip_version, ip=ip, port=int(port), raw=raw)
+            return cls(ip_version=ip_version, raw=raw)
+        except Exception:
+            return cls(raw=raw)
+
+
+# (package, service, method) of a request
+RouteType = Tuple[Optional[str], Optional[str], Optional[str]]
+
 
 class Request:
     """gRPC Request Instance
 
+    peer information, metadata and the package/service/method route are only parsed
+    when they are accessed for the first time.
+
     Args:
         peer_info_dict: a dict for build PeerInfo instance, it represents the network information in this request
         full_method: request address, .temp: /package.service/method
@@ -47,6 +72,11 @@ class Request:
         compression: grpc.Compression
         grpc_context: grpc's context in this request
     """
+    __slots__ = (
+        '_peer_info', '_peer_context', '_metadata', '_invocation_metadata', '_state', '_route',
+        'full_method', 'compression', 'grpc_context', 'request_bytes',
+        'current_request_metadata', 'dependency_scope', 'native_response', 'serializer', 'stage_timer', 'trace'
+    )
 
     def __init__(
             self,
@@ -56,40 +86,113 @@ class Request:
             compression: Optional[grpc.Compression] = None,
             grpc_context: Optional[ServicerContext] = None
     ):
-        self.peer_info: Optional[PeerInfo] = peer_info_dict
-        self.metadata: StrAnyDict = metadata or {}
-        self.package: Optional[str] = None
-        self.service_name: Optional[str] = None
-        self.method_name: Optional[str] = None
+        self._peer_info: Optional[PeerInfo] = PeerInfo(**peer_info_dict) if peer_info_dict else None
+        self._peer_context: Optional[ServicerContext] = None
+        self._metadata: Optional[StrAnyDict] = metadata
+        self._invocation_metadata: Optional[Sequence[Any]] = None
+        self._state: Optional[StrAnyDict] = None
+        self._route: Optional[RouteType] = None
         self.full_method: Optional[str] = full_method
         self.compression: Optional[str] = compression
         self.grpc_context: Optional[ServicerContext] = grpc_context
-        self.state: StrAnyDict = {}
         self.request_bytes: Any = _EmptyRequestBytes
         self.current_request_metadata: Optional['RPCFunctionMetadata'] = None
+        self.dependency_scope: Optional['DependencyScope'] = None
+        # the endpoint response message is serialized by grpc, see `InvocationPlan.native_response`
+        self.native_response: bool = False
+        # serializer of the endpoint or the one negotiated by the client, the application serializer when None
+        self.serializer: Optional['Serializer'] = None
+        # set by the timed interceptor when `config.stage_timing` is enabled
+        self.stage_timer: Optional['StageTimer'] = None
+        # the recorded trace of a sampled request when `config.tracing` is enabled
+        self.trace: Optional['Trace'] = None
         # set current request
         _current_request.set(self)
 
     def from_handler_details(self, handler_details):
-        # its just first step to parse full request instance
-        # methods parse
+        # its just first step to parse full request instance,
+        # the invocation metadata is kept as it is and parsed on first access
         self.full_method = handler_details.method
-        self._parse_pkg_svc_method()
-        # metadata parse
-        metadata = {
-            i.key: i.value for i in
-            handler_details.invocation_metadata
-        }
-        self.metadata = metadata
+        self._invocation_metadata = handler_details.invocation_metadata
 
     def from_context(self, context):
-        # parse peer || network information
-        peer_raw = context.peer()
-        self._parse_peer(peer_raw)
+        # peer || network information is parsed on first access
+        self._peer_context = context
+
+    def set_route(self, route: RouteType):
+        """set the precomputed (package, service, method) of the endpoint"""
+        self._route = route
 
     def set_request_bytes(self, request_bytes: BytesLike):
         self.request_bytes = request_bytes
 
+    @property
+    def peer_info(self) -> PeerInfo:
+        if self._peer_info is None:
+            context = self._peer_context or self.grpc_context
+            self._peer_info = PeerInfo.parse(context.peer() if context is not None else None)
+        return self._peer_info
+
+    @peer_info.setter
+    def peer_info(self, value: PeerInfo):
+        self._peer_info = value
+
+    @property
+    def metadata(self) -> StrAnyDict:
+        if self._metadata is None:
+            self._metadata = {
+                i.key: i.value for i in
+                self._invocation_metadata or ()
+            }
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value: StrAnyDict):
+        self._metadata = value
+
+    def get_metadata(self, key: str, default: Any = None) -> Any:
+        """one metadata value, the invocation metadata is scanned without building `metadata`"""
+        if self._metadata is not None:
+            return self._metadata.get(key, default)
+        for item in self._invocation_metadata or ():
+            if item.key == key:
+                return item.value
+        return default
+
+    @property
+    def state(self) -> StrAnyDict:
+        if self._state is None:
+            self._state = {}
+        return self._state
+
+    @state.setter
+    def state(self, value: StrAnyDict):
+        self._state = value
+
+    @property
+    def package(self) -> Optional[str]:
+        return self._get_route()[0]
+
+    @package.setter
+    def package(self, value: Optional[str]):
+        self._set_route_part(0, value)
+
+    @property
+    def service_name(self) -> Optional[str]:
+        return self._get_route()[1]
+
+    @service_name.setter
+    def service_name(self, value: Optional[str]):
+        self._set_route_part(1, value)
+
+    @property
+    def method_name(self) -> Optional[str]:
+        return self._get_route()[2]
+
+    @method_name.setter
+    def method_name(self, value: Optional[str]):
+        self._set_route_part(2, value)
+
     @classmethod
     def current(cls) -> 'Request':
         request = _current_request.get()
@@ -100,31 +203,26 @@ class Request:
             )
         return request
 
-    def _parse_pkg_svc_method(self):
+    def _get_route(self) -> RouteType:
+        if self._route is None:
+            self._route = self._parse_pkg_svc_method()
+        return self._route
+
+    def _set_route_part(self, index: int, value: Optional[str]):
+        # the route may be the precomputed tuple of the endpoint, it is replaced and never changed
+        route = list(self._get_route())
+        route[index] = value
+        self._route = tuple(route)
+
+    def _parse_pkg_svc_method(self) -> RouteType:
         if not self.full_method:
-            return
+            return None, None, None
         pkg_svc, method = self.full_method.strip('/').split('/')
         pkg_svc_split = pkg_svc.split('.')
         if len(pkg_svc_split) == 1:
-            self.service_name = pkg_svc_split[0]
-        else:
-            pkg, svc = pkg_svc_split[:2]
-            self.package = pkg
-            self.service_name = svc
-        self.method_name = method
-
-    def _parse_peer(self, raw: str):
-        if not raw:
-            self.peer_info = PeerInfo()
-        try:
-            ip_version, rest = raw.split(':', 1)
-            if ':' in rest:
-                ip, port = rest.rsplit(':', 1)
-                self.peer_info = PeerInfo(ip_version=ip_version, ip=ip, port=int(port), raw=raw)
-            else:
-                self.peer_info = PeerInfo(ip_version=ip_version, raw=raw)
-        except Exception:
-            self.peer_info = PeerInfo(raw=raw)
+            return None, pkg_svc_split[0], method
+        pkg, svc = pkg_svc_split[:2]
+        return pkg, svc, method
 
     def send_metadata(self, key: str, value: Union[str, BytesLike]):
         """call grpc context send initial metadata"""
@@ -1,6 +1,8 @@
 import grpc
+from google.protobuf.message import Message
 from typing import Any, Union, TYPE_CHECKING, Callable
 from ...types import StrDict, BytesLike
+from ..serialization.buffer import buffer_to_bytes
 from ..request.request import Request
 
 if TYPE_CHECKING:
@@ -41,13 +43,25 @@ class Response:
 
     def render(self):
         self._set_grpc_metadata()
+        return self.render_content()
+
+    def render_content(self):
+        """the content to send, without touching the grpc context so it can run outside the event loop thread"""
         if self.content is None:
             return b''
         elif isinstance(self.content, BytesLike):
             return self.content
+        elif isinstance(self.content, memoryview):
+            return buffer_to_bytes(self.content)
+        elif self._request.native_response and isinstance(self.content, Message):
+            # serialized by the grpc method handler `response_serializer`
+            return self.content
         else:
             return self.serialize_response(self.content)
 
     def serialize_response(self, response_model: Any) -> bytes:
         """Serialize the domain model into response data"""
+        serializer = self._request.serializer
+        if serializer is not None:
+            return serializer.serialize(response_model)
         return self.app.render_content(response_model)
@@ -0,0 +1,5 @@
+from .route_table import RouteTable
+
+__all__ = [
+    'RouteTable'
+]
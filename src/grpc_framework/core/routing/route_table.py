@@ -0,0 +1,26 @@
+import grpc
+from typing import Dict, Optional
+
+
+class RouteTable(grpc.GenericRpcHandler):
+    """a single generic handler for all application endpoints
+
+    grpc scans every registered generic handler on each lookup,
+    the route table resolves `/package.Service/Method` with one dict lookup instead.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, grpc.RpcMethodHandler] = {}
+
+    def add(self, service_name: str, method_name: str, handler: grpc.RpcMethodHandler):
+        """add an endpoint handler, service_name must be fully qualified: package.Service"""
+        self._routes[f'/{service_name}/{method_name}'] = handler
+
+    def service(self, handler_call_details: grpc.HandlerCallDetails) -> Optional[grpc.RpcMethodHandler]:
+        return self._routes.get(handler_call_details.method)
+
+    def __contains__(self, full_method: str) -> bool:
+        return full_method in self._routes
+
+    def __len__(self) -> int:
+        return len(self._routes)
@@ -1,6 +1,13 @@
 from .interface import Serializer, TransportCodec, ModelConverter
-from .codec_impls import JSONCodec, ORJSONCodec, ProtobufCodec, DataclassesCodec
-from .converter_impls import JsonProtobufConverter, JsonConverter, ProtobufConverter, DataclassesConverter
+from .codec_impls import JSONCodec, ORJSONCodec, ProtobufCodec, DataclassesCodec, MsgPackCodec
+from .msgpack_backend import MsgPackBackend, MsgPackLibBackend, PurePythonMsgPackBackend, ExtType
+from .converter_impls import (
+    JsonProtobufConverter, CompiledJsonProtobufConverter,
+    JsonConverter, ProtobufConverter, DataclassesConverter, SchemaModelConverter
+)
+from .pipelines import register_pipeline
+from .message_pool import MessagePool
+from .offload import SerializationOffloader
 
 __all__ = [
     'Serializer',
@@ -9,9 +16,19 @@ __all__ = [
     'JSONCodec',
     'ORJSONCodec',
     'ProtobufCodec',
+    'MsgPackCodec',
+    'MsgPackBackend',
+    'MsgPackLibBackend',
+    'PurePythonMsgPackBackend',
+    'ExtType',
     'JsonProtobufConverter',
+    'CompiledJsonProtobufConverter',
     'DataclassesCodec',
     'JsonConverter',
     'ProtobufConverter',
-    'DataclassesConverter'
+    'DataclassesConverter',
+    'SchemaModelConverter',
+    'register_pipeline',
+    'MessagePool',
+    'SerializationOffloader'
 ]
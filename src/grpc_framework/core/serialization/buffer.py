@@ -0,0 +1,16 @@
+from typing import Union
+from ...types import BufferLike
+
+__all__ = [
+    'buffer_to_bytes'
+]
+
+
+def buffer_to_bytes(buffer: BufferLike) -> Union[bytes, bytearray]:
+    """bytes of a buffer for grpc, a memoryview that spans a whole bytes object returns that object without copying"""
+    if not isinstance(buffer, memoryview):
+        return buffer
+    obj = buffer.obj
+    if type(obj) is bytes and buffer.c_contiguous and buffer.nbytes == len(obj):
+        return obj
+    return buffer.tobytes()
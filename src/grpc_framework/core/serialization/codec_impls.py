@@ -1,8 +1,10 @@
 import json
 from typing import Any, Optional, Type
 from .interface import TransportCodec
-from ...types import OptionalT, BytesLike, JSONType
+from ...types import OptionalT, BytesLike, BufferLike, JSONType
+from .buffer import buffer_to_bytes
 from google.protobuf.message import Message
+from .msgpack_backend import MsgPackBackend, default_msgpack_backend
 from ...exceptions import GRPCException
 
 try:
@@ -11,26 +13,33 @@ except ImportError:
     orjson = None
 
 
+def _json_loads(data: BufferLike) -> Any:
+    """the json module reads bytes and str only, a memoryview slice is copied once"""
+    return json.loads(data.tobytes() if isinstance(data, memoryview) else data)
+
+
 class ProtobufCodec(TransportCodec):
-    def decode(self, data: BytesLike, into: Optional[Type[Message]] = None) -> Message:
+    requires_schema = True
+
+    def decode(self, data: BufferLike, into: Optional[Type[Message]] = None) -> Message:
         assert into is not None, "ProtoCodec.decode requires message class via 'into'"
         msg = into()
         msg.ParseFromString(data)
         return msg
 
     def encode(self, obj: Message) -> BytesLike:
-        if isinstance(obj, BytesLike):
-            return obj
+        if isinstance(obj, BufferLike):
+            return buffer_to_bytes(obj)
         return obj.SerializeToString()
 
 
 class JSONCodec(TransportCodec):
-    def decode(self, data: BytesLike, into: OptionalT = None) -> JSONType:
-        return json.loads(data)
+    def decode(self, data: BufferLike, into: OptionalT = None) -> JSONType:
+        return _json_loads(data)
 
     def encode(self, obj: Any) -> BytesLike:
-        if isinstance(obj, BytesLike):
-            return obj
+        if isinstance(obj, BufferLike):
+            return buffer_to_bytes(obj)
         return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
 
 
@@ -38,25 +47,47 @@ class ORJSONCodec(TransportCodec):
     def __init__(self):
         assert orjson is not None, '`orjson` must be installed to use `ORJSONCodec`'
 
-    def decode(self, data: BytesLike, into: OptionalT = None) -> JSONType:
+    def decode(self, data: BufferLike, into: OptionalT = None) -> JSONType:
         return orjson.loads(data)
 
     def encode(self, obj: Any) -> BytesLike:
-        if isinstance(obj, BytesLike):
-            return obj
+        if isinstance(obj, BufferLike):
+            return buffer_to_bytes(obj)
         return orjson.dumps(obj)
 
 
 class DataclassesCodec(TransportCodec):
-    def decode(self, data: BytesLike, into: OptionalT = None) -> JSONType:
+    def decode(self, data: BufferLike, into: OptionalT = None) -> JSONType:
         assert into is not None, "DataclassesCodec.decode requires message class via 'into'"
         try:
-            data = json.loads(data)
+            data = _json_loads(data)
         except:
             raise GRPCException.invalid_argument(f'The data is not json like, can not decode.')
         return data
 
     def encode(self, obj: JSONType) -> BytesLike:
-        if isinstance(obj, BytesLike):
-            return obj
+        if isinstance(obj, BufferLike):
+            return buffer_to_bytes(obj)
         return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class MsgPackCodec(TransportCodec):
+    """MessagePack codec for schemaless payloads, bytes values are kept binary
+
+    datetime and UUID values are carried as msgpack extension types.
+    The backend is the `msgpack` package when it is installed and a pure python implementation otherwise,
+    set `backend` on a subclass to plug another one.
+    """
+    backend: Optional[MsgPackBackend] = None
+
+    def __init__(self):
+        if self.backend is None:
+            self.backend = default_msgpack_backend()
+
+    def decode(self, data: BufferLike, into: OptionalT = None) -> Any:
+        return self.backend.unpack(data)
+
+    def encode(self, obj: Any) -> BytesLike:
+        if isinstance(obj, BufferLike):
+            return buffer_to_bytes(obj)
+        return self.backend.pack(obj)
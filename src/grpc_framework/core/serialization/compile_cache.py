@@ -0,0 +1,78 @@
+"""caches of the functions generated once per type (converters, encoders, decoders)
+
+The caches are read without a lock, so only finished functions are ever stored in them.
+A builder that needs the function of a type still being built (a recursive type, e.g. a tree node)
+gets a placeholder calling it once it is built. The placeholders, and the functions built on top of them,
+are kept in a building map only the building thread sees, they are published together when
+the outermost build returns.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+__all__ = [
+    'CompileCache'
+]
+
+# one lock for every cache, builders of one cache compile the functions of the others
+_lock = threading.RLock()
+# the state of the build in progress, only touched by the thread holding `_lock`
+_depth = 0
+_building_caches: List['CompileCache'] = []
+
+
+class CompileCache:
+    """functions built once per key by the `builder` given to `get`"""
+
+    def __init__(self):
+        self._compiled: Dict[Hashable, Callable] = {}
+        self._building: Dict[Hashable, Callable] = {}
+
+    def get(self, key: Hashable, builder: Callable[[Any], Callable]) -> Callable:
+        try:
+            return self._compiled[key]
+        except KeyError:
+            return self._compile(key, builder)
+
+    def _compile(self, key: Hashable, builder: Callable[[Any], Callable]) -> Callable:
+        global _depth
+        with _lock:
+            if key in self._compiled:
+                return self._compiled[key]
+            if key in self._building:
+                return self._building[key]
+            compiled: List[Callable] = []
+
+            def deferred(value):
+                return compiled[0](value)
+
+            self._building[key] = deferred
+            _building_caches.append(self)
+            _depth += 1
+            try:
+                func = builder(key)
+            except BaseException:
+                self._building.pop(key, None)
+                if _depth == 1:
+                    # the functions built so far may call the placeholder of the failed one
+                    _discard()
+                raise
+            finally:
+                _depth -= 1
+            compiled.append(func)
+            self._building[key] = func
+            if _depth == 0:
+                _publish()
+            return func
+
+
+def _publish():
+    for cache in _building_caches:
+        cache._compiled.update(cache._building)
+        cache._building.clear()
+    _building_caches.clear()
+
+
+def _discard():
+    for cache in _building_caches:
+        cache._building.clear()
+    _building_caches.clear()
@@ -4,7 +4,10 @@ from .interface import ModelConverter
 from ...types import JSONType, T, TypeT
 from google.protobuf.message import Message
 from google.protobuf.json_format import ParseDict, MessageToDict
-from dataclasses import is_dataclass, asdict
+from dataclasses import is_dataclass
+from .dataclass_codegen import get_dataclass_encoder, get_dataclass_decoder
+from .protobuf_json import get_message_encoder, get_message_decoder
+from .schema_models import is_schema_model, is_schema_instance, get_schema_adapter
 
 
 class JsonProtobufConverter(ModelConverter):
@@ -37,7 +40,37 @@ class JsonProtobufConverter(ModelConverter):
         return ParseDict(data, model_type())
 
 
+class CompiledJsonProtobufConverter(JsonProtobufConverter):
+    """bidirectional converter：JSON <-> Protocol Buffers, through field maps precomputed from the descriptors
+
+    It renders the same output as `JsonProtobufConverter` without walking the descriptors on every message,
+    pair it with `ORJSONCodec` to encode and decode through orjson.
+    """
+
+    def to_model(self, transport_obj: JSONType, model_type: Type[Message]) -> Union[Message, List[Message]]:
+        decode = get_message_decoder(model_type)
+        if isinstance(transport_obj, list):
+            for item in transport_obj:
+                if not isinstance(item, dict):
+                    raise TypeError(f'Expected dict for single object, got {type(item)}')
+            return [decode(item) for item in transport_obj]
+        elif isinstance(transport_obj, dict):
+            return decode(transport_obj)
+        else:
+            raise ValueError(f'Cannot convert JSON primitive {type(transport_obj)} to protobuf message')
+
+    def from_model(self, protobuf_model: Union[Message, List[Message]]) -> JSONType:
+        if isinstance(protobuf_model, list):
+            return [get_message_encoder(type(msg))(msg) for msg in protobuf_model]
+        elif isinstance(protobuf_model, Message):
+            return get_message_encoder(type(protobuf_model))(protobuf_model)
+        else:
+            raise TypeError(f'Expected protobuf message, got {type(protobuf_model)}')
+
+
 class DataclassesConverter(ModelConverter):
+    """bidirectional converter：dict <-> dataclass, the per class functions are generated on first use"""
+
     def to_model(self, transport_obj: JSONType, model_type: TypeT) -> T:
         if isinstance(transport_obj, list):
             return [self._parse_single(i, model_type) for i in transport_obj]
@@ -47,9 +80,9 @@ class DataclassesConverter(ModelConverter):
 
     def from_model(self, model: T) -> Any:
         if isinstance(model, list):
-            return [asdict(i) for i in model]
-        elif is_dataclass(model):
-            return asdict(model)
+            return [get_dataclass_encoder(type(i))(i) for i in model]
+        elif is_dataclass(model) and not isinstance(model, type):
+            return get_dataclass_encoder(type(model))(model)
         raise TypeError(f'Expected dataclass instance, got {type(model)}')
 
     @staticmethod
@@ -57,20 +90,46 @@ class DataclassesConverter(ModelConverter):
         """Helper method to parse single JSON object to dataclass instance"""
         if not isinstance(data, dict):
             raise TypeError(f'Expected dict for single object, got {type(data)}')
-        # 创建空的protobuf实例并填充数据
-        return model_type(**data)  # Type: Message
+        if is_dataclass(model_type):
+            return get_dataclass_decoder(model_type)(data)
+        return model_type(**data)
+
+
+class SchemaModelConverter(DataclassesConverter):
+    """bidirectional converter：dict <-> msgspec `Struct` / pydantic v2 model, dataclasses are handled as well
+
+    The compiled adapter of every model class is cached, see `get_schema_adapter`.
+    With the json and msgpack codecs the request bytes are decoded straight into the model.
+    """
+
+    def to_model(self, transport_obj: JSONType, model_type: TypeT) -> T:
+        if is_schema_model(model_type):
+            return get_schema_adapter(model_type).from_builtins(transport_obj)
+        return super().to_model(transport_obj, model_type)
+
+    def from_model(self, model: T) -> Any:
+        if is_schema_instance(model):
+            return get_schema_adapter(type(model[0] if isinstance(model, list) else model)).to_builtins(model)
+        return super().from_model(model)
 
 
 class JsonConverter(ModelConverter):
     def to_model(self, transport_obj: Any, model_type: JSONType) -> JSONType:
-        return json.loads(transport_obj)  # type: JSONType
+        if isinstance(transport_obj, (str, bytes, bytearray)):
+            return json.loads(transport_obj)  # type: JSONType
+        # json codecs have already decoded the data
+        return transport_obj
 
     def from_model(self, model: JSONType) -> JSONType:
-        return json.dumps(model, ensure_ascii=False, separators=(',', ':'))  # type: Union[Dict, List]
+        # the codec encodes the plain value, a json string here would be encoded twice
+        return model
 
 
 class ProtobufConverter(ModelConverter):
     def to_model(self, transport_obj: Any, model_type: Type[Message]) -> Message:
+        if isinstance(transport_obj, Message):
+            # `ProtobufCodec` has already parsed the message
+            return transport_obj
         return model_type.FromString(transport_obj)  # type: Message
 
     def from_model(self, model: Message) -> Any:
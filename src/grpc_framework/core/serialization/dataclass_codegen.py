@@ -0,0 +1,162 @@
+"""generate specialised dict encoders/decoders for dataclasses
+
+`dataclasses.asdict` deep copies every value and inspects the fields on each call,
+`model_type(**data)` does not convert nested dataclasses at all.
+The functions generated here are built once per class, read the fields directly,
+convert nested dataclasses, lists, dicts and Optional fields, and share primitive values
+instead of copying them.
+"""
+from dataclasses import is_dataclass, fields, MISSING
+from typing import Any, Callable, Dict, List, Type, Union, get_args, get_origin, get_type_hints
+from .compile_cache import CompileCache
+
+__all__ = [
+    'get_dataclass_encoder',
+    'get_dataclass_decoder'
+]
+
+_PRIMITIVES = (int, float, str, bool, bytes, type(None))
+
+_encoders = CompileCache()
+_decoders = CompileCache()
+
+
+def get_dataclass_encoder(cls: Type) -> Callable[[Any], Dict[str, Any]]:
+    """dataclass instance -> dict, generated once per class"""
+    return _encoders.get(cls, _build_encoder)
+
+
+def get_dataclass_decoder(cls: Type) -> Callable[[Dict[str, Any]], Any]:
+    """dict -> dataclass instance, generated once per class"""
+    return _decoders.get(cls, _build_decoder)
+
+
+def _encode_value(value: Any) -> Any:
+    """fallback for fields without a precise annotation, converts nested dataclasses at runtime"""
+    if value is None or isinstance(value, _PRIMITIVES):
+        return value
+    if is_dataclass(value) and not isinstance(value, type):
+        return get_dataclass_encoder(type(value))(value)
+    if isinstance(value, (list, tuple)):
+        return [_encode_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _encode_value(v) for k, v in value.items()}
+    return value
+
+
+def _type_hints(cls: Type) -> Dict[str, Any]:
+    try:
+        return get_type_hints(cls)
+    except Exception:
+        return {f.name: f.type for f in fields(cls)}
+
+
+class _Generator:
+    """collect the helper functions referenced by the generated source"""
+
+    def __init__(self):
+        self.namespace: Dict[str, Any] = {'_MISSING': MISSING}
+        self._depth = 0
+
+    def helper(self, func: Callable) -> str:
+        name = f'_h{len(self.namespace)}'
+        self.namespace[name] = func
+        return name
+
+    def variable(self) -> str:
+        self._depth += 1
+        return f'_v{self._depth}'
+
+    def build(self, source: str, name: str) -> Callable:
+        exec(source, self.namespace)
+        return self.namespace[name]
+
+
+def _is_precise_primitive(tp: Any) -> bool:
+    return tp in _PRIMITIVES
+
+
+def _encode_expr(gen: _Generator, tp: Any, var: str) -> str:
+    """source expression that encodes `var` annotated with `tp`"""
+    origin = get_origin(tp)
+    args = get_args(tp)
+    if _is_precise_primitive(tp):
+        return var
+    if origin is Union:
+        non_none = [a for a in args if a is not type(None)]
+        if len(non_none) == 1:
+            inner = _encode_expr(gen, non_none[0], var)
+            return var if inner == var else f'(None if {var} is None else {inner})'
+        if all(_is_precise_primitive(a) for a in non_none):
+            return var
+    elif origin in (list, List) and args:
+        if _is_precise_primitive(args[0]):
+            return var
+        item = gen.variable()
+        return f'(None if {var} is None else [{_encode_expr(gen, args[0], item)} for {item} in {var}])'
+    elif origin in (dict, Dict) and len(args) == 2:
+        if _is_precise_primitive(args[1]):
+            return var
+        key, val = gen.variable(), gen.variable()
+        return (f'(None if {var} is None else '
+                f'{{{key}: {_encode_expr(gen, args[1], val)} for {key}, {val} in {var}.items()}})')
+    elif isinstance(tp, type) and is_dataclass(tp):
+        return f'(None if {var} is None else {gen.helper(get_dataclass_encoder(tp))}({var}))'
+    return f'{gen.helper(_encode_value)}({var})'
+
+
+def _decode_expr(gen: _Generator, tp: Any, var: str) -> str:
+    """source expression that decodes `var` into `tp`"""
+    origin = get_origin(tp)
+    args = get_args(tp)
+    if origin is Union:
+        non_none = [a for a in args if a is not type(None)]
+        if len(non_none) == 1:
+            return _decode_expr(gen, non_none[0], var)
+        return var
+    if origin in (list, List) and args:
+        inner = gen.variable()
+        expr = _decode_expr(gen, args[0], inner)
+        if expr == inner:
+            return var
+        return f'(None if {var} is None else [{expr} for {inner} in {var}])'
+    if origin in (dict, Dict) and len(args) == 2:
+        key, val = gen.variable(), gen.variable()
+        expr = _decode_expr(gen, args[1], val)
+        if expr == val:
+            return var
+        return f'(None if {var} is None else {{{key}: {expr} for {key}, {val} in {var}.items()}})'
+    if isinstance(tp, type) and is_dataclass(tp):
+        return f'(None if {var} is None else {gen.helper(get_dataclass_decoder(tp))}({var}))'
+    return var
+
+
+def _build_encoder(cls: Type) -> Callable[[Any], Dict[str, Any]]:
+    gen = _Generator()
+    hints = _type_hints(cls)
+    items = []
+    for f in fields(cls):
+        items.append(f'{f.name!r}: {_encode_expr(gen, hints.get(f.name, Any), f"obj.{f.name}")}')
+    source = (
+        'def to_dict(obj):\n'
+        f'    return {{{", ".join(items)}}}\n'
+    )
+    return gen.build(source, 'to_dict')
+
+
+def _build_decoder(cls: Type) -> Callable[[Dict[str, Any]], Any]:
+    gen = _Generator()
+    gen.namespace['_cls'] = cls
+    hints = _type_hints(cls)
+    lines = ['def from_dict(data):', '    kwargs = {}']
+    for f in fields(cls):
+        if not f.init:
+            continue
+        value = gen.variable()
+        expr = _decode_expr(gen, hints.get(f.name, Any), value)
+        # absent keys are left to the field defaults, a missing required field is reported by the constructor
+        lines.append(f'    {value} = data.get({f.name!r}, _MISSING)')
+        lines.append(f'    if {value} is not _MISSING:')
+        lines.append(f'        kwargs[{f.name!r}] = {expr}')
+    lines.append('    return _cls(**kwargs)')
+    return gen.build('\n'.join(lines) + '\n', 'from_dict')
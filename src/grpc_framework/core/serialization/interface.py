@@ -1,5 +1,5 @@
 import abc
-from ...types import T, Any, BytesLike, OptionalT, TypeT
+from ...types import T, Any, BytesLike, BufferLike, OptionalT, TypeT
 from typing import Type
 
 __all__ = [
@@ -10,9 +10,12 @@ __all__ = [
 
 
 class TransportCodec(metaclass=abc.ABCMeta):
+    # whether `decode` needs the target type to read the data, json like codecs are self describing
+    requires_schema: bool = False
+
     @abc.abstractmethod
-    def decode(self, data: BytesLike, into: OptionalT = None) -> Any:
-        """bytes -> transport object (e.g., protobuf.Message or dict)"""
+    def decode(self, data: BufferLike, into: OptionalT = None) -> Any:
+        """bytes -> transport object (e.g., protobuf.Message or dict), `data` may be a memoryview slice"""
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -34,17 +37,47 @@ class ModelConverter(metaclass=abc.ABCMeta):
 
 
 class Serializer:
+    """bytes <-> domain model, through the codec and the converter
+
+    Known codec/converter pairs are served by a fused single pass pipeline (see `pipelines`),
+    other pairs decode to the transport object first and convert it afterwards.
+    """
+
     def __init__(self, codec: Type[TransportCodec], converter: Type[ModelConverter]):
         self.codec = codec()
         self.converter = converter()
+        self._select_pipeline()
+
+    def _select_pipeline(self):
+        from .pipelines import get_pipeline
+        pipeline = get_pipeline(self.codec, self.converter)
+        self.fused = pipeline is not None
+        self._deserialize, self._serialize = pipeline or (self._two_stage_deserialize, self._two_stage_serialize)
+
+    def deserialize(self, data: BufferLike, model_type: TypeT) -> T:
+        return self._deserialize(data, model_type)
 
-    def deserialize(self, data: bytes, model_type: TypeT) -> T:
+    def serialize(self, model: T) -> bytes:
+        return self._serialize(model)
+
+    def _two_stage_deserialize(self, data: BufferLike, model_type: TypeT) -> T:
         transport_obj = self.codec.decode(data, into=model_type)
         return self.converter.to_model(transport_obj, model_type)
 
-    def serialize(self, model: T) -> bytes:
+    def _two_stage_serialize(self, model: T) -> bytes:
         transport_obj = self.converter.from_model(model)
         return self.codec.encode(transport_obj)
 
+    def __getstate__(self):
+        # the pipeline functions are closures, they are rebuilt after unpickling
+        state = self.__dict__.copy()
+        state.pop('_deserialize', None)
+        state.pop('_serialize', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._select_pipeline()
+
     def __repr__(self):
         return f'<gRPC Serializer codec={self.codec.__class__.__name__} converter={self.converter.__class__.__name__}>'
@@ -0,0 +1,42 @@
+"""reuse of protobuf message instances for long request streams
+
+Every stream item normally allocates a new message, a pool keeps a small ring of instances per stream
+and parses each item into the next one, `ParseFromString` clears the previous content first.
+A message taken from the pool stays valid until `size` more items are parsed,
+anything that must outlive that window is copied with `retain`.
+"""
+from typing import Generic, List, Type, TypeVar
+from google.protobuf.message import Message
+from ...types import BufferLike
+
+__all__ = ['MessagePool']
+
+M = TypeVar('M', bound=Message)
+
+
+class MessagePool(Generic[M]):
+    """a ring of `size` reused instances of one message class"""
+
+    __slots__ = ('message_type', 'size', '_messages', '_index')
+
+    def __init__(self, message_type: Type[M], size: int = 1):
+        if size < 1:
+            raise ValueError(f'the message pool size must be at least 1, got {size}')
+        self.message_type = message_type
+        self.size = size
+        self._messages: List[M] = [message_type() for _ in range(size)]
+        self._index = 0
+
+    def parse(self, data: BufferLike, model_type=None) -> M:
+        """parse data into the next pooled message, the item the pool handed out `size` parses ago is overwritten"""
+        message = self._messages[self._index]
+        self._index = (self._index + 1) % self.size
+        message.ParseFromString(data)
+        return message
+
+    @staticmethod
+    def retain(message: M) -> M:
+        """copy a pooled message so it can be kept after the stream moves on"""
+        copied = type(message)()
+        copied.CopyFrom(message)
+        return copied
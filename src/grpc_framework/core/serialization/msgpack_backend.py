@@ -0,0 +1,351 @@
+"""MessagePack backends of `MsgPackCodec`
+
+`MsgPackLibBackend` wraps the `msgpack` package, `PurePythonMsgPackBackend` implements the format
+without any dependency. Both produce the same bytes for the same values and share the extension types:
+
+- datetime: the msgpack timestamp extension (type -1), decoded as an aware UTC datetime,
+  naive datetimes are treated as UTC
+- UUID: extension type `EXT_UUID`, the 16 raw bytes
+- other extension types are decoded as `ExtType(code, data)` and encoded back as they are
+"""
+import abc
+import datetime
+import struct
+import uuid
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+__all__ = [
+    'EXT_TIMESTAMP',
+    'EXT_UUID',
+    'ExtType',
+    'MsgPackBackend',
+    'MsgPackLibBackend',
+    'PurePythonMsgPackBackend',
+    'default_msgpack_backend'
+]
+
+EXT_TIMESTAMP = -1
+EXT_UUID = 1
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+if msgpack is not None:
+    ExtType = msgpack.ExtType
+else:
+    class ExtType(NamedTuple):
+        """an extension value of an unknown type, `msgpack.ExtType` when `msgpack` is installed"""
+        code: int
+        data: bytes
+
+
+class MsgPackBackend(metaclass=abc.ABCMeta):
+    @abc.abstractmethod
+    def pack(self, obj: Any) -> bytes:
+        """python value -> msgpack bytes"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def unpack(self, data: bytes) -> Any:
+        """msgpack bytes -> python value"""
+        raise NotImplementedError
+
+
+def _split_datetime(value: datetime.datetime) -> Tuple[int, int]:
+    """(seconds, nanoseconds) since the epoch"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    delta = value - _EPOCH
+    seconds = delta.days * 86400 + delta.seconds
+    return seconds, delta.microseconds * 1000
+
+
+def _pack_timestamp(value: datetime.datetime) -> bytes:
+    seconds, nanoseconds = _split_datetime(value)
+    if seconds >> 34 == 0:
+        data64 = nanoseconds << 34 | seconds
+        if data64 & 0xffffffff00000000 == 0:
+            return struct.pack('>I', data64)
+        return struct.pack('>Q', data64)
+    return struct.pack('>Iq', nanoseconds, seconds)
+
+
+def _unpack_timestamp(data: bytes) -> datetime.datetime:
+    if len(data) == 4:
+        seconds, nanoseconds = struct.unpack('>I', data)[0], 0
+    elif len(data) == 8:
+        data64 = struct.unpack('>Q', data)[0]
+        seconds, nanoseconds = data64 & 0x00000003ffffffff, data64 >> 34
+    elif len(data) == 12:
+        nanoseconds, seconds = struct.unpack('>Iq', data)
+    else:
+        raise ValueError(f'Invalid msgpack timestamp length {len(data)}')
+    return _EPOCH + datetime.timedelta(seconds=seconds, microseconds=nanoseconds // 1000)
+
+
+class MsgPackLibBackend(MsgPackBackend):
+    """backend of the `msgpack` package"""
+
+    def __init__(self):
+        assert msgpack is not None, '`msgpack` must be installed to use `MsgPackLibBackend`'
+        self._packer_options = dict(use_bin_type=True, default=self._default)
+        self._unpacker_options = dict(raw=False, strict_map_key=False, timestamp=3, ext_hook=self._ext_hook)
+
+    @staticmethod
+    def _default(obj: Any) -> Any:
+        if isinstance(obj, datetime.datetime):
+            return msgpack.Timestamp(*_split_datetime(obj))
+        if isinstance(obj, uuid.UUID):
+            return msgpack.ExtType(EXT_UUID, obj.bytes)
+        if isinstance(obj, memoryview):
+            return obj.tobytes()
+        raise TypeError(f'Object of type {type(obj).__name__} is not msgpack serializable')
+
+    @staticmethod
+    def _ext_hook(code: int, data: bytes) -> Any:
+        # timestamps are decoded by msgpack itself (`timestamp=3`)
+        if code == EXT_UUID:
+            return uuid.UUID(bytes=data)
+        return ExtType(code, data)
+
+    def pack(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, **self._packer_options)
+
+    def unpack(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, **self._unpacker_options)
+
+
+class PurePythonMsgPackBackend(MsgPackBackend):
+    """dependency free backend, slower than `MsgPackLibBackend` but wire compatible"""
+
+    def __init__(self):
+        self._encoders: Dict[type, Callable[[Any, List[bytes]], None]] = {
+            type(None): self._pack_nil,
+            bool: self._pack_bool,
+            int: self._pack_int,
+            float: self._pack_float,
+            str: self._pack_str,
+            bytes: self._pack_bin,
+            bytearray: self._pack_bin,
+            memoryview: self._pack_bin,
+            list: self._pack_array,
+            tuple: self._pack_array,
+            dict: self._pack_map,
+            datetime.datetime: self._pack_datetime,
+            uuid.UUID: self._pack_uuid,
+            ExtType: self._pack_ext_type,
+        }
+
+    def pack(self, obj: Any) -> bytes:
+        out: List[bytes] = []
+        self._pack(obj, out)
+        return b''.join(out)
+
+    def unpack(self, data: bytes) -> Any:
+        view = memoryview(data)
+        value, offset = self._unpack(view, 0)
+        if offset != len(view):
+            raise ValueError('Extra data after the msgpack value')
+        return value
+
+    # ------------------------------------------------------------ pack
+
+    def _pack(self, obj: Any, out: List[bytes]):
+        encoder = self._encoders.get(type(obj))
+        if encoder is None:
+            for type_, candidate in self._encoders.items():
+                if type_ is not type(None) and isinstance(obj, type_):
+                    encoder = candidate
+                    break
+            else:
+                raise TypeError(f'Object of type {type(obj).__name__} is not msgpack serializable')
+        encoder(obj, out)
+
+    @staticmethod
+    def _pack_nil(obj: None, out: List[bytes]):
+        out.append(b'\xc0')
+
+    @staticmethod
+    def _pack_bool(obj: bool, out: List[bytes]):
+        out.append(b'\xc3' if obj else b'\xc2')
+
+    @staticmethod
+    def _pack_int(obj: int, out: List[bytes]):
+        if 0 <= obj < 0x80:
+            out.append(struct.pack('B', obj))
+        elif -0x20 <= obj < 0:
+            out.append(struct.pack('b', obj))
+        elif 0 <= obj <= 0xff:
+            out.append(struct.pack('>BB', 0xcc, obj))
+        elif 0 <= obj <= 0xffff:
+            out.append(struct.pack('>BH', 0xcd, obj))
+        elif 0 <= obj <= 0xffffffff:
+            out.append(struct.pack('>BI', 0xce, obj))
+        elif 0 <= obj <= 0xffffffffffffffff:
+            out.append(struct.pack('>BQ', 0xcf, obj))
+        elif -0x80 <= obj < 0:
+            out.append(struct.pack('>Bb', 0xd0, obj))
+        elif -0x8000 <= obj < 0:
+            out.append(struct.pack('>Bh', 0xd1, obj))
+        elif -0x80000000 <= obj < 0:
+            out.append(struct.pack('>Bi', 0xd2, obj))
+        elif -0x8000000000000000 <= obj < 0:
+            out.append(struct.pack('>Bq', 0xd3, obj))
+        else:
+            raise OverflowError('Integer value out of range')
+
+    @staticmethod
+    def _pack_float(obj: float, out: List[bytes]):
+        out.append(struct.pack('>Bd', 0xcb, obj))
+
+    @staticmethod
+    def _pack_length(length: int, out: List[bytes], fix: int, fix_max: int, codes: Tuple[int, ...]):
+        if length <= fix_max and fix:
+            out.append(struct.pack('B', fix | length))
+        elif length <= 0xff and codes[0]:
+            out.append(struct.pack('>BB', codes[0], length))
+        elif length <= 0xffff:
+            out.append(struct.pack('>BH', codes[1], length))
+        elif length <= 0xffffffff:
+            out.append(struct.pack('>BI', codes[2], length))
+        else:
+            raise ValueError('Object is too large for msgpack')
+
+    def _pack_str(self, obj: str, out: List[bytes]):
+        data = obj.encode('utf-8')
+        self._pack_length(len(data), out, 0xa0, 31, (0xd9, 0xda, 0xdb))
+        out.append(data)
+
+    def _pack_bin(self, obj: Any, out: List[bytes]):
+        data = bytes(obj)
+        self._pack_length(len(data), out, 0, 0, (0xc4, 0xc5, 0xc6))
+        out.append(data)
+
+    def _pack_array(self, obj: Any, out: List[bytes]):
+        self._pack_length(len(obj), out, 0x90, 15, (0, 0xdc, 0xdd))
+        for item in obj:
+            self._pack(item, out)
+
+    def _pack_map(self, obj: Dict, out: List[bytes]):
+        self._pack_length(len(obj), out, 0x80, 15, (0, 0xde, 0xdf))
+        for key, value in obj.items():
+            self._pack(key, out)
+            self._pack(value, out)
+
+    @staticmethod
+    def _pack_ext(code: int, data: bytes, out: List[bytes]):
+        fixext = {1: 0xd4, 2: 0xd5, 4: 0xd6, 8: 0xd7, 16: 0xd8}.get(len(data))
+        if fixext is not None:
+            out.append(struct.pack('>Bb', fixext, code))
+        elif len(data) <= 0xff:
+            out.append(struct.pack('>BBb', 0xc7, len(data), code))
+        elif len(data) <= 0xffff:
+            out.append(struct.pack('>BHb', 0xc8, len(data), code))
+        else:
+            out.append(struct.pack('>BIb', 0xc9, len(data), code))
+        out.append(data)
+
+    def _pack_datetime(self, obj: datetime.datetime, out: List[bytes]):
+        self._pack_ext(EXT_TIMESTAMP, _pack_timestamp(obj), out)
+
+    def _pack_uuid(self, obj: uuid.UUID, out: List[bytes]):
+        self._pack_ext(EXT_UUID, obj.bytes, out)
+
+    def _pack_ext_type(self, obj: ExtType, out: List[bytes]):
+        self._pack_ext(obj.code, obj.data, out)
+
+    # ------------------------------------------------------------ unpack
+
+    def _unpack(self, view: memoryview, offset: int) -> Tuple[Any, int]:
+        code = view[offset]
+        offset += 1
+        if code <= 0x7f:
+            return code, offset
+        if code >= 0xe0:
+            return code - 0x100, offset
+        if 0x80 <= code <= 0x8f:
+            return self._unpack_map(view, offset, code & 0x0f)
+        if 0x90 <= code <= 0x9f:
+            return self._unpack_array(view, offset, code & 0x0f)
+        if 0xa0 <= code <= 0xbf:
+            length = code & 0x1f
+            return str(view[offset:offset + length], 'utf-8'), offset + length
+        if code == 0xc0:
+            return None, offset
+        if code == 0xc2:
+            return False, offset
+        if code == 0xc3:
+            return True, offset
+        if code in _FIXED:
+            fmt, size = _FIXED[code]
+            return struct.unpack_from(fmt, view, offset)[0], offset + size
+        if code in _SIZED:
+            kind, fmt, size = _SIZED[code]
+            length = struct.unpack_from(fmt, view, offset)[0]
+            offset += size
+            if kind == 'str':
+                return str(view[offset:offset + length], 'utf-8'), offset + length
+            if kind == 'bin':
+                return bytes(view[offset:offset + length]), offset + length
+            if kind == 'array':
+                return self._unpack_array(view, offset, length)
+            if kind == 'map':
+                return self._unpack_map(view, offset, length)
+            ext_code = struct.unpack_from('b', view, offset)[0]
+            offset += 1
+            return self._unpack_ext(ext_code, bytes(view[offset:offset + length])), offset + length
+        if code in _FIXEXT:
+            length = _FIXEXT[code]
+            ext_code = struct.unpack_from('b', view, offset)[0]
+            offset += 1
+            return self._unpack_ext(ext_code, bytes(view[offset:offset + length])), offset + length
+        raise ValueError(f'Invalid msgpack type code 0x{code:02x}')
+
+    def _unpack_array(self, view: memoryview, offset: int, length: int) -> Tuple[List, int]:
+        items = []
+        for _ in range(length):
+            item, offset = self._unpack(view, offset)
+            items.append(item)
+        return items, offset
+
+    def _unpack_map(self, view: memoryview, offset: int, length: int) -> Tuple[Dict, int]:
+        result = {}
+        for _ in range(length):
+            key, offset = self._unpack(view, offset)
+            value, offset = self._unpack(view, offset)
+            result[key] = value
+        return result, offset
+
+    @staticmethod
+    def _unpack_ext(code: int, data: bytes) -> Any:
+        if code == EXT_TIMESTAMP:
+            return _unpack_timestamp(data)
+        if code == EXT_UUID:
+            return uuid.UUID(bytes=data)
+        return ExtType(code, data)
+
+
+_FIXED = {
+    0xca: ('>f', 4), 0xcb: ('>d', 8),
+    0xcc: ('>B', 1), 0xcd: ('>H', 2), 0xce: ('>I', 4), 0xcf: ('>Q', 8),
+    0xd0: ('>b', 1), 0xd1: ('>h', 2), 0xd2: ('>i', 4), 0xd3: ('>q', 8),
+}
+_SIZED = {
+    0xc4: ('bin', '>B', 1), 0xc5: ('bin', '>H', 2), 0xc6: ('bin', '>I', 4),
+    0xc7: ('ext', '>B', 1), 0xc8: ('ext', '>H', 2), 0xc9: ('ext', '>I', 4),
+    0xd9: ('str', '>B', 1), 0xda: ('str', '>H', 2), 0xdb: ('str', '>I', 4),
+    0xdc: ('array', '>H', 2), 0xdd: ('array', '>I', 4),
+    0xde: ('map', '>H', 2), 0xdf: ('map', '>I', 4),
+}
+_FIXEXT = {0xd4: 1, 0xd5: 2, 0xd6: 4, 0xd7: 8, 0xd8: 16}
+
+
+def default_msgpack_backend() -> MsgPackBackend:
+    """the `msgpack` package when it is installed, the pure python implementation otherwise"""
+    if msgpack is not None:
+        return MsgPackLibBackend()
+    return PurePythonMsgPackBackend()
@@ -0,0 +1,79 @@
+"""running the serializer of large payloads outside the event loop thread
+
+Decoding or encoding a multi megabyte payload on the loop blocks every other call of the worker.
+Above `threshold` bytes the work is moved to an executor, smaller payloads stay inline because the
+executor round trip costs more than they do.
+The request size is known before decoding, a response size is only known after encoding,
+so every route remembers the size of its last response and its next one is offloaded when that was large.
+The offloaded calls are counted in an `OffloadStats` row, the one of the metrics registry when metrics are enabled.
+"""
+from typing import Any, Callable, Dict, Optional, TYPE_CHECKING
+from ...types import BufferLike
+from ..metrics.registry import OffloadStats, OFFLOADED_DECODES, OFFLOADED_ENCODES
+
+if TYPE_CHECKING:
+    from ...utils import Sync2AsyncUtils
+
+__all__ = ['SerializationOffloader']
+
+
+class SerializationOffloader:
+    """offloads serializer calls for payloads of at least `threshold` bytes, None disables it
+
+    Args:
+        threshold: payload size in bytes from which the serializer runs in the executor
+        counters: where the offloaded calls are counted, in process counters by default
+    """
+
+    def __init__(self, threshold: Optional[int] = None, counters: Optional[OffloadStats] = None):
+        self.threshold = threshold
+        self.counters = counters if counters is not None else OffloadStats()
+        self.s2a: Optional['Sync2AsyncUtils'] = None
+        self._response_sizes: Dict[str, int] = {}
+
+    @property
+    def offloaded_decodes(self) -> int:
+        """how many requests were decoded in the executor"""
+        return self.counters.read()[OFFLOADED_DECODES]
+
+    @property
+    def offloaded_encodes(self) -> int:
+        """how many responses were encoded in the executor"""
+        return self.counters.read()[OFFLOADED_ENCODES]
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold is not None and self.s2a is not None
+
+    def init_s2a(self, s2a: 'Sync2AsyncUtils'):
+        self.s2a = s2a
+
+    def init_counters(self, counters: OffloadStats):
+        self.counters = counters
+
+    def should_offload_request(self, data: Any) -> bool:
+        """whether a request payload is large enough to be decoded in the executor"""
+        return self.enabled and isinstance(data, BufferLike) and len(data) >= self.threshold
+
+    def should_offload_response(self, route: Optional[str]) -> bool:
+        """whether the previous response of the route was large enough to encode the next one in the executor"""
+        return self.enabled and self._response_sizes.get(route, 0) >= self.threshold
+
+    def observe_response(self, route: Optional[str], rendered: Any):
+        """remember the encoded size of a route response"""
+        if isinstance(rendered, BufferLike):
+            self._response_sizes[route] = len(rendered)
+
+    async def decode(self, func: Callable, *args) -> Any:
+        self.counters.decode()
+        return await self.s2a.run_function(func, *args)
+
+    async def encode(self, func: Callable, *args) -> Any:
+        self.counters.encode()
+        return await self.s2a.run_function(func, *args)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'offloaded_decodes': self.offloaded_decodes,
+            'offloaded_encodes': self.offloaded_encodes
+        }
@@ -0,0 +1,215 @@
+"""fused single pass pipelines for the built-in codec/converter pairs
+
+A `Serializer` runs `codec.decode` and then `converter.to_model` (and the reverse for serialize).
+For the built-in pairs the two stages can be merged, e.g. protobuf bytes are parsed straight into
+the message and dataclasses are rendered by orjson natively.
+A pipeline is selected by the exact (codec class, converter class) pair, subclasses and custom pairs
+keep the two stage path.
+"""
+import json
+from dataclasses import is_dataclass
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+from google.protobuf.message import Message
+from google.protobuf.json_format import ParseDict, MessageToDict
+from .interface import TransportCodec, ModelConverter
+from .codec_impls import JSONCodec, ORJSONCodec, ProtobufCodec, DataclassesCodec, MsgPackCodec, orjson, _json_loads
+from .converter_impls import (
+    JsonProtobufConverter, CompiledJsonProtobufConverter,
+    JsonConverter, ProtobufConverter, DataclassesConverter, SchemaModelConverter
+)
+from .dataclass_codegen import get_dataclass_decoder
+from .protobuf_json import get_message_encoder, get_message_decoder
+from .schema_models import is_schema_model, is_schema_instance, get_schema_adapter
+from ...exceptions import GRPCException
+from ...types import BufferLike
+from .buffer import buffer_to_bytes
+
+__all__ = [
+    'DeserializeFunc',
+    'SerializeFunc',
+    'PipelineFactory',
+    'register_pipeline',
+    'get_pipeline'
+]
+
+DeserializeFunc = Callable[[BufferLike, Any], Any]
+SerializeFunc = Callable[[Any], bytes]
+PipelineFactory = Callable[[TransportCodec, ModelConverter], Tuple[DeserializeFunc, SerializeFunc]]
+
+_pipelines: Dict[Tuple[Type[TransportCodec], Type[ModelConverter]], PipelineFactory] = {}
+
+
+def register_pipeline(codec: Type[TransportCodec], converter: Type[ModelConverter]):
+    """register a fused pipeline factory for a codec/converter pair
+
+    The factory receives the codec and converter instances of the serializer and returns
+    the (deserialize, serialize) functions that replace the two stage path.
+    """
+
+    def decorator(factory: PipelineFactory) -> PipelineFactory:
+        _pipelines[(codec, converter)] = factory
+        return factory
+
+    return decorator
+
+
+def get_pipeline(codec: TransportCodec,
+                 converter: ModelConverter) -> Optional[Tuple[DeserializeFunc, SerializeFunc]]:
+    factory = _pipelines.get((type(codec), type(converter)))
+    if factory is None:
+        return None
+    return factory(codec, converter)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _codec_backends(codec: TransportCodec) -> Tuple[Callable[[Any], Any], Callable[[Any], bytes]]:
+    if isinstance(codec, ORJSONCodec):
+        return orjson.loads, orjson.dumps
+    if isinstance(codec, MsgPackCodec):
+        return codec.backend.unpack, codec.backend.pack
+    return _json_loads, _json_dumps
+
+
+def _dataclasses_loads(data: Any) -> Any:
+    try:
+        return _json_loads(data)
+    except Exception:
+        raise GRPCException.invalid_argument(f'The data is not json like, can not decode.')
+
+
+@register_pipeline(ProtobufCodec, ProtobufConverter)
+def _protobuf_pipeline(codec: ProtobufCodec, converter: ProtobufConverter):
+    def deserialize(data: BufferLike, model_type: Any) -> Any:
+        return model_type.FromString(data)
+
+    def serialize(model: Any) -> bytes:
+        if isinstance(model, BufferLike):
+            return buffer_to_bytes(model)
+        return model.SerializeToString()
+
+    return deserialize, serialize
+
+
+def _json_protobuf_pipeline(codec: TransportCodec, converter: JsonProtobufConverter):
+    # `json_format.Parse` runs `json.loads` with a duplicate key hook before `ParseDict`,
+    # decoding with the codec backend and parsing the dict directly is the faster single pass
+    loads, dumps = _codec_backends(codec)
+
+    def deserialize(data: BufferLike, model_type: Any) -> Any:
+        transport_obj = loads(data)
+        if isinstance(transport_obj, dict):
+            return ParseDict(transport_obj, model_type())
+        return converter.to_model(transport_obj, model_type)
+
+    def serialize(model: Any) -> bytes:
+        if isinstance(model, BufferLike):
+            return buffer_to_bytes(model)
+        if isinstance(model, Message):
+            return dumps(MessageToDict(model, preserving_proto_field_name=True))
+        return dumps(converter.from_model(model))
+
+    return deserialize, serialize
+
+
+def _compiled_json_protobuf_pipeline(codec: TransportCodec, converter: CompiledJsonProtobufConverter):
+    loads, dumps = _codec_backends(codec)
+
+    def deserialize(data: BufferLike, model_type: Any) -> Any:
+        transport_obj = loads(data)
+        if isinstance(transport_obj, dict):
+            return get_message_decoder(model_type)(transport_obj)
+        return converter.to_model(transport_obj, model_type)
+
+    def serialize(model: Any) -> bytes:
+        if isinstance(model, BufferLike):
+            return buffer_to_bytes(model)
+        if isinstance(model, Message):
+            return dumps(get_message_encoder(type(model))(model))
+        return dumps(converter.from_model(model))
+
+    return deserialize, serialize
+
+
+def _json_pipeline(codec: TransportCodec, converter: JsonConverter):
+    # the codec already yields plain values, `JsonConverter` hands them through as they are
+    loads, dumps = _codec_backends(codec)
+
+    def serialize(model: Any) -> bytes:
+        if isinstance(model, BufferLike):
+            return buffer_to_bytes(model)
+        return dumps(model)
+
+    return (lambda data, model_type: loads(data)), serialize
+
+
+def _dataclasses_pipeline(codec: TransportCodec, converter: DataclassesConverter):
+    if isinstance(codec, DataclassesCodec):
+        loads, dumps = _dataclasses_loads, _json_dumps
+    else:
+        loads, dumps = _codec_backends(codec)
+
+    def deserialize(data: BufferLike, model_type: Any) -> Any:
+        transport_obj = loads(data)
+        if isinstance(transport_obj, dict) and is_dataclass(model_type):
+            return get_dataclass_decoder(model_type)(transport_obj)
+        return converter.to_model(transport_obj, model_type)
+
+    if isinstance(codec, ORJSONCodec):
+        # orjson renders dataclasses natively, no intermediate dict is built
+        def serialize(model: Any) -> bytes:
+            if isinstance(model, BufferLike):
+                return buffer_to_bytes(model)
+            if isinstance(model, list) or (is_dataclass(model) and not isinstance(model, type)):
+                return dumps(model)
+            return dumps(converter.from_model(model))
+    else:
+        def serialize(model: Any) -> bytes:
+            if isinstance(model, BufferLike):
+                return buffer_to_bytes(model)
+            return dumps(converter.from_model(model))
+
+    return deserialize, serialize
+
+
+def _schema_model_pipeline(codec: TransportCodec, converter: SchemaModelConverter):
+    # schema models are decoded/encoded by their library in one pass, anything else takes the dataclasses path
+    deserialize_other, serialize_other = _dataclasses_pipeline(codec, converter)
+    if isinstance(codec, MsgPackCodec):
+        unpack, pack = codec.backend.unpack, codec.backend.pack
+
+        def decode(data: BufferLike, model_type: Any) -> Any:
+            return get_schema_adapter(model_type).decode_msgpack(data, unpack)
+
+        def encode(model: Any, model_type: Any) -> bytes:
+            return get_schema_adapter(model_type).encode_msgpack(model, pack)
+    else:
+        def decode(data: BufferLike, model_type: Any) -> Any:
+            return get_schema_adapter(model_type).decode_json(data)
+
+        def encode(model: Any, model_type: Any) -> bytes:
+            return get_schema_adapter(model_type).encode_json(model)
+
+    def deserialize(data: BufferLike, model_type: Any) -> Any:
+        if is_schema_model(model_type):
+            return decode(data, model_type)
+        return deserialize_other(data, model_type)
+
+    def serialize(model: Any) -> bytes:
+        if is_schema_instance(model):
+            return encode(model, type(model[0] if isinstance(model, list) else model))
+        return serialize_other(model)
+
+    return deserialize, serialize
+
+
+for _codec in (JSONCodec, ORJSONCodec):
+    register_pipeline(_codec, JsonProtobufConverter)(_json_protobuf_pipeline)
+    register_pipeline(_codec, CompiledJsonProtobufConverter)(_compiled_json_protobuf_pipeline)
+    register_pipeline(_codec, JsonConverter)(_json_pipeline)
+register_pipeline(MsgPackCodec, JsonConverter)(_json_pipeline)
+for _codec in (JSONCodec, ORJSONCodec, DataclassesCodec, MsgPackCodec):
+    register_pipeline(_codec, DataclassesConverter)(_dataclasses_pipeline)
+    register_pipeline(_codec, SchemaModelConverter)(_schema_model_pipeline)
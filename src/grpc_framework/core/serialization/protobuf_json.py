@@ -0,0 +1,317 @@
+"""JSON objects <-> protobuf messages through field maps precomputed from the descriptors
+
+`MessageToDict`/`ParseDict` dispatch on the field descriptor of every value on every call.
+Here the dispatch is done once per message type: encoding walks `ListFields()` and looks each field up
+in a prepared map, decoding turns the json object into constructor keyword arguments and lets the message
+constructor build the whole tree in one call.
+The output follows `MessageToDict(preserving_proto_field_name=True)`, well known types, extensions and
+anything the fast path does not accept are handed to `json_format`, so errors are reported the same way.
+"""
+import base64
+import math
+from typing import Any, Callable, Dict, Optional, Type
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+from google.protobuf.json_format import ParseDict, MessageToDict
+from google.protobuf.message import Message
+from google.protobuf.internal import type_checkers
+from google.protobuf.message_factory import GetMessageClass
+from .compile_cache import CompileCache
+
+__all__ = [
+    'get_message_encoder',
+    'get_message_decoder'
+]
+
+MessageEncoder = Callable[[Message], Any]
+MessageDecoder = Callable[[Any], Message]
+_ValueConverter = Optional[Callable[[Any], Any]]
+
+_WELL_KNOWN_TYPES = frozenset((
+    'google.protobuf.Any',
+    'google.protobuf.Duration',
+    'google.protobuf.FieldMask',
+    'google.protobuf.ListValue',
+    'google.protobuf.Struct',
+    'google.protobuf.Timestamp',
+    'google.protobuf.Value',
+    'google.protobuf.BoolValue',
+    'google.protobuf.BytesValue',
+    'google.protobuf.DoubleValue',
+    'google.protobuf.FloatValue',
+    'google.protobuf.Int32Value',
+    'google.protobuf.Int64Value',
+    'google.protobuf.StringValue',
+    'google.protobuf.UInt32Value',
+    'google.protobuf.UInt64Value',
+))
+_INT32_TYPES = (FieldDescriptor.CPPTYPE_INT32, FieldDescriptor.CPPTYPE_UINT32)
+_INT64_TYPES = (FieldDescriptor.CPPTYPE_INT64, FieldDescriptor.CPPTYPE_UINT64)
+
+_message_encoders: Dict[Type[Message], MessageEncoder] = {}
+_message_decoders: Dict[Type[Message], MessageDecoder] = {}
+# recursive messages reference the function being prepared, the caches keep it from the other threads
+_fields_encoders = CompileCache()
+_fields_decoders = CompileCache()
+
+
+def get_message_encoder(message_type: Type[Message]) -> MessageEncoder:
+    """message -> json object, prepared once per message type"""
+    try:
+        return _message_encoders[message_type]
+    except KeyError:
+        pass
+    if message_type.DESCRIPTOR.full_name in _WELL_KNOWN_TYPES:
+        encoder = _json_format_encode
+    else:
+        encoder = _fields_encoder(message_type.DESCRIPTOR)
+    _message_encoders[message_type] = encoder
+    return encoder
+
+
+def get_message_decoder(message_type: Type[Message]) -> MessageDecoder:
+    """json object -> message, prepared once per message type"""
+    try:
+        return _message_decoders[message_type]
+    except KeyError:
+        pass
+    if message_type.DESCRIPTOR.full_name in _WELL_KNOWN_TYPES:
+        def decoder(data: Any) -> Message:
+            return ParseDict(data, message_type())
+    else:
+        fields_decoder = _fields_decoder(message_type.DESCRIPTOR)
+
+        def decoder(data: Any) -> Message:
+            try:
+                return message_type(**fields_decoder(data))
+            except Exception:
+                # unknown keys, loosely typed values (e.g. "1" for an int32) and invalid data
+                return ParseDict(data, message_type())
+    _message_decoders[message_type] = decoder
+    return decoder
+
+
+def _json_format_encode(message: Message) -> Any:
+    return MessageToDict(message, preserving_proto_field_name=True)
+
+
+def _is_map(field: FieldDescriptor) -> bool:
+    return field.message_type is not None and field.message_type.GetOptions().map_entry
+
+
+# ---------------------------------------------------------------- encode
+
+
+def _fields_encoder(descriptor: Descriptor) -> Callable[[Message], Dict[str, Any]]:
+    return _fields_encoders.get(descriptor, _build_fields_encoder)
+
+
+def _build_fields_encoder(descriptor: Descriptor) -> Callable[[Message], Dict[str, Any]]:
+    plan = {field: (field.name, _field_encoder(field)) for field in descriptor.fields}
+
+    def encode(message: Message) -> Dict[str, Any]:
+        js = {}
+        for field, value in message.ListFields():
+            try:
+                name, convert = plan[field]
+            except KeyError:
+                # extensions are rendered by json_format
+                return _json_format_encode(message)
+            js[name] = value if convert is None else convert(value)
+        return js
+
+    return encode
+
+
+def _field_encoder(field: FieldDescriptor) -> _ValueConverter:
+    if _is_map(field):
+        key_field = field.message_type.fields_by_name['key']
+        value_convert = _value_encoder(field.message_type.fields_by_name['value'])
+        if key_field.cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+            def key_convert(key):
+                return 'true' if key else 'false'
+        else:
+            key_convert = str
+        if value_convert is None:
+            return lambda value: {key_convert(k): v for k, v in value.items()}
+        return lambda value: {key_convert(k): value_convert(v) for k, v in value.items()}
+    value_convert = _value_encoder(field)
+    if field.label == FieldDescriptor.LABEL_REPEATED:
+        if value_convert is None:
+            return list
+        return lambda value: [value_convert(v) for v in value]
+    return value_convert
+
+
+def _value_encoder(field: FieldDescriptor) -> _ValueConverter:
+    cpp_type = field.cpp_type
+    if cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+        if field.message_type.full_name in _WELL_KNOWN_TYPES:
+            return _json_format_encode
+        return _fields_encoder(field.message_type)
+    if cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+        if field.enum_type.full_name == 'google.protobuf.NullValue':
+            return lambda value: None
+        names = {v.number: v.name for v in field.enum_type.values}
+        return lambda value: names.get(value, value)
+    if field.type == FieldDescriptor.TYPE_BYTES:
+        return lambda value: base64.b64encode(value).decode('utf-8')
+    if cpp_type in _INT64_TYPES:
+        return str
+    if cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+        return _encode_double
+    if cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+        return _encode_float
+    return None
+
+
+def _encode_special_float(value: float) -> Optional[str]:
+    if math.isinf(value):
+        return '-Infinity' if value < 0.0 else 'Infinity'
+    if math.isnan(value):
+        return 'NaN'
+    return None
+
+
+def _encode_double(value: float) -> Any:
+    special = _encode_special_float(value)
+    return value if special is None else special
+
+
+def _encode_float(value: float) -> Any:
+    special = _encode_special_float(value)
+    return type_checkers.ToShortestFloat(value) if special is None else special
+
+
+# ---------------------------------------------------------------- decode
+
+
+def _fields_decoder(descriptor: Descriptor) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    return _fields_decoders.get(descriptor, _build_fields_decoder)
+
+
+def _build_fields_decoder(descriptor: Descriptor) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    plan = {}
+    nullable = set()
+    for field in descriptor.fields:
+        entry = (field.name, _field_decoder(field))
+        plan[field.name] = entry
+        plan[field.json_name] = entry
+        if (field.message_type is not None and field.message_type.full_name == 'google.protobuf.Value') or \
+                (field.enum_type is not None and field.enum_type.full_name == 'google.protobuf.NullValue'):
+            nullable.add(field.name)
+
+    def decode(data: Dict[str, Any]) -> Dict[str, Any]:
+        kwargs = {}
+        for key, value in data.items():
+            # an unknown key raises KeyError, the caller falls back to json_format
+            name, convert = plan[key]
+            if value is None:
+                if name in nullable:
+                    raise ValueError('null value for a google.protobuf.Value field')
+                # null clears the field
+                continue
+            kwargs[name] = value if convert is None else convert(value)
+        return kwargs
+
+    return decode
+
+
+def _field_decoder(field: FieldDescriptor) -> _ValueConverter:
+    if _is_map(field):
+        key_convert = _map_key_decoder(field.message_type.fields_by_name['key'])
+        value_convert = _value_decoder(field.message_type.fields_by_name['value'])
+
+        def convert_map(value):
+            if type(value) is not dict:
+                raise TypeError('map field requires an object')
+            if value_convert is None:
+                return {key_convert(k): v for k, v in value.items()}
+            return {key_convert(k): value_convert(v) for k, v in value.items()}
+
+        return convert_map
+    value_convert = _value_decoder(field)
+    if field.label == FieldDescriptor.LABEL_REPEATED:
+        def convert_list(value):
+            if type(value) is not list:
+                raise TypeError('repeated field requires an array')
+            if value_convert is None:
+                return value
+            return [value_convert(v) for v in value]
+
+        return convert_list
+    return value_convert
+
+
+def _map_key_decoder(field: FieldDescriptor) -> Callable[[str], Any]:
+    if field.cpp_type in _INT32_TYPES or field.cpp_type in _INT64_TYPES:
+        return int
+    if field.cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+        def convert(key):
+            if key == 'true':
+                return True
+            if key == 'false':
+                return False
+            raise ValueError(f'invalid bool map key {key!r}')
+
+        return convert
+    return lambda key: key
+
+
+def _value_decoder(field: FieldDescriptor) -> _ValueConverter:
+    cpp_type = field.cpp_type
+    if cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+        if field.message_type.full_name in _WELL_KNOWN_TYPES:
+            message_class = GetMessageClass(field.message_type)
+            return lambda value: ParseDict(value, message_class())
+        # nested messages are passed to the constructor as keyword dicts
+        return _fields_decoder(field.message_type)
+    if cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+        # the constructor accepts enum names and numbers
+        return None
+    if field.type == FieldDescriptor.TYPE_BYTES:
+        return _decode_bytes
+    if cpp_type == FieldDescriptor.CPPTYPE_STRING:
+        return None
+    if cpp_type in _INT32_TYPES:
+        return _decode_int32
+    if cpp_type in _INT64_TYPES:
+        return _decode_int64
+    if cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+        return _decode_bool
+    return _decode_float
+
+
+def _decode_bytes(value: Any) -> bytes:
+    encoded = value.encode('utf-8')
+    return base64.urlsafe_b64decode(encoded + b'=' * (4 - len(encoded) % 4))
+
+
+def _decode_int32(value: Any) -> int:
+    if type(value) is not int:
+        raise TypeError('loosely typed integer')
+    return value
+
+
+def _decode_int64(value: Any) -> int:
+    if type(value) is int:
+        return value
+    if type(value) is str:
+        return int(value)
+    raise TypeError('loosely typed integer')
+
+
+def _decode_bool(value: Any) -> bool:
+    if type(value) is not bool:
+        raise TypeError('loosely typed bool')
+    return value
+
+
+_SPECIAL_FLOATS = {'NaN': math.nan, 'Infinity': math.inf, '-Infinity': -math.inf}
+
+
+def _decode_float(value: Any) -> float:
+    if type(value) is float or type(value) is int:
+        return value
+    if type(value) is str and value in _SPECIAL_FLOATS:
+        return _SPECIAL_FLOATS[value]
+    raise TypeError('loosely typed float')
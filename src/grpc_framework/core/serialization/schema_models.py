@@ -0,0 +1,199 @@
+"""compiled adapters for schema library models, msgspec `Struct` and pydantic v2 `BaseModel`
+
+Both libraries validate and build their models in C, one adapter is built per model class and cached:
+msgspec decoders/encoders for a `Struct`, a `TypeAdapter` for a pydantic model.
+An adapter decodes json or msgpack bytes straight into the model in a single pass,
+or converts already decoded plain values when the codec is not one of them.
+The request body may be one model or a list of models, the adapters are built for both.
+msgspec writes a UUID as a string, never hands it to an `enc_hook` and does not read an extension
+into a `uuid` field: a `Struct` that may hold one is packed and unpacked by the codec backend instead,
+so it carries the same `EXT_UUID` values as `MsgPackCodec`.
+"""
+import uuid
+import inspect
+import datetime
+import threading
+from typing import Any, Callable, Dict, List, Type, Union
+from ...types import BufferLike
+from .msgpack_backend import EXT_UUID
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    from pydantic import BaseModel, TypeAdapter
+except ImportError:
+    # pydantic v1 has no `TypeAdapter`, only v2 models are compiled
+    BaseModel = TypeAdapter = None
+
+__all__ = [
+    'SchemaAdapter',
+    'MsgspecAdapter',
+    'PydanticAdapter',
+    'is_schema_model',
+    'is_schema_instance',
+    'get_schema_adapter'
+]
+
+# values the msgpack backends carry natively
+_MSGPACK_NATIVE_TYPES = (bytes, bytearray, memoryview, datetime.datetime, uuid.UUID)
+
+_adapters: Dict[Type, 'SchemaAdapter'] = {}
+_lock = threading.RLock()
+
+
+def is_msgspec_struct(model_type: Any) -> bool:
+    return msgspec is not None and inspect.isclass(model_type) and issubclass(model_type, msgspec.Struct)
+
+
+def is_pydantic_model(model_type: Any) -> bool:
+    return BaseModel is not None and inspect.isclass(model_type) and issubclass(model_type, BaseModel)
+
+
+def is_schema_model(model_type: Any) -> bool:
+    """whether the type is a msgspec `Struct` or a pydantic v2 model"""
+    return is_msgspec_struct(model_type) or is_pydantic_model(model_type)
+
+
+def is_schema_instance(model: Any) -> bool:
+    """whether the value is a schema model or a non empty list of them"""
+    if isinstance(model, list):
+        return bool(model) and is_schema_model(type(model[0]))
+    return is_schema_model(type(model))
+
+
+def get_schema_adapter(model_type: Type) -> 'SchemaAdapter':
+    """the compiled adapter of a schema model class, built once"""
+    try:
+        return _adapters[model_type]
+    except KeyError:
+        pass
+    with _lock:
+        if model_type not in _adapters:
+            if is_msgspec_struct(model_type):
+                _adapters[model_type] = MsgspecAdapter(model_type)
+            elif is_pydantic_model(model_type):
+                _adapters[model_type] = PydanticAdapter(model_type)
+            else:
+                raise TypeError(f'Expected msgspec Struct or pydantic model, got {model_type}')
+        return _adapters[model_type]
+
+
+class SchemaAdapter:
+    """decode/encode one schema model class, the values may be one model or a list of models"""
+
+    def __init__(self, model_type: Type):
+        self.model_type = model_type
+
+    def decode_json(self, data: BufferLike) -> Any:
+        raise NotImplementedError
+
+    def encode_json(self, model: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode_msgpack(self, data: BufferLike, unpack: Callable[[BufferLike], Any]) -> Any:
+        """msgpack bytes -> model, `unpack` is the codec backend for libraries without a msgpack decoder"""
+        return self.from_builtins(unpack(data))
+
+    def encode_msgpack(self, model: Any, pack: Callable[[Any], bytes]) -> bytes:
+        return pack(self.to_builtins(model, json_compatible=False))
+
+    def from_builtins(self, value: Any) -> Any:
+        """plain values (dicts, lists) -> model"""
+        raise NotImplementedError
+
+    def to_builtins(self, model: Any, json_compatible: bool = True) -> Any:
+        """model -> plain values, datetime/uuid/bytes are rendered as strings when `json_compatible`"""
+        raise NotImplementedError
+
+
+class MsgspecAdapter(SchemaAdapter):
+    def __init__(self, model_type: Type):
+        super().__init__(model_type)
+        target = Union[model_type, List[model_type]]
+        self.target = target
+        self._json_decoder = msgspec.json.Decoder(target)
+        self._json_encoder = msgspec.json.Encoder()
+        self._msgpack_decoder = msgspec.msgpack.Decoder(target, ext_hook=_msgspec_ext_hook)
+        self._msgpack_encoder = msgspec.msgpack.Encoder()
+        self.packs_uuid = _may_hold_uuid(msgspec.inspect.type_info(model_type), set())
+
+    def decode_json(self, data: BufferLike) -> Any:
+        return self._json_decoder.decode(data)
+
+    def encode_json(self, model: Any) -> bytes:
+        return self._json_encoder.encode(model)
+
+    def decode_msgpack(self, data: BufferLike, unpack: Callable[[BufferLike], Any]) -> Any:
+        if self.packs_uuid:
+            return self.from_builtins(unpack(data))
+        return self._msgpack_decoder.decode(data)
+
+    def encode_msgpack(self, model: Any, pack: Callable[[Any], bytes]) -> bytes:
+        if self.packs_uuid:
+            return pack(self.to_builtins(model, json_compatible=False))
+        return self._msgpack_encoder.encode(model)
+
+    def from_builtins(self, value: Any) -> Any:
+        return msgspec.convert(value, self.target)
+
+    def to_builtins(self, model: Any, json_compatible: bool = True) -> Any:
+        if json_compatible:
+            return msgspec.to_builtins(model)
+        return msgspec.to_builtins(model, builtin_types=_MSGPACK_NATIVE_TYPES)
+
+
+class PydanticAdapter(SchemaAdapter):
+    def __init__(self, model_type: Type):
+        super().__init__(model_type)
+        # a union adapter costs every call a union validation, the list adapter is only used for lists
+        self._adapter = TypeAdapter(model_type)
+        self._list_adapter = TypeAdapter(List[model_type])
+
+    def decode_json(self, data: BufferLike) -> Any:
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        # only the head is stripped, a large body is not copied
+        head = data[:64].lstrip() or data.lstrip()
+        if head[:1] in (b'[', '['):
+            return self._list_adapter.validate_json(data)
+        return self._adapter.validate_json(data)
+
+    def encode_json(self, model: Any) -> bytes:
+        if isinstance(model, list):
+            return self._list_adapter.dump_json(model)
+        return self._adapter.dump_json(model)
+
+    def from_builtins(self, value: Any) -> Any:
+        if isinstance(value, list):
+            return self._list_adapter.validate_python(value)
+        return self._adapter.validate_python(value)
+
+    def to_builtins(self, model: Any, json_compatible: bool = True) -> Any:
+        adapter = self._list_adapter if isinstance(model, list) else self._adapter
+        return adapter.dump_python(model, mode='json' if json_compatible else 'python')
+
+
+def _may_hold_uuid(info: Any, seen: set) -> bool:
+    """whether a value of a `msgspec.inspect` type may contain a UUID, `Any` may hold one too"""
+    if isinstance(info, (msgspec.inspect.UUIDType, msgspec.inspect.AnyType)):
+        return True
+    # recursive structs refer to the same type info
+    if id(info) in seen:
+        return False
+    seen.add(id(info))
+    for name in info.__struct_fields__:
+        value = getattr(info, name)
+        for item in value if isinstance(value, tuple) else (value,):
+            if isinstance(item, (msgspec.inspect.Type, msgspec.inspect.Field)) and _may_hold_uuid(item, seen):
+                return True
+    return False
+
+
+def _msgspec_ext_hook(code: int, data: memoryview) -> Any:
+    # uuid values packed by the `MsgPackCodec` backends
+    if code == EXT_UUID:
+        return uuid.UUID(bytes=bytes(data))
+    return msgspec.msgpack.Ext(code, bytes(data))
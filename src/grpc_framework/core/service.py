@@ -4,6 +4,7 @@ from ..core.enums import Interaction
 from typing import TypedDict, Callable, Optional, Type, Union, Dict
 from ..core.params import ParamInfo, ParamParser
 from ..core.request.request import Request
+from ..core.serialization import Serializer
 
 __all__ = [
     'rpc',
@@ -23,9 +24,20 @@ class RPCFunctionMetadata(TypedDict):
     rpc_service: Optional[Union['Service', Type['Service']]]
     input_param_info: Dict[str, ParamInfo]
     return_param_info: ParamInfo
+    # endpoint serializer, it overrides the service and application serializer
+    serializer: Optional[Serializer]
 
 
-def rpc(request_interaction: Interaction, response_interaction: Interaction):
+def endpoint_decorator(register: Callable, func: Optional[Callable]):
+    """support both `@decorator` and `@decorator(serializer=...)`"""
+    if func is None:
+        return register
+    return register(func)
+
+
+def rpc(request_interaction: Interaction,
+        response_interaction: Interaction,
+        serializer: Optional[Serializer] = None):
     """register a rpc method in a cbv mode."""
 
     def decorator(func):
@@ -33,44 +45,57 @@ def rpc(request_interaction: Interaction, response_interaction: Interaction):
         func.is_rpc_method = True
         func.__rpc_meta__ = {
             'request_interaction': request_interaction,
-            'response_interaction': response_interaction
+            'response_interaction': response_interaction,
+            'serializer': serializer
         }
         return func
 
     return decorator
 
 
-def unary_unary(func):
+def unary_unary(func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
     """register a unary_unary method in a cbv mode."""
-    return rpc(Interaction.unary, Interaction.unary)(func)
+    return endpoint_decorator(rpc(Interaction.unary, Interaction.unary, serializer), func)
 
 
-def unary_stream(func):
+def unary_stream(func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
     """register a unary_stream method in a cbv mode."""
-    return rpc(Interaction.unary, Interaction.stream)(func)
+    return endpoint_decorator(rpc(Interaction.unary, Interaction.stream, serializer), func)
 
 
-def stream_unary(func):
+def stream_unary(func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
     """register a stream_unary method in a cbv mode."""
-    return rpc(Interaction.stream, Interaction.unary)(func)
+    return endpoint_decorator(rpc(Interaction.stream, Interaction.unary, serializer), func)
 
 
-def stream_stream(func):
+def stream_stream(func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
     """register a stream_stream method in a cbv mode."""
-    return rpc(Interaction.stream, Interaction.stream)(func)
+    return endpoint_decorator(rpc(Interaction.stream, Interaction.stream, serializer), func)
 
 
 class Service:
-    def __init__(self, service_name: OptionalStr = None):
+    """a grpc service, cbv by subclassing or fbv by registering functions on an instance
+
+    `serializer` overrides the application serializer for every endpoint of the service,
+    set it as a class attribute (cbv) or pass it to the constructor (fbv).
+    """
+    serializer: Optional[Serializer] = None
+
+    def __init__(self, service_name: OptionalStr = None, serializer: Optional[Serializer] = None):
         self.service_name = service_name or self.__class__.__name__
         self._methods = {}
         self.request: Optional[Request] = None
+        if serializer is not None:
+            self.serializer = serializer
 
     @property
     def methods(self):
         return self._methods
 
-    def method(self, request_interaction: Interaction, response_interaction: Interaction):
+    def method(self,
+               request_interaction: Interaction,
+               response_interaction: Interaction,
+               serializer: Optional[Serializer] = None):
         def decorator(func):
             func_name = func.__name__
             if func_name in self._methods:
@@ -81,23 +106,24 @@ class Service:
                 response_interaction=response_interaction,
                 rpc_service=self,
                 input_param_info=ParamParser.parse_input_params(func),
-                return_param_info=ParamParser.parse_return_type(func)
+                return_param_info=ParamParser.parse_return_type(func),
+                serializer=serializer
             )
             return func
 
         return decorator
 
-    def unary_unary(self, func):
-        return self.method(Interaction.unary, Interaction.unary)(func)
+    def unary_unary(self, func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
+        return endpoint_decorator(self.method(Interaction.unary, Interaction.unary, serializer), func)
 
-    def unary_stream(self, func):
-        return self.method(Interaction.unary, Interaction.stream)(func)
+    def unary_stream(self, func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
+        return endpoint_decorator(self.method(Interaction.unary, Interaction.stream, serializer), func)
 
-    def stream_unary(self, func):
-        return self.method(Interaction.stream, Interaction.unary)(func)
+    def stream_unary(self, func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
+        return endpoint_decorator(self.method(Interaction.stream, Interaction.unary, serializer), func)
 
-    def stream_stream(self, func):
-        return self.method(Interaction.stream, Interaction.stream)(func)
+    def stream_stream(self, func: Optional[Callable] = None, *, serializer: Optional[Serializer] = None):
+        return endpoint_decorator(self.method(Interaction.stream, Interaction.stream, serializer), func)
 
     @classmethod
     def collect_rpc_methods(cls):
@@ -112,7 +138,8 @@ class Service:
                     response_interaction=rpc_meta['response_interaction'],
                     rpc_service=cls,
                     input_param_info=ParamParser.parse_input_params(func),
-                    return_param_info=ParamParser.parse_return_type(func)
+                    return_param_info=ParamParser.parse_return_type(func),
+                    serializer=rpc_meta.get('serializer')
                 )
         return methods
 
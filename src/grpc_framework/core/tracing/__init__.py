@@ -0,0 +1,16 @@
+from .trace import (
+    TRACEPARENT, Span, Trace, Tracer,
+    parse_traceparent, current_trace, current_traceparent
+)
+from .exporter import RingBufferExporter
+
+__all__ = [
+    'TRACEPARENT',
+    'Span',
+    'Trace',
+    'Tracer',
+    'RingBufferExporter',
+    'parse_traceparent',
+    'current_trace',
+    'current_traceparent'
+]
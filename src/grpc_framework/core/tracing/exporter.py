@@ -0,0 +1,57 @@
+"""in process ring buffer of finished traces
+
+Exporting a trace only appends it to a bounded deque, the traces are rendered as json when
+the buffer is flushed, the file always holds the last `capacity` traces, one json object per line.
+"""
+import os
+import json
+from collections import deque
+from typing import Deque, Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .trace import Trace
+
+__all__ = [
+    'RingBufferExporter'
+]
+
+
+class RingBufferExporter:
+    """keep the last `capacity` traces and write them to `path` on `flush`
+
+    Args:
+        path: json lines file the traces are written to, they are only kept in memory when None
+        capacity: number of traces kept, older traces are dropped
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 1000):
+        self.path = path
+        self.capacity = capacity
+        self.exported = 0
+        self._traces: Deque['Trace'] = deque(maxlen=capacity)
+        self._flushed = 0
+
+    def export(self, trace: 'Trace'):
+        self._traces.append(trace)
+        self.exported += 1
+
+    def traces(self) -> List[Dict]:
+        """the buffered traces, oldest first"""
+        return [trace.to_dict() for trace in list(self._traces)]
+
+    def flush(self) -> bool:
+        """write the buffer to `path` when traces were exported since the last flush"""
+        if self.path is None or self.exported == self._flushed:
+            return False
+        exported = self.exported
+        lines = [json.dumps(trace, separators=(',', ':')) for trace in self.traces()]
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # written aside and renamed, a reader never sees a partial buffer
+        with open(f'{self.path}.tmp', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+            f.write('\n')
+        os.replace(f'{self.path}.tmp', self.path)
+        self._flushed = exported
+        return True
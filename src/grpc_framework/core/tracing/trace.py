@@ -0,0 +1,227 @@
+"""rpc traces propagated by the W3C `traceparent` metadata
+
+A `Trace` is the server span of one rpc and the child spans recorded inside it
+(dependency resolution, deserialization, handler, serialization).
+
+Sampling:
+    - head: a request continuing a trace follows the sampled flag of its `traceparent`,
+      a new trace is sampled with `sample_rate`; only sampled requests create a `Trace`
+    - tail: a request that was not sampled keeps only its start time, when it turns out slow or failed
+      its server span is built afterwards and exported, its child spans are not known
+"""
+import time
+import random
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+from ..request.request import Request, _current_request, _EmptyRequest
+
+if TYPE_CHECKING:
+    from .exporter import RingBufferExporter
+
+__all__ = [
+    'TRACEPARENT',
+    'Span',
+    'Trace',
+    'Tracer',
+    'parse_traceparent',
+    'current_trace',
+    'current_traceparent'
+]
+
+TRACEPARENT = 'traceparent'
+_INVALID_TRACE_ID = '0' * 32
+_INVALID_SPAN_ID = '0' * 16
+_HEX = frozenset('0123456789abcdef')
+
+_current_trace: ContextVar[Optional['Trace']] = ContextVar('current_trace', default=None)
+
+
+def _new_trace_id() -> str:
+    return f'{random.getrandbits(128):032x}'
+
+
+def _new_span_id() -> str:
+    return f'{random.getrandbits(64):016x}'
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple]:
+    """`(trace_id, parent_span_id, sampled)` of a `traceparent` value, None when it is not valid"""
+    if not value or len(value) < 55:
+        return None
+    parts = value.split('-')
+    if len(parts) < 4:
+        return None
+    version, trace_id, span_id, flags = parts[:4]
+    if (
+            version == 'ff' or len(version) != 2 or len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2
+            or not _HEX.issuperset(trace_id + span_id + flags + version)
+            or trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID
+            or (version == '00' and len(parts) != 4)
+    ):
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+
+def current_trace() -> Optional['Trace']:
+    """the trace of the rpc being handled, None when it is not sampled"""
+    return _current_trace.get()
+
+
+def current_traceparent() -> Optional[str]:
+    """the `traceparent` an outbound call of the current rpc sends
+
+    a sampled rpc is the parent of the call, an rpc that is not sampled passes on the `traceparent` it received.
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        return trace.traceparent()
+    request = _current_request.get()
+    if request is _EmptyRequest:
+        return None
+    return request.get_metadata(TRACEPARENT)
+
+
+class Span:
+    """a child span, `start_ns` is relative to the start of the trace"""
+    __slots__ = ('name', 'span_id', 'start_ns', 'duration_ns', 'error')
+
+    def __init__(self, name: str, start_ns: int, duration_ns: int, error: bool = False):
+        self.name = name
+        self.span_id = _new_span_id()
+        self.start_ns = start_ns
+        self.duration_ns = duration_ns
+        self.error = error
+
+
+class Trace:
+    """the server span of one rpc and its child spans
+
+    Args:
+        method: full method name of the rpc
+        trace_id: id of the trace the rpc continues, a new trace when None
+        parent_id: span id of the caller
+        started: `perf_counter_ns()` the rpc started at, now when None
+    """
+    __slots__ = (
+        'method', 'trace_id', 'span_id', 'parent_id', 'start_unix_ns', 'started',
+        'duration_ns', 'status', 'spans', 'tail_sampled'
+    )
+
+    def __init__(self,
+                 method: str,
+                 trace_id: Optional[str] = None,
+                 parent_id: Optional[str] = None,
+                 started: Optional[int] = None):
+        now = time.perf_counter_ns()
+        self.method = method
+        self.trace_id = trace_id or _new_trace_id()
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.started = now if started is None else started
+        self.start_unix_ns = time.time_ns() - (now - self.started)
+        self.duration_ns: Optional[int] = None
+        self.status: Optional[str] = None
+        self.spans: List[Span] = []
+        self.tail_sampled = False
+
+    def add_span(self, name: str, started: int, error: bool = False):
+        """record a child span that started at `perf_counter_ns()` `started` and ends now"""
+        self.spans.append(Span(name, started - self.started, time.perf_counter_ns() - started, error))
+
+    def finish(self, status: str, ended: Optional[int] = None):
+        self.duration_ns = (time.perf_counter_ns() if ended is None else ended) - self.started
+        self.status = status
+
+    def traceparent(self) -> str:
+        """the `traceparent` of a call made inside this rpc"""
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.method,
+            'start_unix_nano': self.start_unix_ns,
+            'duration_ns': self.duration_ns,
+            'status': self.status,
+            'tail_sampled': self.tail_sampled,
+            'spans': [
+                {
+                    'span_id': span.span_id,
+                    'parent_id': self.span_id,
+                    'name': span.name,
+                    'start_unix_nano': self.start_unix_ns + span.start_ns,
+                    'duration_ns': span.duration_ns,
+                    'error': span.error
+                }
+                for span in self.spans
+            ]
+        }
+
+
+class Tracer:
+    """decide which rpcs are traced and hand the finished traces to the exporter
+
+    Args:
+        exporter: receives every kept trace
+        sample_rate: share of new traces that are recorded (head sampling)
+        slow_threshold: seconds from which an rpc that was not sampled is kept anyway (tail sampling)
+        keep_errors: keep rpcs that were not sampled and did not finish with OK (tail sampling)
+    """
+
+    def __init__(self,
+                 exporter: 'RingBufferExporter',
+                 sample_rate: float = 0.01,
+                 slow_threshold: Optional[float] = None,
+                 keep_errors: bool = True):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_threshold_ns = int(slow_threshold * 1e9) if slow_threshold is not None else None
+        self.keep_errors = keep_errors
+
+    @property
+    def tail_sampling(self) -> bool:
+        return self.keep_errors or self.slow_threshold_ns is not None
+
+    def start(self, request: Request, method: str) -> Optional[Trace]:
+        """the trace of a sampled rpc, it becomes the current trace; None when the rpc is not sampled"""
+        traceparent = request.get_metadata(TRACEPARENT)
+        if traceparent is not None:
+            parent = parse_traceparent(traceparent)
+            if parent is not None:
+                if not parent[2]:
+                    return None
+                return self._activate(request, Trace(method, trace_id=parent[0], parent_id=parent[1]))
+        if random.random() >= self.sample_rate:
+            return None
+        return self._activate(request, Trace(method))
+
+    @staticmethod
+    def _activate(request: Request, trace: Trace) -> Trace:
+        request.trace = trace
+        _current_trace.set(trace)
+        return trace
+
+    def finish(self, trace: Trace, status: str):
+        trace.finish(status)
+        self.exporter.export(trace)
+
+    def finish_unsampled(self, request: Request, method: str, started: int, status: str):
+        """tail sampling of an rpc that was not sampled, it is exported when slow or failed"""
+        ended = time.perf_counter_ns()
+        if not (
+                (self.keep_errors and status != 'OK')
+                or (self.slow_threshold_ns is not None and ended - started >= self.slow_threshold_ns)
+        ):
+            return
+        parent = parse_traceparent(request.get_metadata(TRACEPARENT))
+        trace = Trace(
+            method,
+            trace_id=parent[0] if parent is not None else None,
+            parent_id=parent[1] if parent is not None else None,
+            started=started
+        )
+        trace.tail_sampled = True
+        trace.finish(status, ended)
+        self.exporter.export(trace)
@@ -116,6 +116,8 @@ OptionalT = Optional[T]
 
 # 字节类型
 BytesLike = Union[bytes, bytearray]
+# 缓冲区类型, memoryview 可以零拷贝地切片
+BufferLike = Union[bytes, bytearray, memoryview]
 
 
 # 协议定义
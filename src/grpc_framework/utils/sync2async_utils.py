@@ -4,6 +4,8 @@ from functools import partial
 from concurrent.futures import Executor
 from typing import Optional, Callable
 
+_GENERATOR_EXHAUSTED = object()
+
 
 class Sync2AsyncUtils:
     def __init__(
@@ -13,10 +15,14 @@ class Sync2AsyncUtils:
         self.executor = executor
         self.loop = asyncio.get_event_loop()
 
+    def bind(self, ctx: contextvars.Context, func: Callable, *args) -> Callable:
+        """the callable an executor thread runs, `func(*args)` in the context `ctx`"""
+        return partial(ctx.run, func, *args)
+
     async def run_function(self, func: Callable, *args):
         """run a bio function in event loop with context propagation"""
         ctx = contextvars.copy_context()
-        func_with_context = partial(ctx.run, func, *args)
+        func_with_context = self.bind(ctx, func, *args)
         return await self.loop.run_in_executor(self.executor, func_with_context)
 
     async def run_generate(self, gene: Callable, *args):
@@ -24,24 +30,16 @@ class Sync2AsyncUtils:
         warning: its will the performance overhead is very high if generate so many item
         """
         ctx = contextvars.copy_context()
-        
-        def gene_with_context():
-            return ctx.run(gene, *args)
+        gene_with_context = self.bind(ctx, gene, *args)
             
         sync_iter = await self.loop.run_in_executor(self.executor, gene_with_context)
-        
+        # `next` with a default, StopIteration can not be raised into a Future
+        next_with_context = self.bind(ctx, next, sync_iter, _GENERATOR_EXHAUSTED)
+
         while True:
-            try:
-                # We also need to run `next` in context, although usually the generator
-                # state retains the context, but run_in_executor switches threads.
-                # However, ctx.run(gene) executes the generator function which RETURNS a generator object.
-                # The code inside the generator (up to yield) runs inside ctx.run.
-                # BUT, subsequent `next(sync_iter)` calls will execute the code AFTER the yield.
-                # If we just call `next(sync_iter)` in the executor, it runs in a bare thread.
-                # We must wrap `next` with the SAME context to ensure continuity.
-                
-                next_with_context = partial(ctx.run, next, sync_iter)
-                item = await self.loop.run_in_executor(self.executor, next_with_context)
-                yield item
-            except (StopIteration, RuntimeError):
+            # The code after each yield runs in the executor thread, it must run in the
+            # SAME context to ensure continuity.
+            item = await self.loop.run_in_executor(self.executor, next_with_context)
+            if item is _GENERATOR_EXHAUSTED:
                 break
+            yield item
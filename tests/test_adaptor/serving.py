@@ -0,0 +1,36 @@
+import time
+import asyncio
+import threading
+import grpc
+from src.grpc_framework import GRPCFramework
+
+
+class Serving:
+    """serve `app` from a worker thread for the duration of a `with` block"""
+
+    def __init__(self, app: GRPCFramework):
+        self.app = app
+        self.thread = threading.Thread(target=app._run_single_worker, daemon=True)
+        self.channel = None
+
+    def __enter__(self) -> 'Serving':
+        self.thread.start()
+        self.channel = grpc.insecure_channel(f'{self.app.config.host}:{self.app.config.port}')
+        grpc.channel_ready_future(self.channel).result(timeout=10)
+        return self
+
+    def __exit__(self, *exc):
+        self.channel.close()
+        # wait for the server to be built, the channel may be ready before `_server_start` returns
+        deadline = time.monotonic() + 10
+        while self.app._server is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        asyncio.run_coroutine_threadsafe(self.app._server.stop(None), self.app.loop).result(timeout=10)
+        self.thread.join(timeout=10)
+        # a server released after the interpreter started finalizing reports errors of its closed loop
+        self.app._server = None
+
+    def call(self, method: str, request: bytes, service: str = 'RootService', metadata=None) -> bytes:
+        return self.channel.unary_unary(f'/{self.app.config.package}.{service}/{method}')(
+            request, metadata=metadata, timeout=10
+        )
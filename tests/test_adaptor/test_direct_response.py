@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+from src.grpc_framework import GRPCFramework, GRPCFrameworkConfig, Response
+from src.grpc_framework.utils import AsyncReactiveContext
+from tests.test_adaptor.serving import Serving
+
+
+class TestDirectResponse(unittest.TestCase):
+    def setUp(self):
+        self.app = GRPCFramework(GRPCFrameworkConfig(package='direct', host='127.0.0.1', port=50078))
+        self.logged = []
+
+        @self.app.unary_unary
+        async def echo(data: bytes):
+            return data
+
+        @self.app.unary_unary
+        def sync_echo(data: bytes):
+            return data
+
+        # the built-in request logger must not count as an after request hook
+        self.app._log_request = self.logged.append
+
+    def test_select(self):
+        adaptor = self.app._adaptor
+        plan = adaptor.compile_plan(self.app._services['RootService']['echo'])
+        assert adaptor.select_unary_response(plan) == adaptor.direct_unary_response
+        plan = adaptor.compile_plan(self.app._services['RootService']['sync_echo'])
+        assert adaptor.select_unary_response(plan) == adaptor.unary_response
+
+    def test_without_hooks(self):
+        with mock.patch.object(AsyncReactiveContext, 'send', autospec=True) as send:
+            with Serving(self.app) as serving:
+                assert not self.app._request_context_manager.has_after_request_handlers
+                assert serving.call('echo', b'ping') == b'ping'
+                assert serving.call('sync_echo', b'pong') == b'pong'
+        # responses skip the hooks and are still logged
+        assert not send.called
+        print(self.logged)
+        assert [response.content for response in self.logged] == [b'ping', b'pong']
+
+    def test_with_hooks(self):
+        responses = []
+
+        @self.app.after_request
+        async def after(response: Response):
+            responses.append(response)
+
+        with Serving(self.app) as serving:
+            assert serving.call('echo', b'ping') == b'ping'
+        print(responses)
+        assert [response.content for response in responses] == [b'ping']
+        # the hooks receive the response returned by the handler, logged after them
+        assert self.logged == responses
@@ -0,0 +1,93 @@
+import unittest
+from dataclasses import dataclass
+from src.grpc_framework import GRPCFramework, GRPCFrameworkConfig, Service, unary_unary, Depends
+from src.grpc_framework.core.enums import HandlerType
+from tests.test_adaptor.serving import Serving
+
+
+def get_db():
+    return 'db'
+
+
+@dataclass
+class User:
+    id: int
+
+
+class UserService(Service):
+    db: Depends[get_db]
+
+    @unary_unary
+    async def get_user(self, user: User):
+        return user
+
+
+class TestInvocationPlan(unittest.TestCase):
+    def setUp(self):
+        self.app = GRPCFramework(GRPCFrameworkConfig(package='plan'))
+
+        @self.app.unary_unary
+        def sync_handler(user: User, db: str = Depends(get_db)):
+            return user
+
+        @self.app.unary_stream
+        async def no_depends(user: User):
+            yield user
+
+        self.app.add_service(UserService)
+
+    def test_fbv_plan(self):
+        plan = self.app._adaptor.compile_plan(self.app._services['RootService']['sync_handler'])
+        print(plan)
+        assert plan.handler_type is HandlerType.function
+        assert plan.service_class is None
+        assert [arg.name for arg in plan.arguments] == ['user', 'db']
+        assert plan.arguments[0].dependency is None
+        assert plan.arguments[1].dependency.dependency is get_db
+        assert plan.need_dependency
+
+    def test_plan_without_depends(self):
+        plan = self.app._adaptor.compile_plan(self.app._services['RootService']['no_depends'])
+        assert plan.handler_type is HandlerType.async_generator
+        assert not plan.need_dependency
+
+    def test_cbv_plan(self):
+        plan = self.app._adaptor.compile_plan(self.app._services['UserService']['get_user'])
+        assert plan.handler_type is HandlerType.coroutine
+        assert plan.service_class is UserService
+        assert [arg.name for arg in plan.arguments] == ['user']
+        assert [name for name, _ in plan.service_dependencies] == ['db']
+        assert plan.need_dependency
+
+
+def get_answer():
+    return 42
+
+
+class TestKeywordOnlyArguments(unittest.TestCase):
+    def setUp(self):
+        self.app = GRPCFramework(GRPCFrameworkConfig(package='plan', host='127.0.0.1', port=50077))
+
+        @self.app.unary_unary
+        async def answer(*, value: int = Depends(get_answer)):
+            return str(value).encode()
+
+        @self.app.unary_unary
+        def sync_answer(data: bytes, *, value: int = Depends(get_answer)):
+            return data + str(value).encode()
+
+        @self.app.unary_stream
+        async def stream_answer(*, data: bytes, value: int = Depends(get_answer)):
+            yield data + str(value).encode()
+
+    def test_plan(self):
+        plan = self.app._adaptor.compile_plan(self.app._services['RootService']['sync_answer'])
+        print(plan.arguments)
+        assert [(arg.name, arg.keyword) for arg in plan.arguments] == [('data', False), ('value', True)]
+
+    def test_call(self):
+        with Serving(self.app) as serving:
+            assert serving.call('answer', b'') == b'42'
+            assert serving.call('sync_answer', b'x') == b'x42'
+            responses = serving.channel.unary_stream('/plan.RootService/stream_answer')(b'y', timeout=10)
+            assert list(responses) == [b'y42']
@@ -0,0 +1,106 @@
+import json
+import asyncio
+import unittest
+import tests.test_serializtion.test_pb2 as test_pb2
+from src.grpc_framework import GRPCFramework, GRPCFrameworkConfig, StreamRequest, JSONCodec, JsonProtobufConverter
+from src.grpc_framework.core import ReusableStreamRequest
+from src.grpc_framework.core.request.request import Request
+from src.grpc_framework.core.serialization import MessagePool
+from src.grpc_framework.types import T
+from tests.test_adaptor.serving import Serving
+
+
+class WindowStreamRequest(ReusableStreamRequest[T]):
+    pool_size = 4
+
+
+class TestMessagePool(unittest.TestCase):
+    def setUp(self):
+        self.app = GRPCFramework(GRPCFrameworkConfig(package='pool'))
+
+        @self.app.stream_unary
+        async def ingest(users: ReusableStreamRequest[test_pb2.UserTest]):
+            return test_pb2.UserTest()
+
+        @self.app.stream_unary
+        async def window(users: WindowStreamRequest[test_pb2.UserTest]):
+            return test_pb2.UserTest()
+
+        @self.app.stream_unary
+        async def plain(users: StreamRequest[test_pb2.UserTest]):
+            return test_pb2.UserTest()
+
+    def plan(self, name):
+        return self.app._adaptor.compile_plan(self.app._services['RootService'][name])
+
+    def test_plan(self):
+        plan = self.plan('ingest')
+        print(plan.pooled_streams)
+        assert plan.pooled_streams == {'users': ReusableStreamRequest}
+        # the request must reach the pool undecoded
+        assert plan.native_request_type is None and plan.raw_types == {}
+        assert self.plan('window').pooled_streams == {'users': WindowStreamRequest}
+        assert self.plan('plain').pooled_streams == {}
+
+    def test_only_binary_protobuf(self):
+        app = GRPCFramework(GRPCFrameworkConfig(package='pool', codec=JSONCodec, converter=JsonProtobufConverter))
+
+        @app.stream_unary
+        async def ingest(users: ReusableStreamRequest[test_pb2.UserTest]):
+            return test_pb2.UserTest()
+
+        plan = app._adaptor.compile_plan(app._services['RootService']['ingest'])
+        assert plan.pooled_streams == {}
+
+    def test_retain_without_pool(self):
+        app = GRPCFramework(GRPCFrameworkConfig(
+            package='pool', host='127.0.0.1', port=50081, codec=JSONCodec, converter=JsonProtobufConverter
+        ))
+        streams = []
+
+        @app.stream_unary
+        async def window(users: WindowStreamRequest[test_pb2.UserTest]):
+            streams.append(users)
+            kept = [users.retain(user) async for user in users]
+            return test_pb2.UserTest(name=','.join(user.name for user in kept), id=len(kept))
+
+        with Serving(app) as serving:
+            upload = serving.channel.stream_unary('/pool.RootService/window')
+            response = upload(iter([json.dumps({'name': name}).encode() for name in 'abc']), timeout=10)
+        print(response)
+        # the declared class is built even though nothing is pooled, `retain` keeps the items as they are
+        assert type(streams[0]) is WindowStreamRequest and not streams[0].pooled
+        assert json.loads(response) == {'name': 'a,b,c', 'id': 3}
+
+    def test_pool_ring(self):
+        pool = MessagePool(test_pb2.UserTest, 2)
+        a = pool.parse(test_pb2.UserTest(name='a', id=1).SerializeToString())
+        kept = pool.retain(a)
+        b = pool.parse(test_pb2.UserTest(name='b').SerializeToString())
+        assert a is not b and a.name == 'a'
+        c = pool.parse(test_pb2.UserTest(id=3).SerializeToString())
+        # the first message is reused and fully cleared
+        assert c is a and c == test_pb2.UserTest(id=3)
+        assert kept == test_pb2.UserTest(name='a', id=1)
+        with self.assertRaises(ValueError):
+            MessagePool(test_pb2.UserTest, 0)
+
+    def test_stream_reuses_messages(self):
+        async def frames():
+            for i in range(3):
+                yield test_pb2.UserTest(name=f'u{i}', id=i).SerializeToString()
+
+        async def consume():
+            request = Request.__new__(Request)
+            request.request_bytes = frames()
+            pool = MessagePool(test_pb2.UserTest)
+            stream = ReusableStreamRequest(request, pool.parse)
+            items, kept = [], []
+            async for user in stream:
+                items.append(user)
+                kept.append(stream.retain(user))
+            return items, kept
+
+        items, kept = asyncio.run(consume())
+        assert items[0] is items[1] is items[2]
+        assert [user.id for user in kept] == [0, 1, 2]
@@ -0,0 +1,77 @@
+import unittest
+import grpc
+import tests.test_serializtion.test_pb2 as test_pb2
+from src.grpc_framework import (
+    GRPCFramework, GRPCFrameworkConfig, StreamRequest, Serializer,
+    JSONCodec, JsonProtobufConverter
+)
+from src.grpc_framework.core.adaptor import GRPCAdaptor, RequestAdaptor
+from tests.test_adaptor.serving import Serving
+
+
+class TestNativeProtobuf(unittest.TestCase):
+    def setUp(self):
+        self.app = GRPCFramework(GRPCFrameworkConfig(package='native', host='127.0.0.1', port=50079))
+
+        @self.app.unary_unary
+        async def get_user(user: test_pb2.UserTest):
+            return user
+
+        @self.app.stream_unary
+        async def upload_users(users: StreamRequest[test_pb2.UserTest]):
+            async for _ in users:
+                pass
+            return test_pb2.UserTest()
+
+        @self.app.unary_unary
+        async def relay(data: bytes):
+            return data
+
+    def plan(self, name):
+        return self.app._adaptor.compile_plan(self.app._services['RootService'][name])
+
+    def test_plan(self):
+        plan = self.plan('get_user')
+        print(plan.native_request_type, plan.native_response)
+        assert plan.native_request_type is test_pb2.UserTest
+        assert plan.native_response
+        assert plan.raw_types == {'user': test_pb2.UserTest}
+        plan = self.plan('upload_users')
+        assert plan.native_request_type is test_pb2.UserTest
+        assert plan.raw_types == {'users': test_pb2.UserTest}
+        # raw buffers are already left alone by grpc
+        plan = self.plan('relay')
+        assert plan.native_request_type is None
+        assert plan.raw_types == {'data': bytes}
+
+    def test_other_serializers(self):
+        assert not GRPCAdaptor.is_native_protobuf(Serializer(JSONCodec, JsonProtobufConverter))
+
+    def test_passthrough(self):
+        message = test_pb2.UserTest(name='Jack', id=1)
+        assert RequestAdaptor.raw_request(message, raw_type=test_pb2.UserTest) is message
+        assert GRPCAdaptor.serialize_native_response(message) == message.SerializeToString()
+        assert GRPCAdaptor.serialize_native_response(b'') == b''
+
+    def test_undecodable_request(self):
+        responses = []
+        self.app.after_request(responses.append)
+        # not valid utf-8 for `UserTest.name`
+        data = b'\x0a\x02\xff\xfe'
+        deserialize = GRPCAdaptor.native_request_deserializer(test_pb2.UserTest)
+        with self.assertRaises(Exception):
+            RequestAdaptor.raw_request(deserialize(data), raw_type=test_pb2.UserTest)
+        with Serving(self.app) as serving:
+            message = test_pb2.UserTest(name='Jack', id=1)
+            assert serving.call('get_user', message.SerializeToString()) == message.SerializeToString()
+            with self.assertRaises(grpc.RpcError) as e:
+                serving.call('get_user', data)
+            assert e.exception.code() is grpc.StatusCode.INVALID_ARGUMENT
+            upload = serving.channel.stream_unary('/native.RootService/upload_users')
+            with self.assertRaises(grpc.RpcError) as e:
+                upload(iter([message.SerializeToString(), data]), timeout=10)
+            assert e.exception.code() is grpc.StatusCode.INVALID_ARGUMENT
+        # the error went through the framework, the hooks saw it
+        assert [response.status_code for response in responses] == [
+            grpc.StatusCode.OK, grpc.StatusCode.INVALID_ARGUMENT, grpc.StatusCode.INVALID_ARGUMENT
+        ]
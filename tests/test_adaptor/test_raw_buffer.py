@@ -0,0 +1,60 @@
+import unittest
+from dataclasses import dataclass
+from typing import Optional
+import tests.test_serializtion.test_pb2 as test_pb2
+from src.grpc_framework import (
+    GRPCFramework, GRPCFrameworkConfig, StreamRequest, Serializer,
+    JSONCodec, ORJSONCodec, DataclassesCodec, ProtobufCodec, MsgPackCodec,
+    DataclassesConverter, ProtobufConverter
+)
+from src.grpc_framework.core.adaptor import RequestAdaptor
+from src.grpc_framework.core.serialization.buffer import buffer_to_bytes
+
+
+@dataclass
+class User:
+    id: int
+
+
+class TestRawBuffer(unittest.TestCase):
+    def setUp(self):
+        self.app = GRPCFramework(GRPCFrameworkConfig(package='raw'))
+
+        @self.app.unary_unary
+        async def relay(data: bytes, view: Optional[memoryview], user: User):
+            return data
+
+        @self.app.stream_unary
+        async def relay_stream(chunks: StreamRequest[memoryview]):
+            return b''
+
+    def test_plan_raw_types(self):
+        plan = self.app._adaptor.compile_plan(self.app._services['RootService']['relay'])
+        print(plan.raw_types)
+        assert plan.raw_types == {'data': bytes, 'view': memoryview}
+        plan = self.app._adaptor.compile_plan(self.app._services['RootService']['relay_stream'])
+        assert plan.raw_types == {'chunks': memoryview}
+
+    def test_raw_request(self):
+        data = b'\x00payload'
+        assert RequestAdaptor.raw_request(data) is data
+        view = RequestAdaptor.raw_request(data, raw_type=memoryview)
+        assert isinstance(view, memoryview) and view.obj is data
+
+    def test_buffer_to_bytes(self):
+        data = b'\x00payload'
+        assert buffer_to_bytes(memoryview(data)) is data
+        assert buffer_to_bytes(memoryview(data)[1:]) == b'payload'
+        assert buffer_to_bytes(data) is data
+
+    def test_codecs_accept_memoryview(self):
+        frame = b'xx{"id":1}'
+        for codec in (JSONCodec, ORJSONCodec, DataclassesCodec):
+            s = Serializer(codec, DataclassesConverter)
+            assert s.deserialize(memoryview(frame)[2:], User) == User(id=1)
+            assert codec().decode(memoryview(frame)[2:], into=User) == {'id': 1}
+        s = Serializer(MsgPackCodec, DataclassesConverter)
+        assert s.deserialize(memoryview(b'xx' + s.serialize(User(id=1)))[2:], User) == User(id=1)
+        message = test_pb2.UserTest(name='Jack', id=1)
+        s = Serializer(ProtobufCodec, ProtobufConverter)
+        assert s.deserialize(memoryview(b'xx' + s.serialize(message))[2:], test_pb2.UserTest) == message
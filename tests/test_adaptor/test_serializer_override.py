@@ -0,0 +1,100 @@
+import json
+import unittest
+from dataclasses import dataclass
+from typing import Union
+import tests.test_serializtion.test_pb2 as test_pb2
+from src.grpc_framework import (
+    GRPCFramework, GRPCFrameworkConfig, Service, Serializer, unary_unary,
+    JSONCodec, MsgPackCodec, ProtobufCodec, DataclassesConverter, ProtobufConverter
+)
+from tests.test_adaptor.serving import Serving
+
+JSON_SERIALIZER = Serializer(JSONCodec, DataclassesConverter)
+MSGPACK_SERIALIZER = Serializer(MsgPackCodec, DataclassesConverter)
+
+
+@dataclass
+class Item:
+    id: int
+
+
+@dataclass
+class Order:
+    order_id: int
+
+
+class PackedService(Service):
+    serializer = MSGPACK_SERIALIZER
+
+    @unary_unary
+    async def get(self, item: Item):
+        return item
+
+    @unary_unary(serializer=JSON_SERIALIZER)
+    async def get_json(self, item: Item):
+        return item
+
+
+class TestSerializerOverride(unittest.TestCase):
+    def setUp(self):
+        self.app = GRPCFramework(GRPCFrameworkConfig(package='override', host='127.0.0.1', port=50080))
+
+        @self.app.unary_unary
+        async def default(user: test_pb2.UserTest):
+            return user
+
+        @self.app.unary_unary(serializer=JSON_SERIALIZER)
+        async def legacy(item: Union[Item, Order]):
+            return item
+
+        fbv = Service('Fbv', serializer=MSGPACK_SERIALIZER)
+
+        @fbv.unary_unary
+        async def fbv_get(item: Item):
+            return item
+
+        self.app.add_service(PackedService)
+        self.app.add_service(fbv)
+
+    def plan(self, service, name):
+        return self.app._adaptor.compile_plan(self.app._services[service][name])
+
+    def test_resolution(self):
+        assert self.plan('RootService', 'default').serializer is self.app._serializer
+        assert self.plan('RootService', 'legacy').serializer is JSON_SERIALIZER
+        assert self.plan('PackedService', 'get').serializer is MSGPACK_SERIALIZER
+        assert self.plan('PackedService', 'get_json').serializer is JSON_SERIALIZER
+        assert self.plan('Fbv', 'fbv_get').serializer is MSGPACK_SERIALIZER
+
+    def test_native_protobuf_follows_endpoint_serializer(self):
+        assert self.plan('RootService', 'default').native_response
+        assert not self.plan('RootService', 'legacy').native_response
+
+    def test_negotiation(self):
+        protobuf = Serializer(ProtobufCodec, ProtobufConverter)
+        self.app.add_serializer('json', JSON_SERIALIZER)
+        self.app.add_serializer('protobuf', protobuf)
+        plan = self.plan('RootService', 'legacy')
+        print(plan.negotiated_serializers)
+        assert set(plan.negotiated_serializers) == {'json', 'protobuf'}
+        assert plan.negotiated_serializers['protobuf'].serializer is protobuf
+        # union decoders are built for every negotiable serializer
+        assert set(plan.negotiated_serializers['json'].union_decoders) == {'item'}
+        # the request format is only known at call time, grpc can not decode it
+        plan = self.plan('RootService', 'default')
+        assert not plan.native_response and plan.native_request_type is None
+
+    def test_negotiated_call(self):
+        self.app.add_serializer('json', JSON_SERIALIZER)
+        metadata_built = []
+
+        @self.app.after_request
+        def after(response):
+            # the codec is read without building the metadata dict
+            metadata_built.append(response._request._metadata is not None)
+
+        with Serving(self.app) as serving:
+            data = json.dumps({'id': 1}).encode()
+            response = serving.call('get', data, service='PackedService', metadata=[('x-grpc-codec', 'json')])
+        assert json.loads(response) == {'id': 1}
+        assert metadata_built == [False]
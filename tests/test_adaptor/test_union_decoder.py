@@ -0,0 +1,146 @@
+import unittest
+import contextvars
+import tests.test_serializtion.test_pb2 as test_pb2
+from google.protobuf import empty_pb2
+from dataclasses import dataclass
+from typing import Literal, Optional
+from src.grpc_framework import (
+    Serializer, DataclassesCodec, DataclassesConverter, ProtobufCodec, ProtobufConverter, ModelConverter,
+    JSONCodec, JsonProtobufConverter
+)
+from src.grpc_framework.core.adaptor import RequestAdaptor
+from src.grpc_framework.core.adaptor.union_decoder import UnionDecoder
+from src.grpc_framework.core.enums import Interaction
+from src.grpc_framework.core.params.utils import ParamParser
+from src.grpc_framework.core.request.request import Request
+from src.grpc_framework.exceptions import GRPCException
+
+
+@dataclass
+class Cat:
+    kind: Literal['cat']
+    name: str
+
+
+@dataclass
+class Dog:
+    kind: Literal['dog']
+    name: str
+    bark: bool = True
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+
+
+@dataclass
+class Order:
+    order_id: int
+    amount: float
+    note: Optional[str] = None
+
+
+@dataclass
+class Named:
+    id: int
+    name: Optional[str] = None
+
+
+@dataclass
+class Noted:
+    id: int
+    note: Optional[str] = None
+
+
+class MessageConverter(ModelConverter):
+    def to_model(self, transport_obj, model_type):
+        return transport_obj
+
+    def from_model(self, model):
+        return model
+
+
+class TestUnionDecoder(unittest.TestCase):
+    def setUp(self):
+        self.serializer = Serializer(DataclassesCodec, DataclassesConverter)
+
+    def test_tag_field(self):
+        decoder = UnionDecoder.build([Cat, Dog], self.serializer)
+        assert decoder.tag_field == 'kind'
+        assert decoder.decode(b'{"kind":"dog","name":"a"}') == Dog(kind='dog', name='a')
+        assert decoder.decode(b'{"kind":"cat","name":"b"}') == Cat(kind='cat', name='b')
+
+    def test_json_keys(self):
+        decoder = UnionDecoder.build([User, Order], self.serializer)
+        assert decoder.tag_field is None
+        assert decoder.decode(b'{"order_id":1,"amount":2.5}') == Order(order_id=1, amount=2.5)
+        assert decoder.decode(b'{"id":1,"name":"Jack"}') == User(id=1, name='Jack')
+        assert decoder.decode(b'[{"id":1,"name":"Jack"}]') == [User(id=1, name='Jack')]
+
+    def test_json_keys_order(self):
+        decoder = UnionDecoder.build([Named, Noted], self.serializer)
+        assert decoder.decode(b'{"id":1}') == Named(id=1)
+        assert decoder.decode(b'{"id":1,"note":"a"}') == Noted(id=1, note='a')
+        # keys fitting both still choose the first declared one, whatever the previous requests chose
+        assert decoder.decode(b'{"id":2}') == Named(id=2)
+        assert decoder._by_keys == {
+            frozenset({'id'}): decoder.candidates[0],
+            frozenset({'id', 'note'}): decoder.candidates[1]
+        }
+
+    def test_no_match(self):
+        decoder = UnionDecoder.build([User, Order], self.serializer)
+        with self.assertRaises(ValueError):
+            decoder.decode(b'{"unknown":1}')
+        decoder = UnionDecoder.build([User, bytes], self.serializer)
+        assert decoder.decode(b'\x00raw') == b'\x00raw'
+
+    def test_single_candidate(self):
+        assert UnionDecoder.build([User], self.serializer) is None
+        assert UnionDecoder.build([User, type(None)], self.serializer) is None
+
+    def test_protobuf_full_name(self):
+        serializer = Serializer(JSONCodec, JsonProtobufConverter)
+        decoder = UnionDecoder.build([test_pb2.UserTest, User], serializer)
+        data = b'{"@type":"type.googleapis.com/' + test_pb2.UserTest.DESCRIPTOR.full_name.encode() + b'","id":1}'
+        assert decoder.decode(data) == test_pb2.UserTest(id=1)
+
+    def test_protobuf_trial(self):
+        serializer = Serializer(ProtobufCodec, MessageConverter)
+        decoder = UnionDecoder.build([test_pb2.UserTest, User], serializer)
+        assert not decoder.self_describing
+        data = test_pb2.UserTest(id=1, name='Jack').SerializeToString()
+        assert decoder.decode(data) == test_pb2.UserTest(id=1, name='Jack')
+
+    def test_protobuf_trial_order(self):
+        serializer = Serializer(ProtobufCodec, ProtobufConverter)
+        decoder = UnionDecoder.build([test_pb2.UserTest, empty_pb2.Empty], serializer)
+        # not valid utf-8 for `UserTest.name`, `Empty` keeps it as an unknown field
+        decoy = b'\x0a\x02\xff\xfe'
+        assert isinstance(decoder.decode(decoy), empty_pb2.Empty)
+        data = test_pb2.UserTest(id=1, name='Jack').SerializeToString()
+        for _ in range(2):
+            print(repr(decoder.decode(data)))
+            assert decoder.decode(data) == test_pb2.UserTest(id=1, name='Jack')
+
+    def test_without_decoder(self):
+        # a single model left after `None`, no decoder is built and the members are tried in turn
+        param_info = ParamParser._parse_type(Optional[Order])
+        assert UnionDecoder.build(param_info.union_types, self.serializer) is None
+
+        def load(data: bytes):
+            request = Request()
+            request.request_bytes = data
+            adaptor = RequestAdaptor(
+                Interaction.unary, None, {'order': param_info}, request, serializer=self.serializer
+            )
+            return adaptor.unary_request('order')
+
+        assert contextvars.copy_context().run(load, b'{"order_id":1,"amount":2.5}') == Order(order_id=1, amount=2.5)
+        # a request that is none of the members is rejected, not handed over as bytes
+        with self.assertRaises(GRPCException) as e:
+            contextvars.copy_context().run(load, b'not json')
+        print(e.exception.detail)
+        assert e.exception.code.name == 'INVALID_ARGUMENT' and e.exception.__cause__ is not None
@@ -0,0 +1,123 @@
+import time
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.grpc_framework import GRPCFramework, GRPCFrameworkConfig
+from src.grpc_framework.core.metrics import (
+    MetricsRegistry, CpuAccount, CpuStats, AccountedSync2AsyncUtils, current_cpu_account, metered, render_openmetrics
+)
+
+
+def spin(seconds: float):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+    return seconds
+
+
+class TestCpuAccount(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.executor = ThreadPoolExecutor(2)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        self.loop.close()
+
+    def test_loop_and_executor(self):
+        s2a = AccountedSync2AsyncUtils(self.executor)
+        account = CpuAccount('acme')
+
+        async def call():
+            assert current_cpu_account() is account
+            spin(0.02)
+            await asyncio.sleep(0.05)
+            return await s2a.run_function(spin, 0.03)
+
+        async def main():
+            token = account.activate()
+            try:
+                return await metered(call(), account)
+            finally:
+                account.deactivate(token)
+
+        assert self.loop.run_until_complete(main()) == 0.03
+        print(account.loop_cpu, account.executor_cpu, account.wall())
+        assert 0.02 <= account.loop_cpu < 0.03
+        assert 0.03 <= account.executor_cpu < 0.04
+        assert account.wall() >= 0.1
+        assert current_cpu_account() is None
+
+    def test_metered_cancel(self):
+        account = CpuAccount()
+
+        async def main():
+            task = asyncio.ensure_future(metered(asyncio.sleep(10), account))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        self.loop.run_until_complete(main())
+
+    def test_without_account(self):
+        s2a = AccountedSync2AsyncUtils(self.executor)
+        assert self.loop.run_until_complete(s2a.run_function(spin, 0.001)) == 0.001
+
+
+class TestCpuStats(unittest.TestCase):
+    def test_tenants(self):
+        stats = CpuStats(max_tenants=2)
+        for tenant in ('a', 'b', 'c', 'a'):
+            account = CpuAccount(tenant)
+            account.loop_cpu, account.executor_cpu = 0.5, 0.25
+            stats.record('/s.Svc/m', account, 1.0)
+        snapshot = stats.snapshot()['/s.Svc/m']
+        print(snapshot)
+        assert snapshot['a'] == {'calls': 2, 'loop_cpu_seconds': 1.0, 'executor_cpu_seconds': 0.5, 'wall_seconds': 2.0}
+        assert snapshot['<other>']['calls'] == 2
+
+    def test_registry_tenants(self):
+        registry = MetricsRegistry(['/s.Svc/m'], workers=2, cpu_accounting=True, tenant_slots=3)
+        try:
+            registry.method('/s.Svc/m').observe_cpu(0.5, 0.25)
+            for worker in (0, 1):
+                registry.set_worker(worker)
+                for tenant in ('acme', 'globex', 'initech', 'umbrella'):
+                    registry.tenant(tenant).observe(0.1, 0.2, 0.5)
+            tenants = registry.read_tenants()
+            print(tenants)
+            assert set(tenants) == {'acme', 'globex', '<other>'}
+            assert tenants['acme'][0] == 2
+            assert tenants['<other>'][0] == 4
+            text = render_openmetrics(registry)
+            assert 'grpc_server_cpu_seconds_total{grpc_method="/s.Svc/m",thread="loop"} 0.5' in text
+            assert 'grpc_server_tenant_requests_total{tenant="<other>"} 4' in text
+            assert 'grpc_server_tenant_cpu_seconds_total{tenant="acme",thread="executor"} 0.4' in text
+        finally:
+            registry.close()
+
+    def test_disabled(self):
+        registry = MetricsRegistry(['/s.Svc/m'])
+        try:
+            assert registry.tenant('acme') is None
+            assert 'cpu_seconds' not in render_openmetrics(registry)
+        finally:
+            registry.close()
+
+
+class TestCpuAccountingPlan(unittest.TestCase):
+    def test_compiled_in_when_enabled(self):
+        for enabled in (False, True):
+            app = GRPCFramework(GRPCFrameworkConfig(package='cpu', cpu_accounting=enabled))
+
+            @app.unary_unary
+            async def call(data: bytes):
+                return data
+
+            handler = app._adaptor.wrap_unary_unary_handler(
+                app._adaptor.compile_plan(app._services['RootService']['call'], route=('cpu', 'RootService', 'call'))
+            )
+            assert (handler.__name__ == 'accounted') is enabled
+            assert (app.cpu_stats is not None) is enabled
@@ -0,0 +1,96 @@
+import time
+import logging
+import contextvars
+import unittest
+from concurrent.futures import wait
+from src.grpc_framework import GRPCFrameworkConfig
+from src.grpc_framework.core.metrics import InstrumentedExecutor, MetricsRegistry, render_openmetrics
+from src.grpc_framework.core.metrics.registry import EXECUTOR_SUBMITTED, EXECUTOR_QUEUED, EXECUTOR_RUNNING, EXECUTOR_WAIT
+from src.grpc_framework.core.request.request import Request
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestInstrumentedExecutor(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('test_executor')
+        self.handler = ListHandler()
+        self.logger.addHandler(self.handler)
+        self.executor = InstrumentedExecutor(max_workers=1, wait_threshold=0.05, logger=self.logger)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        self.logger.removeHandler(self.handler)
+
+    def test_saturation(self):
+        def submit():
+            Request(full_method='/s.Svc/slow')
+            return [handler.submit(time.sleep, 0.1) for _ in range(3)]
+
+        handler = self.executor.labeled('handler')
+        futures = contextvars.copy_context().run(submit)
+        time.sleep(0.02)
+        assert self.executor.running_methods() == {'/s.Svc/slow': 1}
+        assert self.executor.queued_methods() == {'/s.Svc/slow': 2}
+        wait(futures)
+        stats = self.executor.stats.read()
+        ints, wait_sum = stats['handler']
+        print(ints, wait_sum, self.handler.messages)
+        assert ints[EXECUTOR_SUBMITTED] == 3
+        assert ints[EXECUTOR_QUEUED] == 0 and ints[EXECUTOR_RUNNING] == 0
+        assert sum(ints[EXECUTOR_WAIT:]) == 3
+        assert wait_sum >= 0.25
+        assert stats['other'][0][EXECUTOR_SUBMITTED] == 0
+        # one warning per interval
+        assert len(self.handler.messages) == 1
+        assert '`handler` call of `/s.Svc/slow`' in self.handler.messages[0]
+        assert '1 of 1 threads busy with: /s.Svc/slow x1' in self.handler.messages[0]
+
+    def test_cancel_queued(self):
+        blocking = self.executor.submit(time.sleep, 0.1)
+        queued = self.executor.labeled('hook').submit(time.sleep, 0.1)
+        assert queued.cancel()
+        wait([blocking])
+        stats = self.executor.stats.read()
+        assert stats['hook'][0][EXECUTOR_QUEUED] == 0
+        assert stats['other'][0][EXECUTOR_SUBMITTED] == 1
+        assert self.executor.queued_methods() == {}
+
+    def test_unknown_subsystem(self):
+        with self.assertRaises(ValueError):
+            self.executor.labeled('nothing')
+
+
+class TestExecutorMetrics(unittest.TestCase):
+    def test_registry_rows(self):
+        registry = MetricsRegistry(['/s.Svc/m'], workers=2, executor_metrics=True)
+        executor = InstrumentedExecutor(max_workers=2, stats=registry.executor_stats(1))
+        try:
+            executor.labeled('dependency').submit(time.sleep, 0).result()
+            assert registry.executor_stats(1).read()['dependency'][0][EXECUTOR_SUBMITTED] == 1
+            text = render_openmetrics(registry)
+            print(text[text.index('# TYPE grpc_server_executor_submitted'):])
+            assert 'grpc_server_executor_submitted_total{subsystem="dependency",worker="1"} 1' in text
+            assert 'grpc_server_executor_submitted_total{subsystem="dependency",worker="0"} 0' in text
+            assert 'grpc_server_executor_queue_wait_seconds_count{subsystem="dependency"} 1' in text
+            assert 'subsystem="handler"' not in text
+        finally:
+            executor.shutdown()
+            registry.close()
+        registry = MetricsRegistry(['/s.Svc/m'])
+        try:
+            assert registry.executor_stats() is None
+            assert 'executor' not in render_openmetrics(registry)
+        finally:
+            registry.close()
+
+    def test_config(self):
+        with self.assertRaises(ValueError):
+            GRPCFrameworkConfig(package='executor', executor_metrics=True, executor_type='process')
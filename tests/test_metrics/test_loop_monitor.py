@@ -0,0 +1,70 @@
+import time
+import asyncio
+import unittest
+from src.grpc_framework import GRPCFrameworkConfig
+from src.grpc_framework.core.metrics import LoopLagHistogram, LoopLagMonitor, MetricsRegistry, render_openmetrics
+from src.grpc_framework.core.metrics.registry import LAG_STALLS
+
+
+class TestLoopLagMonitor(unittest.TestCase):
+    def test_lag_and_stall(self):
+        async def blocking():
+            monitor.tag_task('/s.Svc/block')
+            time.sleep(0.3)
+
+        async def main():
+            monitor.start()
+            await asyncio.sleep(0.2)
+            await asyncio.get_running_loop().create_task(blocking())
+            await asyncio.sleep(0.1)
+            monitor.stop()
+
+        loop = asyncio.new_event_loop()
+        monitor = LoopLagMonitor(loop, interval=0.02, stall_threshold=0.1)
+        try:
+            loop.run_until_complete(main())
+        finally:
+            loop.close()
+        counts, lag_sum = monitor.histogram.read()
+        print(counts, lag_sum, [(stall['method'], stall['blocked_seconds']) for stall in monitor.stalls])
+        assert sum(counts[:LAG_STALLS]) >= 5
+        assert lag_sum >= 0.2
+        assert counts[LAG_STALLS] == 1
+        stall = monitor.stalls[0]
+        assert stall['method'] == '/s.Svc/block'
+        assert any('blocking' in line for line in stall['stack'])
+
+    def test_registry_rows(self):
+        registry = MetricsRegistry(['/s.Svc/m'], workers=2, loop_monitor=True)
+        try:
+            registry.set_worker(1)
+            histogram = registry.loop_lag()
+            histogram.observe(0.003)
+            histogram.stall()
+            assert registry.loop_lag(1).read() == histogram.read()
+            assert sum(registry.loop_lag(0).read()[0]) == 0
+            text = render_openmetrics(registry)
+            print(text)
+            assert 'grpc_server_loop_lag_seconds_count{worker="1"} 1' in text
+            assert 'grpc_server_loop_stalls_total{worker="1"} 1' in text
+            assert 'grpc_server_loop_stalls_total{worker="0"} 0' in text
+        finally:
+            registry.close()
+        # only exported when the monitor records them
+        registry = MetricsRegistry(['/s.Svc/m'])
+        try:
+            assert 'grpc_server_loop' not in render_openmetrics(registry)
+        finally:
+            registry.close()
+
+    def test_in_process_histogram(self):
+        histogram = LoopLagHistogram()
+        histogram.observe(0.0)
+        histogram.observe(100.0)
+        counts, lag_sum = histogram.read()
+        assert counts[0] == 1 and counts[LAG_STALLS - 1] == 1
+        assert lag_sum == 100.0
+
+    def test_config(self):
+        with self.assertRaises(ValueError):
+            GRPCFrameworkConfig(package='lag', loop_monitor=True, loop_stall_threshold=0)
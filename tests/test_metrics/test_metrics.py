@@ -0,0 +1,160 @@
+import os
+import time
+import pickle
+import asyncio
+import tempfile
+import threading
+import unittest
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import grpc
+from src.grpc_framework import GRPCFramework, GRPCFrameworkConfig
+from src.grpc_framework.core.metrics import MetricsRegistry, render_openmetrics, LATENCY_BUCKETS
+from src.grpc_framework.core.metrics.registry import REQUESTS, IN_FLIGHT, CODES, RESPONSE_SIZE, STATUS_CODES
+
+
+def record_in_worker(registry: MetricsRegistry, worker_index: int):
+    registry.set_worker(worker_index)
+    metrics = registry.method('/m.Svc/call')
+    for _ in range(3):
+        metrics.start()
+        metrics.finish(time.perf_counter(), grpc.StatusCode.NOT_FOUND)
+    registry.close()
+
+
+class FakeContext:
+    def __init__(self, code=None):
+        self._code = code
+
+    def code(self):
+        return self._code
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry(['/m.Svc/call', '/m.Svc/other'], workers=2)
+
+    def tearDown(self):
+        self.registry.close()
+
+    def test_record(self):
+        metrics = self.registry.method('/m.Svc/call')
+        assert self.registry.method('/m.Svc/unknown') is None
+        metrics.start()
+        metrics.observe_request(b'x' * 100)
+        metrics.observe_response(b'x' * 10)
+        metrics.finish(time.perf_counter() - 0.003, None)
+        ints, floats = self.registry.read()['/m.Svc/call'][0]
+        print(ints[:4], floats)
+        assert ints[REQUESTS] == 1 and ints[IN_FLIGHT] == 0
+        assert ints[CODES + STATUS_CODES.index(grpc.StatusCode.OK)] == 1
+        assert ints[RESPONSE_SIZE] == 1
+        assert floats == [floats[0], 100.0, 10.0, 0.0, 0.0] and floats[0] >= 0.003
+        assert self.registry.read()['/m.Svc/call'][1][0][REQUESTS] == 0
+
+    def test_workers_share_block(self):
+        process = multiprocessing.get_context('spawn').Process(target=record_in_worker, args=(self.registry, 1))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        rows = self.registry.read()['/m.Svc/call']
+        assert rows[0][0][REQUESTS] == 0
+        assert rows[1][0][REQUESTS] == 3
+        assert rows[1][0][CODES + STATUS_CODES.index(grpc.StatusCode.NOT_FOUND)] == 3
+
+    def test_pickle_keeps_block(self):
+        attached = pickle.loads(pickle.dumps(self.registry))
+        attached.set_worker(1)
+        attached.method('/m.Svc/other').start()
+        attached.close()
+        assert self.registry.read()['/m.Svc/other'][1][0][REQUESTS] == 1
+        self.assertRaises(ValueError, self.registry.set_worker, 2)
+
+    def test_render(self):
+        metrics = self.registry.method('/m.Svc/call')
+        metrics.start()
+        metrics.finish(time.perf_counter(), grpc.StatusCode.OK)
+        self.registry.set_worker(1)
+        self.registry.method('/m.Svc/call').start()
+        text = render_openmetrics(self.registry)
+        print(text)
+        assert 'grpc_server_started_total{grpc_method="/m.Svc/call",worker="0"} 1' in text
+        assert 'grpc_server_started_total{grpc_method="/m.Svc/call",worker="1"} 1' in text
+        assert 'grpc_server_in_flight{grpc_method="/m.Svc/call",worker="1"} 1' in text
+        assert 'grpc_server_handled_total{grpc_method="/m.Svc/call",grpc_code="OK"} 1' in text
+        assert 'grpc_server_handling_seconds_bucket{grpc_method="/m.Svc/call",le="+Inf"} 1' in text
+        assert len([line for line in text.splitlines() if 'handling_seconds_bucket' in line]) == \
+               2 * (len(LATENCY_BUCKETS) + 1)
+        assert text.endswith('# EOF\n')
+
+
+class TestMetricsInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.app = GRPCFramework(GRPCFrameworkConfig(package='m', metrics=True))
+
+        @self.app.unary_unary
+        async def call(data: bytes):
+            return data
+
+    def test_plan(self):
+        route = self.app._services['RootService']['call']
+        assert self.app._adaptor.compile_plan(route).metrics is None
+        self.app.metrics = MetricsRegistry(self.app._full_method_names())
+        try:
+            plan = self.app._adaptor.compile_plan(route, route=('m', 'RootService', 'call'))
+            assert plan.metrics is not None and plan.metrics.method == '/m.RootService/call'
+
+            async def handler(request, context):
+                return b'pong'
+
+            wrapper = self.app._adaptor.instrument_unary_response(plan, handler)
+            assert asyncio.run(wrapper(b'ping', FakeContext())) == b'pong'
+            asyncio.run(wrapper(b'ping', FakeContext(grpc.StatusCode.INVALID_ARGUMENT)))
+            ints, floats = self.app.metrics.read()['/m.RootService/call'][0]
+            assert ints[REQUESTS] == 2 and ints[IN_FLIGHT] == 0
+            assert ints[CODES + STATUS_CODES.index(grpc.StatusCode.INVALID_ARGUMENT)] == 1
+            assert floats[1:3] == [8.0, 4.0]
+        finally:
+            self.app.metrics.close()
+
+    def test_metrics_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.txt')
+            app = GRPCFramework(GRPCFrameworkConfig(
+                package='m', metrics=True, metrics_file=path, metrics_interval=0.01
+            ))
+            app.metrics = MetricsRegistry(app._full_method_names())
+            app.executor = ThreadPoolExecutor(1, thread_name_prefix='metrics-test')
+            threads = []
+            snapshot = app.metrics_snapshot
+
+            def metrics_snapshot():
+                threads.append(threading.current_thread().name)
+                return snapshot()
+
+            app.metrics_snapshot = metrics_snapshot
+
+            async def run():
+                app.loop = asyncio.get_running_loop()
+                await app._start_metrics(app)
+                await asyncio.sleep(0.1)
+                task = app._metrics_file_task
+                await app._stop_metrics(app)
+                return task
+
+            try:
+                task = asyncio.run(run())
+            finally:
+                app.metrics.close()
+                app.executor.shutdown()
+            print(threads)
+            # written off the event loop, the writer is gone after shutdown
+            assert threads and all(name.startswith('metrics-test') for name in threads)
+            assert task.cancelled() and app._metrics_file_task is None
+            with open(path, encoding='utf-8') as f:
+                assert f.read().endswith('# EOF\n')
+
+    def test_config(self):
+        self.assertRaises(ValueError, GRPCFrameworkConfig, package='m', metrics_service=True)
+        self.assertRaises(ValueError, GRPCFrameworkConfig, package='m', metrics_file='metrics.txt')
+        self.assertRaises(ValueError, GRPCFrameworkConfig, package='m', metrics=True, metrics_interval=0)
@@ -0,0 +1,94 @@
+import time
+import unittest
+from src.grpc_framework import GRPCFramework, GRPCFrameworkConfig
+from src.grpc_framework.core.adaptor.request_adaptor import RequestAdaptor, TimedRequestAdaptor
+from src.grpc_framework.core.adaptor.response_adaptor import ResponseAdaptor, TimedResponseAdaptor
+from src.grpc_framework.core.interceptors import RequestContextInterceptor, TimedRequestContextInterceptor
+from src.grpc_framework.core.metrics import STAGES, StageTimer, StageRecorder, StageStats
+
+
+class ListRecorder(StageRecorder):
+    def __init__(self):
+        self.records = []
+
+    def record(self, method, durations):
+        self.records.append((method, durations))
+
+
+class TestStageTimer(unittest.TestCase):
+    def test_lap_excludes_nested(self):
+        timer = StageTimer()
+        started = time.perf_counter_ns()
+        time.sleep(0.01)
+        timer.add('deserialize', started)
+        timer.lap('dependencies')
+        durations = timer.durations
+        print(durations)
+        assert durations['deserialize'] >= 10 ** 7
+        assert durations['dependencies'] < durations['deserialize']
+        time.sleep(0.005)
+        timer.skip()
+        timer.lap('handler')
+        assert durations['handler'] < 5 * 10 ** 6
+        assert list(durations) == list(STAGES)
+
+    def test_server_timing(self):
+        timer = StageTimer()
+        timer.durations['handler'] = 1500000
+        timer.durations['serialize'] = 20000
+        assert timer.server_timing() == 'handler;dur=1.500, serialize;dur=0.020'
+
+    def test_stats(self):
+        stats = StageStats()
+        stats.record('/s.Svc/m', dict.fromkeys(STAGES, 2000000))
+        stats.record('/s.Svc/m', dict.fromkeys(STAGES, 4000000))
+        snapshot = stats.snapshot()['/s.Svc/m']
+        assert snapshot['calls'] == 2
+        assert snapshot['stages']['handler'] == {'mean_ms': 3.0, 'max_ms': 4.0, 'total_ms': 6.0}
+        stats.reset()
+        assert stats.snapshot() == {}
+
+
+class TestStageTimingPlan(unittest.TestCase):
+    def make_app(self, **kwargs):
+        app = GRPCFramework(GRPCFrameworkConfig(package='stages', **kwargs))
+
+        @app.unary_unary
+        async def call(data: bytes):
+            return data
+
+        return app
+
+    def test_disabled(self):
+        app = self.make_app()
+        assert type(app._server_interceptors[0]) is RequestContextInterceptor
+        assert app.stage_stats is None
+        self.assertRaises(RuntimeError, app.add_stage_recorder, ListRecorder())
+        plan = app._adaptor.compile_plan(app._services['RootService']['call'])
+        assert not plan.stage_timing and plan.request_adaptor_type is RequestAdaptor
+        assert plan.response_adaptor_type is ResponseAdaptor
+        # the untimed call path is used as it is
+        assert app._adaptor.select_dispatch(plan) == app.dispatch
+        assert app._adaptor.select_unary_response(plan) == app._adaptor.direct_unary_response
+        assert app._adaptor.select_stream_response(plan) == app._adaptor.stream_response
+        wrapper = object()
+        assert app._adaptor.instrument_unary_stages(plan, wrapper) is wrapper
+        assert app._adaptor.instrument_stream_stages(plan, wrapper) is wrapper
+
+    def test_enabled(self):
+        app = self.make_app(stage_timing=True, server_timing=True)
+        assert type(app._server_interceptors[0]) is TimedRequestContextInterceptor
+        recorder = ListRecorder()
+        app.add_stage_recorder(recorder)
+        assert app.stage_recorders == [app.stage_stats, recorder]
+        plan = app._adaptor.compile_plan(
+            app._services['RootService']['call'], route=('stages', 'RootService', 'call')
+        )
+        assert plan.stage_timing and plan.request_adaptor_type is TimedRequestAdaptor
+        assert plan.response_adaptor_type is TimedResponseAdaptor
+        assert app._adaptor.select_dispatch(plan) == app._adaptor.timed_dispatch
+        assert app._adaptor.select_unary_response(plan) == app._adaptor.unary_response
+        assert app._adaptor.full_method_name(plan) == '/stages.RootService/call'
+
+    def test_config(self):
+        self.assertRaises(ValueError, GRPCFrameworkConfig, package='stages', server_timing=True)
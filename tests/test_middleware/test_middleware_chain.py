@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+from src.grpc_framework import GRPCFramework, GRPCFrameworkConfig, BaseMiddleware
+
+
+class TestMiddlewareChain(unittest.TestCase):
+    def setUp(self):
+        self.app = GRPCFramework(GRPCFrameworkConfig(package='middleware'))
+        self.calls = []
+        self.instances = []
+        calls, instances = self.calls, self.instances
+
+        class Outer(BaseMiddleware):
+            def __init__(self, app):
+                super().__init__(app)
+                instances.append(self)
+
+            async def dispatch(self, request, call_next):
+                calls.append('outer')
+                return await call_next(request)
+
+        async def inner(request, call_next):
+            calls.append('inner')
+            return await call_next(request)
+
+        self.app.add_middleware(Outer)
+        self.app.add_middleware(inner)
+        self.manager = self.app._middleware_manager
+
+    def dispatch(self, times: int = 1, handler=None):
+        async def main():
+            for _ in range(times):
+                await self.app._middleware_manager.dispatch(None, handler)
+
+        asyncio.run(main())
+
+    def test_build_once(self):
+        chain = self.manager.build()
+        self.dispatch(3)
+        print(self.calls)
+        assert self.manager._chain is chain
+        assert self.calls == ['outer', 'inner'] * 3
+        assert len(self.instances) == 1
+
+    def test_lazy_build(self):
+        self.dispatch(2)
+        chain = self.manager._chain
+        assert chain is not None
+        self.dispatch()
+        assert self.manager._chain is chain
+        assert len(self.instances) == 1
+
+    def test_rebuild_after_add(self):
+        self.manager.build()
+        self.dispatch()
+
+        async def last(request, call_next):
+            self.calls.append('last')
+            return await call_next(request)
+
+        self.app.add_middleware(last)
+        assert self.manager._chain is None
+        self.calls.clear()
+        self.dispatch(2)
+        print(self.calls)
+        assert self.calls == ['outer', 'inner', 'last'] * 2
+        # the chain is compiled again, the class middleware with it
+        assert len(self.instances) == 2
+
+    def test_handler(self):
+        self.manager.build()
+        handled = []
+
+        async def handler(request):
+            handled.append(request)
+            return 'done'
+
+        self.dispatch(handler=handler)
+        assert self.calls == ['outer', 'inner']
+        assert handled == [None]
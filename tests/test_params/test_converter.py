@@ -0,0 +1,108 @@
+import sys
+import unittest
+import threading
+from dataclasses import dataclass, field, make_dataclass
+from typing import List, Optional, Dict, Tuple, TypedDict
+from src.grpc_framework.core.params import ParamInfo, compile_converter
+
+
+@dataclass
+class Address:
+    city: str
+    zip_code: Optional[str] = None
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    addresses: List[Address] = field(default_factory=list)
+    tags: Dict[str, Address] = field(default_factory=dict)
+
+
+class Point(TypedDict):
+    x: int
+    y: int
+
+
+@dataclass
+class Node:
+    value: int
+    children: List['Node'] = field(default_factory=list)
+
+
+class Plain:
+    def __init__(self, name: str, address: Optional[Address] = None):
+        self.name = name
+        self.address = address
+
+
+class TestConverter(unittest.TestCase):
+    def test_nested_dataclass(self):
+        value = {
+            'id': 1, 'name': 'Jack', 'unknown': 1,
+            'addresses': [{'city': 'a'}, {'city': 'b', 'zip_code': '1'}],
+            'tags': {'home': {'city': 'c'}}
+        }
+        user = ParamInfo(type=User).from_value(value)
+        assert user == User(
+            id=1, name='Jack',
+            addresses=[Address(city='a'), Address(city='b', zip_code='1')],
+            tags={'home': Address(city='c')}
+        )
+
+    def test_containers(self):
+        assert ParamInfo(type=List[Address]).from_value([{'city': 'a'}, None]) == [Address(city='a'), None]
+        assert ParamInfo(type=Tuple[int, Address]).from_value((1, {'city': 'a'})) == (1, Address(city='a'))
+        assert ParamInfo(type=Tuple[Address, ...]).from_value([{'city': 'a'}] * 2) == (Address(city='a'),) * 2
+        assert ParamInfo(type=Optional[Address]).from_value({'city': 'a'}) == Address(city='a')
+        assert ParamInfo(type=Point).from_value({'x': 1, 'y': 2}) == {'x': 1, 'y': 2}
+        assert ParamInfo(type=int).from_value(1) == 1
+        assert ParamInfo(type=Address).from_value(None) is None
+
+    def test_plain_class(self):
+        plain = ParamInfo(type=Plain).from_value({'name': 'Jack', 'address': {'city': 'a'}, 'unknown': 1})
+        print(plain.__dict__)
+        # built from the parameters of `__init__`
+        assert isinstance(plain, Plain) and plain.name == 'Jack' and plain.address == Address(city='a')
+
+    def test_recursive_type(self):
+        node = ParamInfo(type=Node).from_value({'value': 1, 'children': [{'value': 2, 'children': [{'value': 3}]}]})
+        assert node == Node(value=1, children=[Node(value=2, children=[Node(value=3)])])
+
+    def test_cache(self):
+        assert compile_converter(List[User]) is compile_converter(List[User])
+
+    def test_concurrent_first_use(self):
+        errors = []
+
+        def convert(barrier: threading.Barrier, type_, value):
+            barrier.wait()
+            try:
+                assert compile_converter(type_)(value).children[0].value == 2
+            except Exception as e:
+                errors.append(e)
+
+        interval = sys.getswitchinterval()
+        # switch threads often, the builds are short
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+        for i in range(50):
+            # a new recursive type every round, its converter is built while the other threads read the cache
+            node = make_dataclass(
+                f'Node{i}', [('value', int), ('children', List[f'Node{i}'], field(default_factory=list))]
+            )
+            node.__module__ = __name__
+            globals()[node.__name__] = node
+            barrier = threading.Barrier(8)
+            threads = [
+                threading.Thread(target=convert, args=(barrier, node, {'value': 1, 'children': [{'value': 2}]}))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            del globals()[node.__name__]
+        print(errors[:1])
+        assert not errors
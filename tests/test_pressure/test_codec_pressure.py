@@ -0,0 +1,72 @@
+import time
+import uuid
+import datetime
+import unittest
+from dataclasses import dataclass, field
+from typing import List
+from src.grpc_framework import (
+    Serializer, JSONCodec, ORJSONCodec, DataclassesCodec, MsgPackCodec, DataclassesConverter
+)
+from src.grpc_framework.core.serialization import PurePythonMsgPackBackend
+
+
+@dataclass
+class Chunk:
+    index: int
+    checksum: str
+    size: int
+
+
+@dataclass
+class Upload:
+    name: str
+    owner: str
+    chunks: List[Chunk] = field(default_factory=list)
+
+
+@dataclass
+class BinaryUpload:
+    name: str
+    owner: uuid.UUID
+    created: datetime.datetime
+    content: bytes
+
+
+class PurePythonMsgPackCodec(MsgPackCodec):
+    backend = PurePythonMsgPackBackend()
+
+
+class TestCodecPressure(unittest.TestCase):
+    rounds = 2000
+
+    def setUp(self):
+        self.upload = Upload(
+            name='archive.tar',
+            owner='jack',
+            chunks=[Chunk(index=i, checksum=f'{i:064x}', size=65536) for i in range(32)]
+        )
+
+    def run_codec(self, codec, model, model_type):
+        s = Serializer(codec, DataclassesConverter)
+        data = s.serialize(model)
+        start_time = time.perf_counter()
+        for _ in range(self.rounds):
+            s.deserialize(s.serialize(model), model_type)
+        use_time = time.perf_counter() - start_time
+        print(f'{codec.__name__:<24} size -> {len(data):>6} bytes, use time -> {use_time:.4f} s')
+        return data
+
+    def test_codec_pressure(self):
+        sizes = {}
+        for codec in (JSONCodec, ORJSONCodec, DataclassesCodec, MsgPackCodec, PurePythonMsgPackCodec):
+            sizes[codec] = len(self.run_codec(codec, self.upload, Upload))
+        assert sizes[MsgPackCodec] < sizes[JSONCodec]
+
+    def test_binary_payload(self):
+        # json codecs can not carry bytes, uuid and datetime values, msgpack keeps them native
+        upload = BinaryUpload(
+            name='blob', owner=uuid.uuid4(), created=datetime.datetime.now(datetime.timezone.utc),
+            content=bytes(range(256)) * 64
+        )
+        data = self.run_codec(MsgPackCodec, upload, BinaryUpload)
+        assert len(data) < len(upload.content) + 128
@@ -0,0 +1,85 @@
+import json
+import asyncio
+import tempfile
+import tracemalloc
+import unittest
+from src.grpc_framework import GRPCFramework, GRPCFrameworkConfig
+from src.grpc_framework.core.metrics import InstrumentedExecutor
+from src.grpc_framework.core.metrics.registry import EXECUTOR_SUBMITTED
+from src.grpc_framework.core.profiling import MemoryProfiler
+
+RETAINED = []
+
+
+class Leaked:
+    pass
+
+
+def leak():
+    RETAINED.append([Leaked() for _ in range(200)])
+
+
+class TestMemoryProfiler(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.profiler = MemoryProfiler(self.directory, frames=16, top=10, name='test', tracked_types={'Leaked': Leaked})
+        self.profiler.add_handler(leak, '/m.Svc/leak')
+
+    def tearDown(self):
+        self.profiler.stop()
+        RETAINED.clear()
+
+    def test_snapshot_diff(self):
+        with open(self.profiler.snapshot(), encoding='utf-8') as f:
+            baseline = json.load(f)
+        assert baseline['baseline'] and baseline['top_growth'] == []
+        assert self.profiler.tracing
+        leak()
+        leak()
+        path = self.profiler.snapshot()
+        assert path.endswith('.json') and 'memory-test-' in path
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+        print({key: report[key] for key in ('methods', 'framework', 'objects', 'traced_bytes')})
+        print(report['top_growth'][:3])
+        assert not report['baseline']
+        method = report['methods']['/m.Svc/leak']
+        assert method['count'] >= 400 and method['size_diff'] == method['size'] > 0
+        assert report['objects']['Leaked'] == {'count': 400, 'count_diff': 400}
+        assert any('test_memory.py' in line['line'] and line['size_diff'] > 0 for line in report['top_growth'])
+        RETAINED.clear()
+        with open(self.profiler.snapshot(), encoding='utf-8') as f:
+            released = json.load(f)
+        assert released['objects']['Leaked'] == {'count': 0, 'count_diff': -400}
+        assert released['methods'].get('/m.Svc/leak', {'size': 0})['size'] < method['size']
+
+    def test_stop(self):
+        self.profiler.start()
+        self.profiler.stop()
+        assert not tracemalloc.is_tracing()
+        with open(self.profiler.snapshot(), encoding='utf-8') as f:
+            assert json.load(f)['baseline']
+
+    def test_app_snapshot_executor(self):
+        app = GRPCFramework(GRPCFrameworkConfig(package='memory'))
+        app.memory_profiler = self.profiler
+        app.executor = InstrumentedExecutor(max_workers=1)
+
+        async def run():
+            app.loop = asyncio.get_running_loop()
+            return await app._write_memory_snapshot()
+
+        try:
+            assert asyncio.run(run()).endswith('.json')
+            stats = app.executor.stats.read()
+        finally:
+            app.executor.shutdown()
+        # the snapshot is taken by the runtime executor, counted as framework work
+        assert stats['other'][0][EXECUTOR_SUBMITTED] == 1
+        assert sum(row[0][EXECUTOR_SUBMITTED] for row in stats.values()) == 1
+
+    def test_config(self):
+        with self.assertRaises(ValueError):
+            GRPCFrameworkConfig(package='memory', memory_snapshot_signal='SIGNOPE')
+        with self.assertRaises(ValueError):
+            GRPCFrameworkConfig(package='memory', memory_snapshot_signal='SIGUSR2', profiler_signal='SIGUSR2')
@@ -0,0 +1,75 @@
+import time
+import asyncio
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.grpc_framework import GRPCFrameworkConfig
+from src.grpc_framework.core.profiling import SamplingProfiler
+
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def sync_handler():
+    busy(0.1)
+
+
+def read_stacks(path):
+    stacks = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            stack, count = line.rsplit(' ', 1)
+            stacks[stack] = int(count)
+    return stacks
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_tagged_stacks(self):
+        async def endpoint(profiler):
+            profiler.tag_task('/p.Svc/busy')
+            busy(0.1)
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            profiler = SamplingProfiler(self.directory, interval=0.001, loop=loop, name='test')
+            profiler.add_handler(sync_handler, '/p.Svc/sync')
+            path = profiler.start()
+            assert profiler.running
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                await asyncio.gather(
+                    loop.create_task(endpoint(profiler)),
+                    loop.run_in_executor(executor, sync_handler)
+                )
+            assert profiler.stop(wait=True) == path
+            assert not profiler.running
+            return profiler, path
+
+        profiler, path = asyncio.run(main())
+        stacks = read_stacks(path)
+        for stack, count in stacks.items():
+            print(count, stack[-160:])
+        assert profiler.samples > 0
+        assert any(stack.startswith('/p.Svc/busy;MainThread;') and 'endpoint (test_sampler.py' in stack
+                   for stack in stacks)
+        assert any(stack.startswith('/p.Svc/sync;') and 'sync_handler (test_sampler.py:16)' in stack
+                   for stack in stacks)
+
+    def test_bounded_window(self):
+        profiler = SamplingProfiler(self.directory, interval=0.001, duration=0.05)
+        path = profiler.toggle()
+        time.sleep(0.3)
+        assert not profiler.running
+        assert read_stacks(path)
+        assert profiler.toggle() != path
+        profiler.stop(wait=True)
+
+    def test_config(self):
+        self.assertRaises(ValueError, GRPCFrameworkConfig, package='p', profiler_signal='SIGNOPE')
+        self.assertRaises(ValueError, GRPCFrameworkConfig, package='p', profiler_interval=0)
+        GRPCFrameworkConfig(package='p', profiler_signal='SIGUSR2', profiler_service=True)
@@ -0,0 +1,68 @@
+import unittest
+from collections import namedtuple
+from dataclasses import asdict
+from src.grpc_framework.core.request.request import Request, PeerInfo
+
+Metadatum = namedtuple('Metadatum', ['key', 'value'])
+HandlerCallDetails = namedtuple('HandlerCallDetails', ['method', 'invocation_metadata'])
+
+
+class FakeContext:
+    def __init__(self):
+        self.peer_calls = 0
+
+    def peer(self):
+        self.peer_calls += 1
+        return 'ipv4:127.0.0.1:5000'
+
+
+class TestRequest(unittest.TestCase):
+    def test_lazy_parse(self):
+        request = Request()
+        request.from_handler_details(HandlerCallDetails(
+            method='/demo.UserService/get_user',
+            invocation_metadata=(Metadatum('tenant', 'a'),)
+        ))
+        context = FakeContext()
+        request.from_context(context)
+        assert context.peer_calls == 0
+        assert request.peer_info == PeerInfo(ip_version='ipv4', ip='127.0.0.1', port=5000, raw='ipv4:127.0.0.1:5000')
+        assert request.peer_info.port == 5000
+        assert context.peer_calls == 1
+        assert request.metadata == {'tenant': 'a'}
+        assert (request.package, request.service_name, request.method_name) == ('demo', 'UserService', 'get_user')
+        print(request)
+
+    def test_precomputed_route(self):
+        request = Request(full_method='/a.b.UserService/get_user')
+        request.set_route(('a.b', 'UserService', 'get_user'))
+        assert request.package == 'a.b'
+        assert request.service_name == 'UserService'
+
+    def test_route_setters(self):
+        route = ('a.b', 'UserService', 'get_user')
+        request = Request(full_method='/a.b.UserService/get_user')
+        request.set_route(route)
+        request.package = 'c'
+        request.method_name = 'list_users'
+        assert (request.package, request.service_name, request.method_name) == ('c', 'UserService', 'list_users')
+        # the precomputed route of the endpoint is left as it is
+        assert route == ('a.b', 'UserService', 'get_user')
+        request = Request()
+        request.service_name = 'UserService'
+        assert (request.package, request.service_name, request.method_name) == (None, 'UserService', None)
+
+    def test_peer_info_dataclass(self):
+        request = Request()
+        request.from_context(FakeContext())
+        print(asdict(request.peer_info))
+        assert asdict(request.peer_info) == {'ip_version': 'ipv4', 'ip': '127.0.0.1', 'port': 5000,
+                                             'raw': 'ipv4:127.0.0.1:5000'}
+        request.peer_info.port = 5001
+        assert request.peer_info.port == 5001
+
+    def test_slots(self):
+        request = Request()
+        request.state['user'] = 1
+        with self.assertRaises(AttributeError):
+            request.user = 1
@@ -0,0 +1,17 @@
+import grpc
+import unittest
+from collections import namedtuple
+from src.grpc_framework.core.routing import RouteTable
+
+HandlerCallDetails = namedtuple('HandlerCallDetails', ['method', 'invocation_metadata'])
+
+
+class TestRouteTable(unittest.TestCase):
+    def test_route(self):
+        table = RouteTable()
+        handler = grpc.unary_unary_rpc_method_handler(lambda request, context: request)
+        table.add('demo.UserService', 'get_user', handler)
+        assert '/demo.UserService/get_user' in table
+        assert len(table) == 1
+        assert table.service(HandlerCallDetails('/demo.UserService/get_user', ())) is handler
+        assert table.service(HandlerCallDetails('/grpc.health.v1.Health/Check', ())) is None
@@ -0,0 +1,119 @@
+import sys
+import unittest
+import threading
+from dataclasses import dataclass, field, asdict, make_dataclass
+from typing import Any, Dict, List, Optional
+from src.grpc_framework import Serializer, DataclassesCodec, DataclassesConverter
+from src.grpc_framework.core.serialization.dataclass_codegen import get_dataclass_encoder, get_dataclass_decoder
+
+
+@dataclass
+class Address:
+    city: str
+    zip_code: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Tag:
+    name: str
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    address: Address
+    tags: List[Tag] = field(default_factory=list)
+    scores: Dict[str, float] = field(default_factory=dict)
+    backup: Optional[Address] = None
+    extra: Any = None
+    version: int = field(default=1, init=False)
+
+
+@dataclass
+class Node:
+    value: int
+    children: List['Node'] = field(default_factory=list)
+
+
+class TestDataclassCodegen(unittest.TestCase):
+    def setUp(self):
+        self.user = User(
+            id=1,
+            name='Tom',
+            address=Address(city='Paris'),
+            tags=[Tag('a'), Tag('b')],
+            scores={'math': 1.5},
+            extra=[Address(city='Rome')]
+        )
+
+    def test_encode_like_asdict(self):
+        data = get_dataclass_encoder(User)(self.user)
+        print(data)
+        assert data['tags'] == [{'name': 'a'}, {'name': 'b'}]
+        assert data['extra'] == [{'city': 'Rome', 'zip_code': None}]
+        assert data['version'] == 1
+        assert data == asdict(self.user)
+
+    def test_decode_nested(self):
+        data = get_dataclass_encoder(User)(self.user)
+        # init=False fields and unknown keys are ignored
+        data['unknown'] = True
+        user = get_dataclass_decoder(User)(data)
+        assert user.address == Address(city='Paris')
+        assert user.tags == [Tag('a'), Tag('b')]
+        assert user.backup is None
+
+    def test_decode_defaults_and_missing(self):
+        user = get_dataclass_decoder(User)({'id': 2, 'name': 'Jack', 'address': {'city': 'Rome'}})
+        assert user.tags == [] and user.scores == {}
+        with self.assertRaises(TypeError):
+            get_dataclass_decoder(User)({'id': 2})
+
+    def test_recursive(self):
+        tree = Node(1, [Node(2, [Node(3)])])
+        data = get_dataclass_encoder(Node)(tree)
+        assert data == asdict(tree)
+        assert get_dataclass_decoder(Node)(data) == tree
+
+    def test_serializer_round_trip(self):
+        s = Serializer(DataclassesCodec, DataclassesConverter)
+        r = s.deserialize(s.serialize(self.user), User)
+        print(r)
+        # an Any field keeps the plain decoded value
+        assert r.extra == [{'city': 'Rome', 'zip_code': None}]
+        r.extra = self.user.extra
+        assert r == self.user
+        assert s.deserialize(s.serialize([Tag('x')]), Tag) == [Tag('x')]
+
+    def test_concurrent_first_use(self):
+        errors = []
+
+        def round_trip(barrier: threading.Barrier, node_type):
+            barrier.wait()
+            try:
+                data = get_dataclass_encoder(node_type)(node_type(1, [node_type(2)]))
+                assert get_dataclass_decoder(node_type)(data).children[0].value == 2
+            except Exception as e:
+                errors.append(e)
+
+        interval = sys.getswitchinterval()
+        # switch threads often, the builds are short
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+        for i in range(50):
+            # a new recursive class every round, its functions are built while the other threads read the cache
+            node_type = make_dataclass(
+                f'Node{i}', [('value', int), ('children', List[f'Node{i}'], field(default_factory=list))]
+            )
+            node_type.__module__ = __name__
+            globals()[node_type.__name__] = node_type
+            barrier = threading.Barrier(8)
+            threads = [threading.Thread(target=round_trip, args=(barrier, node_type)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            del globals()[node_type.__name__]
+        print(errors[:1])
+        assert not errors
@@ -0,0 +1,91 @@
+import pickle
+import uuid
+import datetime
+import unittest
+from dataclasses import dataclass, field
+from typing import Dict, List
+from src.grpc_framework import Serializer, MsgPackCodec, DataclassesConverter, JsonConverter
+from src.grpc_framework.core.serialization import MsgPackLibBackend, PurePythonMsgPackBackend, ExtType
+
+UTC = datetime.timezone.utc
+
+
+@dataclass
+class File:
+    name: str
+    content: bytes
+    owner: uuid.UUID
+    created: datetime.datetime
+    tags: List[str] = field(default_factory=list)
+    meta: Dict[str, int] = field(default_factory=dict)
+
+
+class PurePythonMsgPackCodec(MsgPackCodec):
+    backend = PurePythonMsgPackBackend()
+
+
+class TestMsgPack(unittest.TestCase):
+    def setUp(self):
+        self.value = {
+            'nil': None, 'bool': [True, False],
+            'int': [0, 1, 127, 128, 255, 256, 65535, 65536, 2 ** 32, 2 ** 64 - 1, -1, -32, -33, -129, -2 ** 63],
+            'float': 1.5, 'str': ['', 'a' * 31, 'b' * 32, 'c' * 256, '中文'],
+            'bin': [b'', b'\x00' * 300],
+            'array': [list(range(15)), list(range(16))],
+            'map': {str(i): i for i in range(16)},
+            1: 'int key',
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'time': [
+                datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC),
+                datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=UTC),
+                datetime.datetime(1900, 1, 1, tzinfo=UTC),
+                datetime.datetime(2600, 1, 1, tzinfo=UTC),
+            ],
+        }
+
+    def test_backends_are_wire_compatible(self):
+        lib, pure = MsgPackLibBackend(), PurePythonMsgPackBackend()
+        data = pure.pack(self.value)
+        assert data == lib.pack(self.value)
+        assert pure.unpack(data) == self.value
+        assert lib.unpack(data) == self.value
+
+    def test_unknown_extension(self):
+        lib, pure = MsgPackLibBackend(), PurePythonMsgPackBackend()
+        # fixext 2 and ext 8 of the type 5
+        for data in (b'\xd5\x05ab', b'\xc7\x03\x05abc'):
+            value = pure.unpack(data)
+            print(value)
+            assert value == lib.unpack(data) == ExtType(5, data[-len(value.data):])
+            assert pure.pack(value) == lib.pack(value) == data
+
+    def test_naive_datetime_is_utc(self):
+        naive = datetime.datetime(2024, 1, 2, 3, 4, 5)
+        assert PurePythonMsgPackBackend().unpack(PurePythonMsgPackBackend().pack(naive)) == naive.replace(tzinfo=UTC)
+
+    def test_dataclasses(self):
+        f = File(
+            name='a.bin', content=b'\x00\x01\xff', owner=uuid.uuid4(),
+            created=datetime.datetime.now(UTC), tags=['x'], meta={'size': 3}
+        )
+        for codec in (MsgPackCodec, PurePythonMsgPackCodec):
+            s = Serializer(codec, DataclassesConverter)
+            data = s.serialize(f)
+            print(codec.__name__, data)
+            assert s.deserialize(data, File) == f
+            assert s.deserialize(s.serialize([f]), File) == [f]
+
+    def test_json_converter(self):
+        s = Serializer(MsgPackCodec, JsonConverter)
+        assert s.deserialize(s.serialize({'a': [1, b'2']}), dict) == {'a': [1, b'2']}
+
+    def test_invalid_data(self):
+        with self.assertRaises(Exception):
+            PurePythonMsgPackBackend().unpack(b'\xc1')
+        with self.assertRaises(TypeError):
+            PurePythonMsgPackBackend().pack(object())
+
+    def test_pickle(self):
+        for codec in (MsgPackCodec, PurePythonMsgPackCodec):
+            s = pickle.loads(pickle.dumps(Serializer(codec, JsonConverter)))
+            assert s.deserialize(s.serialize([1, 'a']), list) == [1, 'a']
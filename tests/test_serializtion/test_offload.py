@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.grpc_framework import GRPCFramework, GRPCFrameworkConfig, Serializer, JSONCodec, JsonConverter
+from src.grpc_framework.core.adaptor import StreamRequest
+from src.grpc_framework.core.metrics import MetricsRegistry, render_openmetrics
+from src.grpc_framework.core.request.request import Request
+from src.grpc_framework.core.serialization import SerializationOffloader
+from src.grpc_framework.utils import Sync2AsyncUtils
+
+
+class TestSerializationOffloader(unittest.TestCase):
+    def setUp(self):
+        self.serializer = Serializer(JSONCodec, JsonConverter)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def run_with_offloader(self, coroutine_factory, threshold=64, counters=None):
+        async def main():
+            offloader = SerializationOffloader(threshold, counters)
+            offloader.init_s2a(Sync2AsyncUtils(self.executor))
+            return offloader, await coroutine_factory(offloader)
+
+        return asyncio.run(main())
+
+    def test_disabled(self):
+        offloader = SerializationOffloader()
+        assert not offloader.enabled
+        assert not offloader.should_offload_request(b'x' * 10 ** 6)
+        assert not SerializationOffloader(1).enabled
+
+    def test_threshold(self):
+        small, large = self.serializer.serialize([1]), self.serializer.serialize(list(range(100)))
+
+        async def decode(offloader):
+            threads = []
+
+            def deserialize(data):
+                threads.append(threading.current_thread())
+                return self.serializer.deserialize(data, list)
+
+            results = []
+            for data in (small, large):
+                if offloader.should_offload_request(data):
+                    results.append(await offloader.decode(deserialize, data))
+                else:
+                    results.append(deserialize(data))
+            return results, threads
+
+        offloader, (results, threads) = self.run_with_offloader(decode)
+        print(offloader.stats())
+        assert results == [[1], list(range(100))]
+        assert threads[0] is threading.main_thread() and threads[1] is not threading.main_thread()
+        assert offloader.stats() == {'offloaded_decodes': 1, 'offloaded_encodes': 0}
+
+    def test_response_size_by_route(self):
+        async def encode(offloader):
+            route = '/pkg.Service/Method'
+            assert not offloader.should_offload_response(route)
+            offloader.observe_response(route, await offloader.encode(self.serializer.serialize, list(range(100))))
+            return offloader.should_offload_response(route), offloader.should_offload_response('/pkg.Service/Other')
+
+        offloader, (large_route, other_route) = self.run_with_offloader(encode)
+        assert large_route and not other_route
+        assert offloader.offloaded_encodes == 1
+
+    def test_stream_items(self):
+        async def consume(offloader):
+            async def frames():
+                yield self.serializer.serialize([1])
+                yield self.serializer.serialize(list(range(100)))
+
+            request = Request.__new__(Request)
+            request.request_bytes = frames()
+            stream = StreamRequest(request, lambda data, model_type: self.serializer.deserialize(data, list),
+                                   offloader=offloader)
+            return [item async for item in stream]
+
+        offloader, items = self.run_with_offloader(consume)
+        assert items == [[1], list(range(100))]
+        assert offloader.offloaded_decodes == 1
+
+    def test_registry_counters(self):
+        registry = MetricsRegistry(['/s.Svc/m'], workers=2, serialization_offload=True)
+        try:
+            async def decode(offloader):
+                return await offloader.decode(self.serializer.deserialize, self.serializer.serialize([1]), list)
+
+            offloader, result = self.run_with_offloader(decode, counters=registry.offload_stats(1))
+            assert result == [1]
+            assert registry.offload_stats(1).read() == [1, 0]
+            text = render_openmetrics(registry)
+            print(text[text.index('# TYPE grpc_server_serialization_offloaded'):])
+            assert 'grpc_server_serialization_offloaded_total{direction="decode",worker="1"} 1' in text
+            assert 'grpc_server_serialization_offloaded_total{direction="encode",worker="0"} 0' in text
+        finally:
+            registry.close()
+        registry = MetricsRegistry(['/s.Svc/m'])
+        try:
+            assert registry.offload_stats() is None
+            assert 'serialization_offloaded' not in render_openmetrics(registry)
+        finally:
+            registry.close()
+
+    def test_dedicated_executor(self):
+        app = GRPCFramework(GRPCFrameworkConfig(
+            package='offload', executor_type='process', serialization_offload_threshold=64
+        ))
+        app._build_runtime()
+        try:
+            executor = app._serialization_executor
+            assert isinstance(executor, ThreadPoolExecutor)
+            assert app._stop_serialization_executor in app._lifecycle_manager._shutdown_handlers
+            app.loop.run_until_complete(app._stop_serialization_executor(app))
+            assert app._serialization_executor is None
+            with self.assertRaises(RuntimeError):
+                executor.submit(print)
+        finally:
+            app.executor.shutdown()
+            app.loop.close()
+
+    def test_config(self):
+        with self.assertRaises(ValueError):
+            GRPCFrameworkConfig(package='offload', serialization_offload_threshold=0)
@@ -0,0 +1,165 @@
+import sys
+import unittest
+import threading
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory, timestamp_pb2
+from google.protobuf.json_format import MessageToDict, ParseDict, ParseError
+from src.grpc_framework.core.serialization import (
+    Serializer, JSONCodec, ORJSONCodec, CompiledJsonProtobufConverter
+)
+from src.grpc_framework.core.serialization.protobuf_json import get_message_encoder, get_message_decoder
+
+
+def build_messages():
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(descriptor_pb2.FileDescriptorProto.FromString(
+        timestamp_pb2.DESCRIPTOR.serialized_pb
+    ))
+    F = descriptor_pb2.FieldDescriptorProto
+    file = descriptor_pb2.FileDescriptorProto(
+        name='protobuf_json_test.proto',
+        package='pj',
+        syntax='proto3',
+        dependency=['google/protobuf/timestamp.proto'],
+        enum_type=[{'name': 'Color', 'value': [{'name': 'RED', 'number': 0}, {'name': 'BLUE', 'number': 1}]}],
+        message_type=[
+            {
+                'name': 'Node',
+                'field': [
+                    {'name': 'node_id', 'number': 1, 'type': F.TYPE_INT64, 'label': F.LABEL_OPTIONAL},
+                    {'name': 'children', 'number': 2, 'type': F.TYPE_MESSAGE, 'label': F.LABEL_REPEATED,
+                     'type_name': '.pj.Node'},
+                ]
+            },
+            {
+                'name': 'Record',
+                'field': [
+                    {'name': 'user_name', 'number': 1, 'type': F.TYPE_STRING, 'label': F.LABEL_OPTIONAL},
+                    {'name': 'count', 'number': 2, 'type': F.TYPE_INT32, 'label': F.LABEL_OPTIONAL},
+                    {'name': 'big', 'number': 3, 'type': F.TYPE_UINT64, 'label': F.LABEL_OPTIONAL},
+                    {'name': 'ratio', 'number': 4, 'type': F.TYPE_FLOAT, 'label': F.LABEL_OPTIONAL},
+                    {'name': 'score', 'number': 5, 'type': F.TYPE_DOUBLE, 'label': F.LABEL_OPTIONAL},
+                    {'name': 'active', 'number': 6, 'type': F.TYPE_BOOL, 'label': F.LABEL_OPTIONAL},
+                    {'name': 'payload', 'number': 7, 'type': F.TYPE_BYTES, 'label': F.LABEL_OPTIONAL},
+                    {'name': 'color', 'number': 8, 'type': F.TYPE_ENUM, 'label': F.LABEL_OPTIONAL,
+                     'type_name': '.pj.Color'},
+                    {'name': 'tags', 'number': 9, 'type': F.TYPE_STRING, 'label': F.LABEL_REPEATED},
+                    {'name': 'ids', 'number': 10, 'type': F.TYPE_INT64, 'label': F.LABEL_REPEATED},
+                    {'name': 'root', 'number': 11, 'type': F.TYPE_MESSAGE, 'label': F.LABEL_OPTIONAL,
+                     'type_name': '.pj.Node'},
+                    {'name': 'created', 'number': 12, 'type': F.TYPE_MESSAGE, 'label': F.LABEL_OPTIONAL,
+                     'type_name': '.google.protobuf.Timestamp'},
+                    {'name': 'attrs', 'number': 13, 'type': F.TYPE_MESSAGE, 'label': F.LABEL_REPEATED,
+                     'type_name': '.pj.Record.AttrsEntry'},
+                    {'name': 'nodes', 'number': 14, 'type': F.TYPE_MESSAGE, 'label': F.LABEL_REPEATED,
+                     'type_name': '.pj.Record.NodesEntry'},
+                ],
+                'nested_type': [
+                    {
+                        'name': 'AttrsEntry',
+                        'options': {'map_entry': True},
+                        'field': [
+                            {'name': 'key', 'number': 1, 'type': F.TYPE_STRING, 'label': F.LABEL_OPTIONAL},
+                            {'name': 'value', 'number': 2, 'type': F.TYPE_STRING, 'label': F.LABEL_OPTIONAL},
+                        ]
+                    },
+                    {
+                        'name': 'NodesEntry',
+                        'options': {'map_entry': True},
+                        'field': [
+                            {'name': 'key', 'number': 1, 'type': F.TYPE_INT32, 'label': F.LABEL_OPTIONAL},
+                            {'name': 'value', 'number': 2, 'type': F.TYPE_MESSAGE, 'label': F.LABEL_OPTIONAL,
+                             'type_name': '.pj.Node'},
+                        ]
+                    },
+                ]
+            },
+        ]
+    )
+    pool.Add(file)
+    return (
+        message_factory.GetMessageClass(pool.FindMessageTypeByName('pj.Record')),
+        message_factory.GetMessageClass(pool.FindMessageTypeByName('pj.Node')),
+    )
+
+
+Record, Node = build_messages()
+
+
+class TestProtobufJson(unittest.TestCase):
+    def setUp(self):
+        self.record = Record(
+            user_name='Tom',
+            count=3,
+            big=2 ** 60,
+            ratio=0.1,
+            score=float('inf'),
+            active=True,
+            payload=b'\x00\xff data',
+            color='BLUE',
+            tags=['a', 'b'],
+            ids=[1, 2],
+            root={'node_id': 1, 'children': [{'node_id': 2, 'children': [{'node_id': 3}]}]},
+            created={'seconds': 1700000000},
+            attrs={'k': 'v'},
+            nodes={7: {'node_id': 7}},
+        )
+
+    def test_encode_like_message_to_dict(self):
+        data = get_message_encoder(Record)(self.record)
+        print(data)
+        assert data == MessageToDict(self.record, preserving_proto_field_name=True)
+        assert get_message_encoder(Record)(Record()) == {}
+
+    def test_decode_like_parse_dict(self):
+        data = MessageToDict(self.record, preserving_proto_field_name=True)
+        assert get_message_decoder(Record)(data) == self.record
+        camel = MessageToDict(self.record)
+        assert get_message_decoder(Record)(camel) == self.record
+
+    def test_decode_fallback(self):
+        # loosely typed values are accepted the same way json_format accepts them
+        data = {'count': '3', 'big': 5, 'ratio': 'NaN', 'root': None}
+        r = get_message_decoder(Record)(data)
+        assert r == ParseDict(data, Record())
+        with self.assertRaises(ParseError):
+            get_message_decoder(Record)({'unknown': 1})
+        with self.assertRaises(ParseError):
+            get_message_decoder(Record)({'count': True})
+
+    def test_serializer(self):
+        for codec in (JSONCodec, ORJSONCodec):
+            s = Serializer(codec, CompiledJsonProtobufConverter)
+            assert s.fused
+            data = s.serialize(self.record)
+            print(codec.__name__, data)
+            assert s.deserialize(data, Record) == self.record
+            items = s.deserialize(s.serialize([self.record, Record(count=1)]), Record)
+            assert items == [self.record, Record(count=1)]
+
+    def test_concurrent_first_use(self):
+        errors = []
+
+        def round_trip(barrier: threading.Barrier, node_type):
+            barrier.wait()
+            try:
+                node = node_type(node_id=1, children=[{'node_id': 2}])
+                data = get_message_encoder(node_type)(node)
+                assert get_message_decoder(node_type)(data) == node
+            except Exception as e:
+                errors.append(e)
+
+        interval = sys.getswitchinterval()
+        # switch threads often, the builds are short
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+        for _ in range(50):
+            # new descriptors every round, their functions are built while the other threads read the cache
+            _, node_type = build_messages()
+            barrier = threading.Barrier(8)
+            threads = [threading.Thread(target=round_trip, args=(barrier, node_type)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        print(errors[:1])
+        assert not errors
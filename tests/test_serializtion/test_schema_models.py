@@ -0,0 +1,114 @@
+import uuid
+import datetime
+import unittest
+from dataclasses import dataclass
+from typing import List, Optional
+from src.grpc_framework import (
+    Serializer, JSONCodec, ORJSONCodec, DataclassesCodec, MsgPackCodec, SchemaModelConverter
+)
+from src.grpc_framework.core.params import compile_converter
+from src.grpc_framework.core.serialization.schema_models import msgspec, BaseModel, get_schema_adapter
+
+UTC = datetime.timezone.utc
+
+if msgspec is not None:
+    class Tag(msgspec.Struct):
+        name: str
+
+
+    class Event(msgspec.Struct):
+        event_id: uuid.UUID
+        created: datetime.datetime
+        tags: List[Tag] = []
+        payload: Optional[bytes] = None
+
+if BaseModel is not None:
+    class Label(BaseModel):
+        name: str
+
+
+    class Order(BaseModel):
+        order_id: uuid.UUID
+        created: datetime.datetime
+        labels: List[Label] = []
+        amount: float = 0
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+CODECS = (JSONCodec, ORJSONCodec, DataclassesCodec, MsgPackCodec)
+
+
+@unittest.skipIf(msgspec is None, 'msgspec is not installed')
+class TestMsgspecConverter(unittest.TestCase):
+    def setUp(self):
+        self.event = Event(
+            event_id=uuid.uuid4(), created=datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC),
+            tags=[Tag('a'), Tag('b')], payload=b'\x00\x01'
+        )
+
+    def test_serializer(self):
+        for codec in CODECS:
+            s = Serializer(codec, SchemaModelConverter)
+            assert s.fused
+            data = s.serialize(self.event)
+            print(codec.__name__, data)
+            assert s.deserialize(data, Event) == self.event
+            assert s.deserialize(s.serialize([self.event, self.event]), Event) == [self.event, self.event]
+
+    def test_invalid(self):
+        s = Serializer(JSONCodec, SchemaModelConverter)
+        with self.assertRaises(msgspec.ValidationError):
+            s.deserialize(b'{"event_id": 1}', Event)
+
+    def test_adapter_cached(self):
+        assert get_schema_adapter(Event) is get_schema_adapter(Event)
+
+    def test_msgpack_uuid(self):
+        codec = MsgPackCodec()
+        data = Serializer(MsgPackCodec, SchemaModelConverter).serialize(self.event)
+        print(data)
+        # the same extension types as the msgpack codec writes for plain values
+        assert data == codec.encode(get_schema_adapter(Event).to_builtins(self.event, json_compatible=False))
+        assert codec.decode(data)['event_id'] == self.event.event_id
+        plain = codec.encode({**msgspec.to_builtins(self.event, builtin_types=(bytes, datetime.datetime)),
+                              'event_id': self.event.event_id})
+        assert Serializer(MsgPackCodec, SchemaModelConverter).deserialize(plain, Event) == self.event
+        assert get_schema_adapter(Event).packs_uuid and not get_schema_adapter(Tag).packs_uuid
+
+    def test_from_value(self):
+        value = SchemaModelConverter().from_model(self.event)
+        assert isinstance(value, dict) and value['tags'] == [{'name': 'a'}, {'name': 'b'}]
+        assert compile_converter(Event)(value) == self.event
+
+
+@unittest.skipIf(BaseModel is None, 'pydantic v2 is not installed')
+class TestPydanticConverter(unittest.TestCase):
+    def setUp(self):
+        self.order = Order(
+            order_id=uuid.uuid4(), created=datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC),
+            labels=[Label(name='x')], amount=1.5
+        )
+
+    def test_serializer(self):
+        for codec in CODECS:
+            s = Serializer(codec, SchemaModelConverter)
+            data = s.serialize(self.order)
+            print(codec.__name__, data)
+            assert s.deserialize(data, Order) == self.order
+            assert s.deserialize(s.serialize([self.order]), Order) == [self.order]
+
+    def test_from_value(self):
+        value = SchemaModelConverter().from_model(self.order)
+        assert value['order_id'] == str(self.order.order_id)
+        assert compile_converter(Order)(value) == self.order
+
+    def test_dataclasses(self):
+        # dataclasses keep the dataclasses converter behaviour
+        for codec in CODECS:
+            s = Serializer(codec, SchemaModelConverter)
+            assert s.deserialize(s.serialize(Point(1, 2)), Point) == Point(1, 2)
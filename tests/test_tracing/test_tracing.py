@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+import threading
+import unittest
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from src.grpc_framework import GRPCFramework, GRPCFrameworkConfig
+from src.grpc_framework.client import GRPCClient
+from src.grpc_framework.core.request.request import Request
+from src.grpc_framework.core.tracing import (
+    Tracer, RingBufferExporter, parse_traceparent, current_trace, current_traceparent
+)
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+def in_context(func):
+    """run in a fresh context, the current request and trace do not leak between tests"""
+    return contextvars.copy_context().run(func)
+
+
+class TestTraceparent(unittest.TestCase):
+    def test_parse(self):
+        assert parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}-01') == (TRACE_ID, PARENT_ID, True)
+        assert parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}-00') == (TRACE_ID, PARENT_ID, False)
+        # a later version may add fields
+        assert parse_traceparent(f'01-{TRACE_ID}-{PARENT_ID}-01-extra') == (TRACE_ID, PARENT_ID, True)
+        for value in (
+                None, '', f'00-{TRACE_ID}-{PARENT_ID}-01-extra', f'ff-{TRACE_ID}-{PARENT_ID}-01',
+                f'00-{"0" * 32}-{PARENT_ID}-01', f'00-{TRACE_ID}-{"0" * 16}-01', f'00-{TRACE_ID.upper()}-{PARENT_ID}-01'
+        ):
+            assert parse_traceparent(value) is None, value
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.exporter = RingBufferExporter(capacity=2)
+
+    def test_follow_parent(self):
+        tracer = Tracer(self.exporter, sample_rate=0)
+
+        def run():
+            request = Request(metadata={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'})
+            trace = tracer.start(request, '/t.Svc/m')
+            assert trace is not None and request.trace is trace and current_trace() is trace
+            assert current_traceparent() == f'00-{TRACE_ID}-{trace.span_id}-01'
+            started = time.perf_counter_ns()
+            trace.add_span('handler', started)
+            tracer.finish(trace, 'OK')
+            return trace
+
+        trace = in_context(run)
+        exported = self.exporter.traces()
+        print(exported)
+        assert len(exported) == 1
+        assert exported[0]['trace_id'] == TRACE_ID and exported[0]['parent_id'] == PARENT_ID
+        assert exported[0]['spans'][0]['name'] == 'handler'
+        assert exported[0]['spans'][0]['parent_id'] == trace.span_id
+        assert current_trace() is None
+
+    def test_unsampled(self):
+        tracer = Tracer(self.exporter, sample_rate=1.0, keep_errors=False)
+
+        def run():
+            unsampled = f'00-{TRACE_ID}-{PARENT_ID}-00'
+            request = Request(metadata={'traceparent': unsampled})
+            assert tracer.start(request, '/t.Svc/m') is None
+            assert request.trace is None and current_trace() is None
+            # the call made inside passes the received context on
+            assert current_traceparent() == unsampled
+            assert not tracer.tail_sampling
+
+        in_context(run)
+        assert self.exporter.exported == 0
+
+    def test_head_sample_rate(self):
+        def run(rate):
+            return Tracer(self.exporter, sample_rate=rate).start(Request(), '/t.Svc/m')
+
+        assert in_context(lambda: run(1.0)) is not None
+        assert in_context(lambda: run(0.0)) is None
+
+    def test_tail_sampling(self):
+        tracer = Tracer(self.exporter, sample_rate=0, slow_threshold=0.01, keep_errors=True)
+
+        def run():
+            request = Request(metadata={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-00'})
+            now = time.perf_counter_ns()
+            tracer.finish_unsampled(request, '/t.Svc/fast', now, 'OK')
+            tracer.finish_unsampled(request, '/t.Svc/slow', now - 20 * 10 ** 6, 'OK')
+            tracer.finish_unsampled(request, '/t.Svc/failed', now, 'INTERNAL')
+
+        in_context(run)
+        exported = self.exporter.traces()
+        assert [trace['name'] for trace in exported] == ['/t.Svc/slow', '/t.Svc/failed']
+        assert all(trace['tail_sampled'] and trace['trace_id'] == TRACE_ID for trace in exported)
+        assert exported[0]['duration_ns'] >= 20 * 10 ** 6
+
+    def test_ring_buffer_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'traces', 'traces.jsonl')
+        exporter = RingBufferExporter(path, capacity=2)
+        assert not exporter.flush()
+        tracer = Tracer(exporter, sample_rate=1.0)
+        for name in ('a', 'b', 'c'):
+            in_context(lambda: tracer.finish(tracer.start(Request(), f'/t.Svc/{name}'), 'OK'))
+        assert exporter.flush()
+        assert not exporter.flush()
+        with open(path) as f:
+            names = [json.loads(line)['name'] for line in f]
+        assert names == ['/t.Svc/b', '/t.Svc/c']
+
+
+class TestTracePropagation(unittest.TestCase):
+    def test_client_injects_traceparent(self):
+        tracer = Tracer(RingBufferExporter(), sample_rate=1.0)
+
+        def run():
+            assert GRPCClient.inject_trace_context(None) is None
+            trace = tracer.start(Request(), '/t.Svc/m')
+            assert GRPCClient.inject_trace_context(None) == (('traceparent', trace.traceparent()),)
+            assert GRPCClient.inject_trace_context([('k', 'v')]) == (('k', 'v'), ('traceparent', trace.traceparent()))
+            own = [('traceparent', f'00-{TRACE_ID}-{PARENT_ID}-01')]
+            assert GRPCClient.inject_trace_context(own) is own
+
+        in_context(run)
+
+    def test_instrument(self):
+        app = GRPCFramework(GRPCFrameworkConfig(package='t'))
+
+        @app.unary_unary
+        async def call(data: bytes):
+            return data
+
+        route = app._services['RootService']['call']
+        plan = app._adaptor.compile_plan(route)
+        wrapper = object()
+        assert app.tracer is None and app._adaptor.instrument_unary_trace(plan, wrapper) is wrapper
+
+        app = GRPCFramework(GRPCFrameworkConfig(package='t', tracing=True, trace_sample_rate=1.0))
+        app.unary_unary(call)
+        plan = app._adaptor.compile_plan(app._services['RootService']['call'], route=('t', 'RootService', 'call'))
+
+        class Context:
+            def code(self):
+                return None
+
+        async def handler(request_bytes, context):
+            assert current_trace() is not None
+            return b'pong'
+
+        def run():
+            Request()
+            return asyncio.run(app._adaptor.instrument_unary_trace(plan, handler)(b'ping', Context()))
+
+        assert in_context(run) == b'pong'
+        exported = app.tracer.exporter.traces()
+        assert len(exported) == 1 and exported[0]['name'] == '/t.RootService/call' and exported[0]['status'] == 'OK'
+
+    def test_trace_file_writer(self):
+        path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+        app = GRPCFramework(GRPCFrameworkConfig(
+            package='t', tracing=True, trace_sample_rate=1.0, trace_file=path, trace_flush_interval=0.01
+        ))
+        app.executor = ThreadPoolExecutor(1, thread_name_prefix='traces-test')
+        exporter = app.tracer.exporter
+        threads = []
+        flush = exporter.flush
+
+        def flush_in_thread():
+            threads.append(threading.current_thread().name)
+            return flush()
+
+        exporter.flush = flush_in_thread
+
+        async def run():
+            app.loop = asyncio.get_running_loop()
+            await app._start_tracing(app)
+            await asyncio.sleep(0.1)
+            task = app._traces_task
+            in_context(lambda: app.tracer.finish(app.tracer.start(Request(), '/t.Svc/last'), 'OK'))
+            await app._stop_tracing(app)
+            return task
+
+        try:
+            task = asyncio.run(run())
+        finally:
+            app.executor.shutdown()
+        print(threads)
+        assert threads and all(name.startswith('traces-test') for name in threads)
+        # the writer is gone and the traces finished before shutdown are written
+        assert task.cancelled() and app._traces_task is None
+        with open(path) as f:
+            assert [json.loads(line)['name'] for line in f] == ['/t.Svc/last']
+
+    def test_config(self):
+        self.assertRaises(ValueError, GRPCFrameworkConfig, package='t', trace_sample_rate=2)
+        self.assertRaises(ValueError, GRPCFrameworkConfig, package='t', trace_file='traces.jsonl')